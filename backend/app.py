@@ -1,14 +1,37 @@
 from app import create_app
-from flask import request, jsonify, send_from_directory
+from flask import request, jsonify, send_from_directory, Response, stream_with_context
 import os
-from database.database import create_session, save_turn, get_session_turns
-from services.ai_service import get_ai_service
+import json
+from database.database import (
+    init_database, enable_write_behind, enable_session_cache, evict_session_cache,
+    create_session, save_turn, get_recent_turns, get_context_turns, get_session_turns_page,
+    get_turns_after, get_session_summary, update_session_summary,
+    get_knowledge_entries, fts_available, search_turns, search_knowledge,
+    get_insights, get_unlabeled_turns, apply_emotion_labels
+)
+from services.ai_service import get_ai_service, CONTEXT_TURNS, FALLBACK_RESPONSE, FALLBACK_INTRO
 from services.voice_service import VoiceService
 from services.tts_service import TTSService
+from services.audio_preprocess import AudioPreprocessor
+from services.speech_pipeline import SpeechPipeline, clean_for_tts
+from services.audio_store import MemoryAudioStore, DiskAudioStore
+from services.realtime_session import RealtimeVoiceSession, stream_options
+from services.tts_cache import TTSCache
+from services.context_builder import SessionSummarizer
+from services.knowledge_index import KnowledgeIndex
+from services.emotion_labeler import EmotionLabeler, SentimentClassifier
+from services.intro_pool import IntroPool
+from services.stage_scheduler import StageScheduler, StageOverloaded
+from services.service_registry import ServiceRegistry
+from services import metrics
+from services.metrics import StepTimer, STAGE_SECONDS, ACTIVE_SESSIONS
 from flask_cors import CORS, cross_origin
 from flask_socketio import SocketIO, emit
+import io
 import uuid
 import asyncio
+import signal
+import sys
 import threading
 import time
 import traceback
@@ -16,6 +39,9 @@ from flask import send_file
 
 app = create_app()
 
+# Data and audio paths are relative to backend/, whatever the working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Enable CORS for all routes
 CORS(app, origins=["http://localhost:3000"])
 
@@ -28,31 +54,206 @@ print("🚀 Starting Zenith...", flush=True)
 # FIXED: Initialize services at module level (singleton pattern)
 # Services are loaded ONCE when server starts, not per request
 # ============================================================================
-print("🧠 Initializing AI Service (this loads the model once)...", flush=True)
-ai_service = get_ai_service()  # Singleton - loads model once at startup
-print("✅ AI Service ready!", flush=True)
+print("🗃️  Initializing database (pooled WAL connections)...", flush=True)
+init_database()
+if os.getenv('SESSION_CACHE', '1') == '1':
+    # Recent turns of active sessions are served from memory
+    enable_session_cache(
+        window=int(os.getenv('SESSION_CACHE_TURNS', '20')),
+        max_bytes=int(os.getenv('SESSION_CACHE_MAX_MB', '32')) * 1024 * 1024,
+        idle_ttl=int(os.getenv('SESSION_CACHE_IDLE_TTL', '1800'))
+    )
+if os.getenv('DB_WRITE_BEHIND', '0') == '1':
+    # Turns are committed in batches off the request thread
+    enable_write_behind(
+        max_queue=int(os.getenv('DB_WRITE_QUEUE', '1000')),
+        batch_size=int(os.getenv('DB_WRITE_BATCH', '100'))
+    )
+
+# Heavy services are built lazily: warmed up in parallel in the background right
+# after startup (see /ready), or on first use, whichever comes first
+services = ServiceRegistry()
+
+
+def _create_ai_service():
+    service = get_ai_service()  # Singleton - loads the model once
+    # Session intros come from a pre-generated pool instead of a model call per session
+    if os.getenv('INTRO_POOL', '1') == '1':
+        service.use_intro_pool(IntroPool(
+            _generate_pool_intro,
+            size=int(os.getenv('INTRO_POOL_SIZE', '6')),
+            max_uses=int(os.getenv('INTRO_MAX_USES', '3')),
+            max_age=int(os.getenv('INTRO_MAX_AGE', '3600')),
+            tts_service=tts_service if os.getenv('INTRO_POOL_TTS', '1') == '1' else None,
+            prepare_speech=clean_for_tts
+        ))
+    return service
+
+
+def _generate_pool_intro(template):
+    """Intro for the pool; None on failure so the fallback text isn't pooled"""
+    intro = ai_service.generate_fresh_intro(template=template)
+    return None if intro == FALLBACK_INTRO else intro
+
+
+ai_service = services.register('ai', _create_ai_service)
+
+# Folds older turns into sessions.session_summary off the request path
+summarizer = services.register('summarizer', lambda: SessionSummarizer(
+    ai_service,
+    ai_service.context_builder,
+    load_state=get_session_summary,
+    load_turns_after=get_turns_after,
+    store_summary=update_session_summary,
+    max_turns=CONTEXT_TURNS
+))
+
+# Vector index over knowledge_base; relevant coping material is added to prompts
+knowledge_index = None
+KB_TOP_K = int(os.getenv('KB_TOP_K', '2'))
+KB_MIN_SCORE = float(os.getenv('KB_MIN_SCORE', '0.15'))
+if os.getenv('KB_RETRIEVAL', '1') == '1':
+    print("📚 Loading knowledge index...", flush=True)
+    knowledge_index = KnowledgeIndex(
+        os.getenv('KB_INDEX_DIR') or os.path.join(BASE_DIR, 'data', 'kb_index')
+    )
+    # Embedding new rows can take a while with a real model - don't hold up startup
+    threading.Thread(
+        target=lambda: knowledge_index.sync(get_knowledge_entries()), daemon=True, name="kb-sync"
+    ).start()
+
+# Fills turns.emotion_labels (and the insights aggregates) off the request path
+emotion_labeler = None
+if os.getenv('EMOTION_LABELING', '1') == '1':
+    emotion_labeler = EmotionLabeler(
+        get_unlabeled_turns,
+        apply_emotion_labels,
+        classifier=SentimentClassifier() if os.getenv('EMOTION_MODEL', '0') == '1' else None,
+        batch_size=int(os.getenv('EMOTION_BATCH', '64'))
+    )
+    emotion_labeler.start()
 
-print("🎤 Initializing Voice Service...", flush=True)
-voice_service = VoiceService()
-print("✅ Voice Service ready!", flush=True)
 
-print("🔊 Initializing TTS Service...", flush=True)
-tts_service = TTSService()
-print("✅ TTS Service ready!", flush=True)
+def _create_voice_service():
+    # Uploads are downsampled to 16 kHz mono and silence-trimmed before they go to Whisper
+    preprocessor = None
+    if os.getenv('AUDIO_PREPROCESS', '1') == '1':
+        preprocessor = AudioPreprocessor(
+            codec=os.getenv('AUDIO_CODEC', 'wav'),
+            silence_threshold=float(os.getenv('AUDIO_SILENCE_THRESHOLD', '-45')),
+            silence_padding_ms=int(os.getenv('AUDIO_SILENCE_PADDING_MS', '200'))
+        )
+    return VoiceService(preprocessor=preprocessor)
+
+
+voice_service = services.register('voice', _create_voice_service)
+
+# TTS_AUDIO_MODE=memory keeps replies in RAM and serves them from there (no MP3 files on disk);
+# on disk, a sweeper deletes reply files after TTS_AUDIO_TTL and keeps the directory under its quota
+if os.getenv('TTS_AUDIO_MODE', 'disk').lower() == 'memory':
+    audio_store = MemoryAudioStore(
+        max_bytes=int(os.getenv('TTS_MEMORY_MAX_MB', '64')) * 1024 * 1024,
+        ttl=int(os.getenv('TTS_MEMORY_TTL', '600'))
+    )
+else:
+    audio_store = DiskAudioStore(
+        os.getenv('TTS_AUDIO_DIR') or os.path.join(BASE_DIR, 'static', 'audio'),
+        max_bytes=int(os.getenv('TTS_AUDIO_MAX_MB', '512')) * 1024 * 1024,
+        ttl=int(os.getenv('TTS_AUDIO_TTL', '3600')),
+        sweep_interval=int(os.getenv('TTS_AUDIO_SWEEP_INTERVAL', '60'))
+    )
+    audio_store.start()
+
+# Let the front proxy send reply files: 'accel' (nginx X-Accel-Redirect to AUDIO_ACCEL_PREFIX)
+# or 'sendfile' (X-Sendfile for Apache/lighttpd); empty serves them from Flask
+AUDIO_OFFLOAD = os.getenv('AUDIO_OFFLOAD', '').lower()
+AUDIO_ACCEL_PREFIX = os.getenv('AUDIO_ACCEL_PREFIX', '/protected-audio/')
+app.use_x_sendfile = AUDIO_OFFLOAD == 'sendfile'
+
+
+def _create_tts_service():
+    # Phrase cache: repeated texts (fallbacks, intros, recurring sentences) skip Edge TTS entirely
+    tts_cache = None
+    if os.getenv('TTS_CACHE', '1') == '1':
+        tts_cache = TTSCache(
+            cache_dir=os.getenv('TTS_CACHE_DIR') or os.path.join(BASE_DIR, 'static', 'tts_cache'),
+            memory_max_bytes=int(os.getenv('TTS_CACHE_MEMORY_MB', '16')) * 1024 * 1024,
+            disk_max_bytes=int(os.getenv('TTS_CACHE_DISK_MB', '256')) * 1024 * 1024,
+            disk_ttl=int(os.getenv('TTS_CACHE_DISK_TTL', str(7 * 24 * 3600)))
+        )
+    service = TTSService(
+        audio_store=audio_store,
+        cache=tts_cache,
+        max_concurrency=int(os.getenv('TTS_MAX_CONCURRENCY', '4'))
+    )
+    
+    # Pre-synthesize phrases we know will repeat (extra ones via TTS_PREWARM_PHRASES, separated by |)
+    prewarm_phrases = [FALLBACK_RESPONSE, FALLBACK_INTRO] + [
+        phrase for phrase in os.getenv('TTS_PREWARM_PHRASES', '').split('|') if phrase.strip()
+    ]
+    service.prewarm([clean_for_tts(phrase) for phrase in prewarm_phrases], voice_names=("emma",))
+    return service
+
+
+tts_service = services.register('tts', _create_tts_service)
+speech_pipeline = SpeechPipeline(tts_service)
+
+# Bounded pool per pipeline stage; bursts beyond workers + queue are shed with Retry-After
+scheduler = StageScheduler({
+    'transcription': (int(os.getenv('STAGE_TRANSCRIPTION_WORKERS', '4')), int(os.getenv('STAGE_TRANSCRIPTION_QUEUE', '16'))),
+    'generation': (int(os.getenv('STAGE_GENERATION_WORKERS', '8')), int(os.getenv('STAGE_GENERATION_QUEUE', '32'))),
+    'synthesis': (int(os.getenv('STAGE_SYNTHESIS_WORKERS', '4')), int(os.getenv('STAGE_SYNTHESIS_QUEUE', '16')))
+}, timeout=int(os.getenv('STAGE_TIMEOUT', '60')))
+STAGE_REJECT_STATUS = int(os.getenv('STAGE_REJECT_STATUS', '503'))
+
 
 # Active sessions storage
 active_sessions = {}
+# Finished utterances a voice session may have waiting or in progress; more are dropped
+REALTIME_MAX_PENDING = int(os.getenv('REALTIME_MAX_PENDING_UTTERANCES', '2'))
+ACTIVE_SESSIONS.set_function(lambda: len(active_sessions))
+
+if os.getenv('WARMUP', '1') == '1':
+    services.warm_up()
 
 @app.route('/health')
 def health_check():
     return {'status': 'healthy', 'message': 'Zenith Voice Assistant is running!'}
 
+@app.route('/ready')
+def readiness_check():
+    """Readiness probe: 200 once every service is built, 503 (with per-service state) until then"""
+    ready = services.ready()
+    return jsonify({'ready': ready, 'services': services.status()}), 200 if ready else 503
+
+@app.errorhandler(StageOverloaded)
+def stage_overloaded(e):
+    """A pipeline stage is full - tell the client when to retry instead of queueing forever"""
+    print(f"⚠️  Shedding request: {e}")
+    response = jsonify({'error': str(e), 'stage': e.stage, 'retry_after': e.retry_after})
+    response.status_code = STAGE_REJECT_STATUS
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms, error/fallback counters and queue gauges (Prometheus text format)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/stages')
+def stage_stats():
+    """Queue depth and wait times of each pipeline stage"""
+    return jsonify(scheduler.stats())
+
+
 @app.route('/')
 def home():
     return {
         'message': 'Mental Health Voice Assistant API', 
         'status': 'ready', 
-        'features': ['text_chat', 'voice_chat', 'voice_chat_complete', 'real_time_sessions']
+        'features': ['text_chat', 'text_chat_stream', 'voice_chat', 'voice_chat_complete', 'voice_chat_stream', 'real_time_sessions', 'search', 'insights']
     }
 
 @app.route('/chat', methods=['POST'])
@@ -73,51 +274,216 @@ def chat():
         # Save user message
         save_turn(session_id, 'user', user_message)
         
-        # Get conversation history
-        conversation = get_session_turns(session_id)
+        # Get conversation context (recent window + rolling summary)
+        context = _load_context(session_id, user_message)
         
         print(f"💬 Generating AI response for: {user_message[:50]}...", flush=True)
         
-        # Generate AI response using singleton service
-        assistant_reply = ai_service.generate_response(
-            user_message, 
-            [dict(row) for row in conversation]
-        )
+        # Generate AI response on the generation stage's pool
+        assistant_reply = scheduler.run('generation', ai_service.generate_response, user_message, **context)
         
         # Save assistant response
-        save_turn(session_id, 'assistant', assistant_reply)
+        _save_reply(session_id, assistant_reply)
         
-        # Get updated conversation
-        updated_conversation = get_session_turns(session_id)
+        # Get updated conversation window (full history: /sessions/<id>/turns)
+        updated_conversation = get_recent_turns(session_id, CONTEXT_TURNS)
         
         return jsonify({
             'session_id': session_id,
             'reply': assistant_reply,
-            'conversation': [dict(row) for row in updated_conversation]
+            'conversation': updated_conversation
         })
     
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"❌ Chat error: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
+def _load_context(session_id, user_message):
+    """Recent turns, rolling summary and retrieved knowledge for generate_response / generate_response_stream"""
+    summary, summarized_through = get_session_summary(session_id)
+    return {
+        'conversation_history': get_context_turns(session_id, summarized_through, CONTEXT_TURNS),
+        'session_summary': summary,
+        'summarized_through': summarized_through,
+        'knowledge': _retrieve_knowledge(user_message)
+    }
+
+
+def _retrieve_knowledge(user_message):
+    """knowledge_base entries most similar to the user's message (empty if retrieval is off)"""
+    if knowledge_index is None or not len(knowledge_index):
+        return []
+    try:
+        matches = knowledge_index.search(user_message, k=KB_TOP_K, min_score=KB_MIN_SCORE)
+        return get_knowledge_entries([entry_id for entry_id, _ in matches])
+    except Exception as e:
+        print(f"❌ Knowledge retrieval error: {e}")
+        return []
+
+
+def _spoken_reply(user_message, context):
+    """
+    Stream a reply and its sentence audio: ('token', str) and ('audio', segment) items
+
+    Generation and synthesis are both admitted before anything is
+    returned, so either stage being full raises StageOverloaded while the
+    caller can still answer with a plain error. Synthesis holds one of its
+    places for the whole reply, since its sentences are spoken in order.
+    """
+    tokens = scheduler.stream('generation', ai_service.generate_response_stream(user_message, **context))
+    try:
+        return scheduler.stream('synthesis', speech_pipeline.stream(tokens, voice_name="emma"))
+    except StageOverloaded:
+        tokens.close()
+        raise
+
+
+def _save_reply(session_id, assistant_reply):
+    """Persist the assistant's reply and let the background workers pick up the exchange"""
+    save_turn(session_id, 'assistant', assistant_reply)
+    summarizer.schedule(session_id)
+    if emotion_labeler is not None:
+        emotion_labeler.notify()
+
+
+@app.route('/sessions/<session_id>/turns')
+def session_turns(session_id):
+    """Full session history, paginated with an opaque cursor"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        turns, next_cursor = get_session_turns_page(session_id, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    return jsonify({
+        'session_id': session_id,
+        'turns': [dict(row) for row in turns],
+        'next_cursor': next_cursor
+    })
+
+
+@app.route('/search')
+def search():
+    """Ranked full-text search over one session's turns (scope=turns, needs session_id) or the knowledge base (scope=knowledge)"""
+    query = (request.args.get('q') or '').strip()
+    scope = request.args.get('scope', 'turns')
+    session_id = request.args.get('session_id')
+    
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    if scope not in ('turns', 'knowledge'):
+        return jsonify({'error': 'scope must be turns or knowledge'}), 400
+    if scope == 'turns' and not session_id:
+        # Never search across sessions: results would expose other users' conversations
+        return jsonify({'error': 'session_id is required for scope=turns'}), 400
+    if not fts_available():
+        return jsonify({'error': 'Full-text search is not available on this server'}), 503
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 50)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
+    
+    if scope == 'turns':
+        results, has_more = search_turns(query, session_id, limit=limit, offset=offset)
+    else:
+        results, has_more = search_knowledge(query, limit=limit, offset=offset)
+    
+    return jsonify({
+        'query': query,
+        'scope': scope,
+        'results': results,
+        'next_offset': offset + limit if has_more else None
+    })
+
+
+@app.route('/insights')
+def insights():
+    """Precomputed insights (emotion distribution, sentiment trends, word cloud, milestones) for a user"""
+    try:
+        days = min(max(int(request.args.get('days', 30)), 1), 365)
+        sessions = min(max(int(request.args.get('sessions', 30)), 1), 200)
+        words = min(max(int(request.args.get('words', 50)), 1), 200)
+    except ValueError:
+        return jsonify({'error': 'Invalid days, sessions or words'}), 400
+    
+    return jsonify(get_insights(
+        request.args.get('user_id', 'anonymous'), days=days, sessions=sessions, words=words
+    ))
+
+
+def _sse_event(event, payload):
+    """Format one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Text-based chat endpoint that streams reply tokens as Server-Sent Events"""
+    data = request.json or {}
+    user_message = data.get('message')
+    session_id = data.get('session_id')
+    
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    if not session_id:
+        session_id = create_session()
+        print(f"✅ Created new session: {session_id}")
+    
+    # Save user message and get history before the stream starts
+    save_turn(session_id, 'user', user_message)
+    context = _load_context(session_id, user_message)
+    
+    print(f"💬 Streaming AI response for: {user_message[:50]}...", flush=True)
+    
+    # Admitted (or rejected) now, while a plain error response is still possible
+    tokens = scheduler.stream('generation', ai_service.generate_response_stream(user_message, **context))
+    
+    def generate():
+        yield _sse_event('session', {'session_id': session_id})
+        
+        parts = []
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield _sse_event('token', {'token': token})
+        except Exception as e:
+            print(f"❌ Chat stream error: {str(e)}")
+            traceback.print_exc()
+            yield _sse_event('error', {'error': str(e)})
+        finally:
+            # Persist whatever was generated, even if the client went away mid-stream
+            assistant_reply = ''.join(parts).strip()
+            if assistant_reply:
+                _save_reply(session_id, assistant_reply)
+        
+        yield _sse_event('done', {'session_id': session_id, 'reply': assistant_reply})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/voice-chat-complete', methods=['POST'])
 def voice_chat_complete():
     """Complete voice chat endpoint - WITH NATURAL VOICE"""
     try:
-        # Track total pipeline time
-        pipeline_start = time.time()
+        # Step timings go to the zenith_stage_seconds histogram (see /metrics)
+        timer = StepTimer()
         
-        print("\n" + "="*70)
-        print("=== VOICE CHAT COMPLETE ENDPOINT CALLED ===")
-        print("="*70)
+        print("\n=== VOICE CHAT COMPLETE ENDPOINT CALLED ===")
         
         # ============================================================
-        # STEP 1: Receive and Save Audio
+        # STEP 1: Receive Audio
         # ============================================================
-        step1_start = time.time()
-        
         if 'audio' not in request.files:
             print('❌ No audio file in request')
             return jsonify({'error': 'No audio file provided'}), 400
@@ -130,29 +496,20 @@ def voice_chat_complete():
             session_id = create_session()
             print(f"✅ Created new session: {session_id}")
         
-        # Save temporary audio file
-        temp_path = f"temp_audio_{session_id}.wav"
-        audio.save(temp_path)
-        
-        step1_time = time.time() - step1_start
-        print(f"⏱️  Step 1 (Receive & Save): {step1_time:.3f}s")
+        timer.step('receive')
         
         # ============================================================
         # STEP 2: Transcribe Audio (Speech-to-Text)
         # ============================================================
         print("\n🎧 Starting transcription...")
-        step2_start = time.time()
         
-        user_message = voice_service.transcribe_audio(temp_path)
+        # Stream the upload straight to Groq - no temp file on disk
+        user_message = scheduler.run(
+            'transcription', voice_service.transcribe_audio, audio.stream, filename=audio.filename or 'audio.wav'
+        )
         
-        step2_time = time.time() - step2_start
+        timer.step('transcription')
         print(f"✅ Transcription result: {user_message}")
-        print(f"⏱️  Step 2 (Transcription): {step2_time:.3f}s")
-        
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-            print("✅ Temp file cleaned up")
         
         if not user_message:
             print('❌ Transcription failed or empty')
@@ -161,111 +518,79 @@ def voice_chat_complete():
         # ============================================================
         # STEP 3: Save User Message & Get History
         # ============================================================
-        step3_start = time.time()
-        
-        print("\n💾 Saving user message to database...")
         save_turn(session_id, 'user', user_message)
+        context = _load_context(session_id, user_message)
         
-        print("📚 Getting conversation history...")
-        conversation = get_session_turns(session_id)
-        
-        step3_time = time.time() - step3_start
-        print(f"⏱️  Step 3 (Database ops): {step3_time:.3f}s")
+        timer.step('database')
         
         # ============================================================
         # STEP 4: Generate AI Response
         # ============================================================
         print("\n🧠 Generating AI response...")
-        step4_start = time.time()
         
-        assistant_reply = ai_service.generate_response(
-            user_message, 
-            [dict(row) for row in conversation]
-        )
+        assistant_reply = scheduler.run('generation', ai_service.generate_response, user_message, **context)
         
-        step4_time = time.time() - step4_start
+        timer.step('generation')
         print(f"✅ AI response: {assistant_reply[:100]}...")
-        print(f"⏱️  Step 4 (AI Generation): {step4_time:.3f}s")
         
         # ============================================================
         # STEP 5: Save AI Response
         # ============================================================
-        step5_start = time.time()
-        
-        print("\n💾 Saving AI response to database...")
-        save_turn(session_id, 'assistant', assistant_reply)
+        _save_reply(session_id, assistant_reply)
         
-        step5_time = time.time() - step5_start
-        print(f"⏱️  Step 5 (Save AI response): {step5_time:.3f}s")
+        timer.step('save')
         
         # ============================================================
         # STEP 6: Generate TTS Audio with NATURAL VOICE
         # ============================================================
         print("\n🎤 Generating TTS audio with natural voice...")
-        step6_start = time.time()
         
         # Clean up text for more natural TTS
-        clean_text = assistant_reply.strip()
-        clean_text = clean_text.replace('...', '.')
-        clean_text = clean_text.replace('..', '.')
+        clean_text = clean_for_tts(assistant_reply)
         
         # Try different voices in order of naturalness
         voices_to_try = ['michelle', 'emma', 'ashley', 'aria']
-        audio_file = None
+        audio_id = None
         
         for voice_name in voices_to_try:
             try:
                 print(f"   Trying voice: {voice_name}")
-                audio_file = tts_service.generate_speech(clean_text, voice_name="emma")
-                if audio_file and os.path.exists(audio_file):
+                audio_id = scheduler.run('synthesis', tts_service.generate_speech_id, clean_text, voice_name="emma")
+                if audio_id:
                     print(f"   ✅ Success with {voice_name}")
                     break
+            except StageOverloaded:
+                raise
             except Exception as voice_error:
                 print(f"   ❌ {voice_name} failed: {voice_error}")
                 continue
         
-        step6_time = time.time() - step6_start
-        print(f"✅ TTS audio created: {audio_file}")
-        print(f"⏱️  Step 6 (TTS Generation): {step6_time:.3f}s")
+        timer.step('tts')
+        print(f"✅ TTS audio created: {audio_id}")
         
-        if not audio_file or not os.path.exists(audio_file):
-            print('❌ TTS generation failed or file not found')
+        if not audio_id:
+            print('❌ TTS generation failed')
             return jsonify({'error': 'Failed to generate speech'}), 500
         
-        # ============================================================
-        # FINAL: Calculate Total Time and Print Report
-        # ============================================================
-        total_time = time.time() - pipeline_start
-        
-        print("\n" + "="*70)
-        print("📊 COMPLETE PIPELINE TIMING BREAKDOWN:")
-        print("="*70)
-        print(f"   Step 1 - Receive Audio:     {step1_time:>6.2f}s")
-        print(f"   Step 2 - Transcription:      {step2_time:>6.2f}s")
-        print(f"   Step 3 - Database ops:       {step3_time:>6.2f}s")
-        print(f"   Step 4 - AI Generation:      {step4_time:>6.2f}s")
-        print(f"   Step 5 - Save AI response:   {step5_time:>6.2f}s")
-        print(f"   Step 6 - TTS Audio:          {step6_time:>6.2f}s")
-        print("-"*70)
-        print(f"   TOTAL PIPELINE TIME:         {total_time:>6.2f}s")
-        print("="*70 + "\n")
-        
-        print("✅ SUCCESS - Returning response\n")
+        total_time = timer.total()
+        print(f"✅ Voice turn done in {total_time:.2f}s ({timer.summary()})\n")
         
         return jsonify({
             'session_id': session_id,
             'transcribed_text': user_message,
             'reply': assistant_reply,
-            'audio_file': audio_file,
-            'audio_url': f'/audio/{os.path.basename(audio_file)}',
+            'audio_file': audio_id,
+            'audio_url': f'/audio/{audio_id}',
             'timing': {
-                'transcription': round(step2_time, 2),
-                'ai_generation': round(step4_time, 2),
-                'tts': round(step6_time, 2),
+                'transcription': round(timer.steps['transcription'], 2),
+                'ai_generation': round(timer.steps['generation'], 2),
+                'tts': round(timer.steps['tts'], 2),
                 'total': round(total_time, 2)
             }
         })
     
+    except StageOverloaded:
+        raise
     except Exception as e:
         print("\n❌ EXCEPTION OCCURRED:")
         print(f"Error: {str(e)}")
@@ -274,27 +599,165 @@ def voice_chat_complete():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/voice-chat-stream', methods=['POST'])
+def voice_chat_stream():
+    """
+    Voice chat endpoint that pipelines TTS with LLM generation
+    
+    Streams Server-Sent Events: transcription, reply tokens, and one
+    audio_segment per sentence (in order) so playback can start while the
+    rest of the reply is still being generated.
+    """
+    pipeline_start = time.perf_counter()
+    
+    if 'audio' not in request.files:
+        print('❌ No audio file in request')
+        return jsonify({'error': 'No audio file provided'}), 400
+    
+    audio = request.files['audio']
+    session_id = request.form.get('session_id')
+    
+    if not session_id:
+        session_id = create_session()
+        print(f"✅ Created new session: {session_id}")
+    
+    # Transcribe before streaming so failures can still return a plain error
+    transcription_start = time.perf_counter()
+    user_message = scheduler.run(
+        'transcription', voice_service.transcribe_audio, audio.stream, filename=audio.filename or 'audio.wav'
+    )
+    transcription_time = time.perf_counter() - transcription_start
+    STAGE_SECONDS.labels('transcription').observe(transcription_time)
+    
+    if not user_message:
+        print('❌ Transcription failed or empty')
+        return jsonify({'error': 'Failed to transcribe audio'}), 500
+    
+    save_turn(session_id, 'user', user_message)
+    context = _load_context(session_id, user_message)
+    reply = _spoken_reply(user_message, context)
+    
+    def generate():
+        yield _sse_event('transcription', {'session_id': session_id, 'text': user_message})
+        
+        parts = []
+        first_audio_time = None
+        generation_start = time.perf_counter()
+        try:
+            for kind, item in reply:
+                if kind == 'token':
+                    parts.append(item)
+                    yield _sse_event('token', {'token': item})
+                else:
+                    if first_audio_time is None:
+                        first_audio_time = time.perf_counter() - generation_start
+                        STAGE_SECONDS.labels('first_audio').observe(first_audio_time)
+                    yield _sse_event('audio_segment', {
+                        'index': item['index'],
+                        'text': item['text'],
+                        'audio_url': item['audio_url']
+                    })
+        except Exception as e:
+            print(f"❌ Voice stream error: {str(e)}")
+            traceback.print_exc()
+            yield _sse_event('error', {'error': str(e)})
+        finally:
+            reply.close()
+            assistant_reply = ''.join(parts).strip()
+            if assistant_reply:
+                _save_reply(session_id, assistant_reply)
+        
+        total_time = time.perf_counter() - pipeline_start
+        STAGE_SECONDS.labels('stream_total').observe(total_time)
+        print(f"⏱️  Pipelined voice turn: transcription {transcription_time:.2f}s, "
+              f"first audio {first_audio_time or 0:.2f}s, total {total_time:.2f}s")
+        
+        yield _sse_event('done', {
+            'session_id': session_id,
+            'reply': assistant_reply,
+            'timing': {
+                'transcription': round(transcription_time, 2),
+                'first_audio': round(first_audio_time, 2) if first_audio_time is not None else None,
+                'total': round(total_time, 2)
+            }
+        })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/audio/<filename>')
 def serve_audio(filename):
     """Serve audio files"""
     try:
-        # Absolute path to audio file
-        audio_path = os.path.join(os.getcwd(), 'static', 'audio', filename)
-        print(f"🎵 Serving audio: {audio_path}")
-        
-        # Check if file exists
-        if not os.path.exists(audio_path):
-            print(f"❌ Audio file not found: {audio_path}")
+        clip = audio_store.get(filename)
+        if clip is None:
+            print(f"❌ Audio file not found: {filename}")
             return "Audio file not found", 404
         
-        # Serve the file
-        return send_file(audio_path, mimetype='audio/mpeg')
+        # In-memory clips (TTS_AUDIO_MODE=memory)
+        if isinstance(audio_store, MemoryAudioStore):
+            return _serve_audio_clip(clip)
+        
+        return _serve_audio_file(clip)
     
     except Exception as e:
         print(f"❌ Audio serve error: {e}")
         traceback.print_exc()
         return f"Error serving audio: {str(e)}", 500
 
+def _serve_audio_file(clip):
+    """Serve a reply file with ETag/Range support, or hand it to the front proxy"""
+    # Spoken replies are personal: the client may keep them until they expire
+    # here, but shared proxies and CDNs must not store them
+    max_age = max(0, int(clip.expires_at - time.time()))
+    
+    if AUDIO_OFFLOAD == 'accel':
+        # nginx serves the file from its internal location (ETag, Range and 304s included)
+        response = Response(mimetype=clip.mimetype)
+        response.headers['X-Accel-Redirect'] = AUDIO_ACCEL_PREFIX + clip.audio_id
+        response.cache_control.max_age = max_age
+    else:
+        # X-Sendfile (AUDIO_OFFLOAD=sendfile) is added by send_file via app.use_x_sendfile
+        response = send_file(
+            clip.path,
+            mimetype=clip.mimetype,
+            conditional=True,
+            etag=clip.etag,
+            max_age=max_age
+        )
+    
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+def _serve_audio_clip(clip):
+    """Serve an in-memory clip with Range support, evicting it once fully played"""
+    response = send_file(
+        io.BytesIO(clip.data),
+        mimetype=clip.mimetype,
+        download_name=clip.audio_id,
+        conditional=True,
+        etag=clip.etag,
+        max_age=max(0, int(clip.expires_at - time.time()))
+    )
+    # Evicted after playback, so only the client that asked should keep a copy
+    response.cache_control.public = False
+    response.cache_control.private = True
+    
+    # The clip has been played once the client has received its last byte
+    if request.range is None:
+        audio_store.mark_played(clip.audio_id)
+    else:
+        byte_range = request.range.range_for_length(clip.size)
+        if byte_range is not None and byte_range[1] >= clip.size:
+            audio_store.mark_played(clip.audio_id)
+    
+    return response
+
 # =============================================================================
 # WebSocket Events for Real-Time Voice Sessions
 # =============================================================================
@@ -312,7 +775,13 @@ def handle_connect():
 def handle_start_session(data):
     """Start a new real-time voice session"""
     client_id = request.sid
+    data = data or {}
     session_duration = data.get('duration', 30)  # Default 30 minutes
+    try:
+        sample_rate, encoding = stream_options(data)
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+        return
     db_session_id = create_session()
     
     # Store active session
@@ -320,7 +789,10 @@ def handle_start_session(data):
         'db_session_id': db_session_id,
         'duration': session_duration,
         'start_time': time.time(),
-        'status': 'active'
+        'status': 'active',
+        # Streaming audio intake; utterances are processed one at a time per session
+        'stream': RealtimeVoiceSession(sample_rate=sample_rate, encoding=encoding, max_pending=REALTIME_MAX_PENDING),
+        'utterance_lock': threading.Lock()
     }
     
     print(f'🎙️ Starting voice session for client {client_id}: {session_duration} minutes')
@@ -331,10 +803,41 @@ def handle_start_session(data):
         'session_id': db_session_id,
         'client_id': client_id
     })
+    
+    if not data.get('want_intro'):
+        return
+    
+    # Opt-in greeting from the intro pool (a memory lookup; the fallback intro on a miss),
+    # spoken in the background
+    intro = ai_service.generate_intro_response(data.get('user_name'), use_model=False)
+    save_turn(db_session_id, 'assistant', intro)
+    emit('intro', {'session_id': db_session_id, 'text': intro})
+    socketio.start_background_task(_speak_intro, client_id, db_session_id, intro)
+
+
+def _speak_intro(client_id, session_id, intro):
+    """Send the intro's audio (pre-synthesized intros come straight from the TTS cache)"""
+    try:
+        audio_id = tts_service.generate_speech_id(clean_for_tts(intro), voice_name="emma")
+        if not audio_id:
+            return
+        socketio.emit('intro_audio', {
+            'session_id': session_id,
+            'audio_url': f'/audio/{audio_id}'
+        }, to=client_id)
+    except Exception as e:
+        print(f"❌ Intro TTS error: {e}")
 
 @socketio.on('audio_chunk')
 def handle_audio_chunk(data):
-    """Handle real-time audio chunks"""
+    """
+    Handle real-time audio chunks
+    
+    Accepts raw bytes, or {'audio': bytes, 'final': bool}. Frames are
+    buffered per session; every finished utterance (VAD end-of-speech or
+    final=True) is transcribed, answered and spoken in the background,
+    up to REALTIME_MAX_PENDING at a time (later ones are dropped).
+    """
     client_id = request.sid
     
     if client_id not in active_sessions:
@@ -342,17 +845,120 @@ def handle_audio_chunk(data):
         return
     
     try:
-        # TODO: Process audio chunk in real-time
-        # This will be implemented in future phases
-        print(f'📡 Received audio chunk from client {client_id}')
+        if isinstance(data, dict):
+            chunk = data.get('audio') or b''
+            final = bool(data.get('final', False))
+        else:
+            chunk = data or b''
+            final = False
+        
+        session_info = active_sessions[client_id]
+        utterances = session_info['stream'].feed(chunk, final=final)
+        
+        for audio_bytes, filename in utterances:
+            if not session_info['stream'].claim_utterance():
+                print(f'⚠️  Dropping utterance from client {client_id}: too many still being answered')
+                emit('error', {'message': 'Still answering earlier speech - utterance dropped'})
+                continue
+            print(f'🗣️  Utterance complete from client {client_id} ({len(audio_bytes)} bytes)')
+            socketio.start_background_task(
+                process_utterance, client_id, session_info, audio_bytes, filename
+            )
         
         # Send acknowledgment
-        emit('audio_received', {'status': 'processing'})
+        emit('audio_received', {'status': 'processing' if utterances else 'buffering'})
     
     except Exception as e:
         print(f'❌ Error processing audio chunk: {e}')
         emit('error', {'message': f'Error processing audio: {str(e)}'})
 
+def process_utterance(client_id, session_info, audio_bytes, filename):
+    """Transcribe one streamed utterance, then stream the reply and its audio back to the client"""
+    session_id = session_info['db_session_id']
+    
+    with session_info['utterance_lock']:
+        try:
+            user_message = scheduler.run('transcription', voice_service.transcribe_audio, audio_bytes, filename=filename)
+            
+            if not user_message:
+                socketio.emit('transcription', {'session_id': session_id, 'text': ''}, to=client_id)
+                return
+            
+            socketio.emit('transcription', {'session_id': session_id, 'text': user_message}, to=client_id)
+            
+            save_turn(session_id, 'user', user_message)
+            context = _load_context(session_id, user_message)
+            
+            parts = []
+            try:
+                for kind, item in _spoken_reply(user_message, context):
+                    if kind == 'token':
+                        parts.append(item)
+                        socketio.emit('reply_token', {'session_id': session_id, 'token': item}, to=client_id)
+                    else:
+                        socketio.emit('audio_segment', {
+                            'session_id': session_id,
+                            'index': item['index'],
+                            'text': item['text'],
+                            'audio_url': item['audio_url']
+                        }, to=client_id)
+            finally:
+                assistant_reply = ''.join(parts).strip()
+                if assistant_reply:
+                    _save_reply(session_id, assistant_reply)
+            
+            socketio.emit('reply_complete', {'session_id': session_id, 'reply': assistant_reply}, to=client_id)
+        
+        except StageOverloaded as e:
+            print(f"⚠️  Shedding utterance for client {client_id}: {e}")
+            socketio.emit('error', {'message': str(e), 'retry_after': e.retry_after}, to=client_id)
+        except Exception as e:
+            print(f'❌ Error processing utterance for client {client_id}: {e}')
+            traceback.print_exc()
+            socketio.emit('error', {'message': f'Error processing audio: {str(e)}'}, to=client_id)
+        finally:
+            session_info['stream'].release_utterance()
+
+@socketio.on('chat_message')
+def handle_chat_message(data):
+    """Stream a text chat reply over the socket as reply_token events"""
+    client_id = request.sid
+    user_message = (data or {}).get('message')
+    session_id = (data or {}).get('session_id')
+    
+    if not user_message:
+        emit('error', {'message': 'No message provided'})
+        return
+    
+    if not session_id:
+        if client_id in active_sessions:
+            session_id = active_sessions[client_id]['db_session_id']
+        else:
+            session_id = create_session()
+            print(f"✅ Created new session: {session_id}")
+    
+    try:
+        save_turn(session_id, 'user', user_message)
+        context = _load_context(session_id, user_message)
+        
+        parts = []
+        for token in scheduler.stream('generation', ai_service.generate_response_stream(user_message, **context)):
+            parts.append(token)
+            emit('reply_token', {'session_id': session_id, 'token': token})
+        
+        assistant_reply = ''.join(parts).strip()
+        _save_reply(session_id, assistant_reply)
+        
+        emit('reply_complete', {'session_id': session_id, 'reply': assistant_reply})
+    
+    except StageOverloaded as e:
+        print(f"⚠️  Shedding chat message for client {client_id}: {e}")
+        emit('error', {'message': str(e), 'retry_after': e.retry_after})
+    except Exception as e:
+        print(f'❌ Error streaming chat reply: {e}')
+        traceback.print_exc()
+        emit('error', {'message': f'Error generating reply: {str(e)}'})
+
 @socketio.on('end_session')
 def handle_end_session(data):
     """End a real-time voice session"""
@@ -365,7 +971,7 @@ def handle_end_session(data):
         print(f'🛑 Ending voice session for client {client_id} after {session_duration:.1f} seconds')
         
         # Clean up session
-        del active_sessions[client_id]
+        _close_active_session(client_id)
         
         emit('session_ended', {
             'message': 'Voice session ended',
@@ -384,7 +990,14 @@ def handle_disconnect():
     # Clean up any active sessions
     if client_id in active_sessions:
         print(f'🧹 Cleaning up session for disconnected client {client_id}')
-        del active_sessions[client_id]
+        _close_active_session(client_id)
+
+def _close_active_session(client_id):
+    """Remove a socket session and drop its cached conversation window"""
+    session_info = active_sessions.pop(client_id, None)
+    if session_info is not None:
+        evict_session_cache(session_info['db_session_id'])
+    return session_info
 
 # Session cleanup background task
 def cleanup_expired_sessions():
@@ -404,7 +1017,7 @@ def cleanup_expired_sessions():
         for client_id in expired_clients:
             print(f'⏰ Auto-ending expired session for client {client_id}')
             if client_id in active_sessions:
-                del active_sessions[client_id]
+                _close_active_session(client_id)
         
         time.sleep(30)  # Check every 30 seconds
 
@@ -413,7 +1026,14 @@ cleanup_thread = threading.Thread(target=cleanup_expired_sessions, daemon=True)
 cleanup_thread.start()
 print("✅ Session cleanup thread started")
 
+def _exit_on_sigterm(signum, frame):
+    # A SIGTERM would end the process without running atexit; exiting normally
+    # lets close_database() commit the write-behind queue first
+    sys.exit(0)
+
+
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
     print("\n🎙️ Starting Flask server on http://0.0.0.0:8000")
     print("🌐 Frontend should connect from: http://localhost:3000")
     print("=" * 60)
@@ -0,0 +1,307 @@
+"""
+ASGI Server - asyncio serving mode for Zenith
+Socket.IO sessions run as coroutines: transcription (AsyncGroq), reply streaming
+(AsyncGroq) and Edge TTS all await on one event loop instead of holding a thread
+each. The Flask routes from app.py are mounted underneath unchanged.
+Transcription, generation and synthesis hold places in app.py's StageScheduler (slot()), so
+bursts are shed with a retry_after hint exactly as in the threaded server.
+
+Run with:  python asgi.py
+"""
+import asyncio
+import importlib.util
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+import uvicorn
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# app.py shares its name with the app/ package, so load it from its path
+_spec = importlib.util.spec_from_file_location('zenith_server', os.path.join(BACKEND_DIR, 'app.py'))
+server = importlib.util.module_from_spec(_spec)
+sys.modules['zenith_server'] = server
+_spec.loader.exec_module(server)
+
+from database.database import close_database, create_session, save_turn
+from services.realtime_session import RealtimeVoiceSession, stream_options
+from services.speech_pipeline import clean_for_tts
+from services.stage_scheduler import StageOverloaded
+
+ai_service = server.ai_service
+voice_service = server.voice_service
+tts_service = server.tts_service
+speech_pipeline = server.speech_pipeline
+active_sessions = server.active_sessions
+scheduler = server.scheduler
+
+# Flask requests (including long SSE streams) each hold one of these threads
+_wsgi_executor = ThreadPoolExecutor(max_workers=int(os.getenv('WSGI_THREADS', '64')), thread_name_prefix="wsgi")
+
+
+class _ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI request on one shared thread (thread_sensitive);
+    # run them on the pool instead so HTTP requests don't queue behind each other
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.run_wsgi_app.__wrapped__, thread_sensitive=False, executor=_wsgi_executor
+    )
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that serves concurrent requests concurrently"""
+
+    async def __call__(self, scope, receive, send):
+        await _ThreadedWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins=["http://localhost:3000"])
+application = socketio.ASGIApp(sio, other_asgi_app=ThreadedWsgiToAsgi(server.app))
+
+
+@sio.event
+async def connect(sid, environ):
+    """Handle client connection"""
+    print(f'✅ Client connected: {sid}')
+    await sio.emit('connected', {
+        'message': 'Connected to Zenith voice session server',
+        'client_id': sid
+    }, to=sid)
+
+
+@sio.event
+async def start_session(sid, data):
+    """Start a new real-time voice session"""
+    data = data or {}
+    session_duration = data.get('duration', 30)  # Default 30 minutes
+    try:
+        sample_rate, encoding = stream_options(data)
+    except ValueError as e:
+        await sio.emit('error', {'message': str(e)}, to=sid)
+        return
+    db_session_id = await asyncio.to_thread(create_session)
+
+    active_sessions[sid] = {
+        'db_session_id': db_session_id,
+        'duration': session_duration,
+        'start_time': time.time(),
+        'status': 'active',
+        'stream': RealtimeVoiceSession(
+            sample_rate=sample_rate, encoding=encoding, max_pending=server.REALTIME_MAX_PENDING
+        ),
+        'utterance_lock': asyncio.Lock()
+    }
+
+    print(f'🎙️ Starting voice session for client {sid}: {session_duration} minutes')
+
+    await sio.emit('session_started', {
+        'message': f'Voice session started for {session_duration} minutes',
+        'duration': session_duration,
+        'session_id': db_session_id,
+        'client_id': sid
+    }, to=sid)
+
+    if not data.get('want_intro'):
+        return
+
+    # Opt-in greeting from the intro pool (the fallback intro on a miss, never a model call)
+    intro = ai_service.generate_intro_response(data.get('user_name'), use_model=False)
+    await asyncio.to_thread(save_turn, db_session_id, 'assistant', intro)
+    await sio.emit('intro', {'session_id': db_session_id, 'text': intro}, to=sid)
+    asyncio.ensure_future(_speak_intro(sid, db_session_id, intro))
+
+
+async def _speak_intro(sid, session_id, intro):
+    """Send the intro's audio (pre-synthesized intros come straight from the TTS cache)"""
+    audio_id = await tts_service.speech_id(clean_for_tts(intro), voice_name="emma")
+    if audio_id:
+        await sio.emit('intro_audio', {'session_id': session_id, 'audio_url': f'/audio/{audio_id}'}, to=sid)
+
+
+@sio.event
+async def audio_chunk(sid, data):
+    """Buffer streamed audio; every finished utterance is answered in its own task"""
+    if sid not in active_sessions:
+        await sio.emit('error', {'message': 'No active session found'}, to=sid)
+        return
+
+    try:
+        if isinstance(data, dict):
+            chunk = data.get('audio') or b''
+            final = bool(data.get('final', False))
+        else:
+            chunk = data or b''
+            final = False
+
+        session_info = active_sessions[sid]
+        utterances = session_info['stream'].feed(chunk, final=final)
+
+        for audio_bytes, filename in utterances:
+            if not session_info['stream'].claim_utterance():
+                print(f'⚠️  Dropping utterance from client {sid}: too many still being answered')
+                await sio.emit('error', {'message': 'Still answering earlier speech - utterance dropped'}, to=sid)
+                continue
+            print(f'🗣️  Utterance complete from client {sid} ({len(audio_bytes)} bytes)')
+            asyncio.ensure_future(process_utterance(sid, session_info, audio_bytes, filename))
+
+        await sio.emit('audio_received', {'status': 'processing' if utterances else 'buffering'}, to=sid)
+
+    except Exception as e:
+        print(f'❌ Error processing audio chunk: {e}')
+        await sio.emit('error', {'message': f'Error processing audio: {str(e)}'}, to=sid)
+
+
+async def process_utterance(sid, session_info, audio_bytes, filename):
+    """Transcribe one streamed utterance, then stream the reply and its audio back to the client"""
+    session_id = session_info['db_session_id']
+
+    async with session_info['utterance_lock']:
+        try:
+            async with scheduler.slot('transcription'):
+                user_message = await voice_service.transcribe_audio_async(audio_bytes, filename=filename)
+
+            await sio.emit('transcription', {'session_id': session_id, 'text': user_message or ''}, to=sid)
+            if not user_message:
+                return
+
+            await asyncio.to_thread(save_turn, session_id, 'user', user_message)
+            context = await asyncio.to_thread(server._load_context, session_id, user_message)
+
+            parts = []
+            try:
+                async with scheduler.slot('generation'), scheduler.slot('synthesis'):
+                    tokens = ai_service.generate_response_stream_async(user_message, **context)
+                    async for kind, item in speech_pipeline.astream(tokens, voice_name="emma"):
+                        if kind == 'token':
+                            parts.append(item)
+                            await sio.emit('reply_token', {'session_id': session_id, 'token': item}, to=sid)
+                        else:
+                            await sio.emit('audio_segment', {
+                                'session_id': session_id,
+                                'index': item['index'],
+                                'text': item['text'],
+                                'audio_url': item['audio_url']
+                            }, to=sid)
+            finally:
+                assistant_reply = ''.join(parts).strip()
+                if assistant_reply:
+                    await asyncio.to_thread(server._save_reply, session_id, assistant_reply)
+
+            await sio.emit('reply_complete', {'session_id': session_id, 'reply': assistant_reply}, to=sid)
+
+        except StageOverloaded as e:
+            print(f"⚠️  Shedding utterance for client {sid}: {e}")
+            await sio.emit('error', {'message': str(e), 'retry_after': e.retry_after}, to=sid)
+        except Exception as e:
+            print(f'❌ Error processing utterance for client {sid}: {e}')
+            traceback.print_exc()
+            await sio.emit('error', {'message': f'Error processing audio: {str(e)}'}, to=sid)
+        finally:
+            session_info['stream'].release_utterance()
+
+
+@sio.event
+async def chat_message(sid, data):
+    """Stream a text chat reply over the socket as reply_token events"""
+    user_message = (data or {}).get('message')
+    session_id = (data or {}).get('session_id')
+
+    if not user_message:
+        await sio.emit('error', {'message': 'No message provided'}, to=sid)
+        return
+
+    if not session_id:
+        if sid in active_sessions:
+            session_id = active_sessions[sid]['db_session_id']
+        else:
+            session_id = await asyncio.to_thread(create_session)
+            print(f"✅ Created new session: {session_id}")
+
+    try:
+        await asyncio.to_thread(save_turn, session_id, 'user', user_message)
+        context = await asyncio.to_thread(server._load_context, session_id, user_message)
+
+        parts = []
+        async with scheduler.slot('generation'):
+            async for token in ai_service.generate_response_stream_async(user_message, **context):
+                parts.append(token)
+                await sio.emit('reply_token', {'session_id': session_id, 'token': token}, to=sid)
+
+        assistant_reply = ''.join(parts).strip()
+        await asyncio.to_thread(server._save_reply, session_id, assistant_reply)
+
+        await sio.emit('reply_complete', {'session_id': session_id, 'reply': assistant_reply}, to=sid)
+
+    except StageOverloaded as e:
+        print(f"⚠️  Shedding chat message for client {sid}: {e}")
+        await sio.emit('error', {'message': str(e), 'retry_after': e.retry_after}, to=sid)
+    except Exception as e:
+        print(f'❌ Error streaming chat reply: {e}')
+        traceback.print_exc()
+        await sio.emit('error', {'message': f'Error generating reply: {str(e)}'}, to=sid)
+
+
+@sio.event
+async def end_session(sid, data):
+    """End a real-time voice session"""
+    session_info = server._close_active_session(sid)
+    if session_info is None:
+        await sio.emit('error', {'message': 'No active session to end'}, to=sid)
+        return
+
+    session_duration = time.time() - session_info['start_time']
+    print(f'🛑 Ending voice session for client {sid} after {session_duration:.1f} seconds')
+    await sio.emit('session_ended', {
+        'message': 'Voice session ended',
+        'duration': session_duration,
+        'session_id': session_info['db_session_id']
+    }, to=sid)
+
+
+@sio.event
+async def disconnect(sid, *args):
+    """Handle client disconnection"""
+    print(f'❌ Client disconnected: {sid}')
+    if sid in active_sessions:
+        print(f'🧹 Cleaning up session for disconnected client {sid}')
+        server._close_active_session(sid)
+
+
+def serve(host='0.0.0.0', port=8000):
+    """
+    Run uvicorn on the TTS service's event loop
+
+    Edge TTS already lives on that loop, so sockets, Groq calls and
+    synthesis all share one loop (no hand-offs between loops). uvicorn
+    only installs signal handlers on the main thread, so SIGTERM is
+    handled here: the server shuts down gracefully and the write-behind
+    queue is committed before the process exits.
+    """
+    config = uvicorn.Config(application, host=host, port=port, loop='none', log_level='info')
+    uvicorn_server = uvicorn.Server(config)
+
+    def stop(signum, frame):
+        uvicorn_server.should_exit = True
+
+    signal.signal(signal.SIGTERM, stop)
+    future = asyncio.run_coroutine_threadsafe(uvicorn_server.serve(), tts_service.loop)
+    try:
+        future.result()
+    except KeyboardInterrupt:
+        uvicorn_server.should_exit = True
+        future.result(timeout=10)
+    finally:
+        close_database()
+
+
+if __name__ == '__main__':
+    print("\n🎙️ Starting asyncio server on http://0.0.0.0:8000")
+    print("🌐 Frontend should connect from: http://localhost:3000")
+    print("=" * 60)
+    serve()
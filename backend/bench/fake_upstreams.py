@@ -0,0 +1,228 @@
+"""
+Fake Upstreams - local stand-ins for the Groq API and the Edge TTS websocket
+Serves chat completions (plain and streamed), Whisper transcriptions and Edge TTS
+synthesis with configurable latency, jitter and error rates, so benchmarks don't
+depend on (or pay for) the real services
+
+Needs aiohttp:  pip install -r bench/requirements.txt
+Run with:  python -m bench.fake_upstreams --port 8765
+Then start the backend with:
+    GROQ_BASE_URL=http://127.0.0.1:8765
+    EDGE_TTS_WSS_URL=ws://127.0.0.1:8765/edge/v1?TrustedClientToken=bench
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from aiohttp import web, WSMsgType
+
+REPLY = (
+    "ngl that sounds like a lot to carry right now. it makes sense you'd feel stretched thin. "
+    "what's one thing that's been weighing on you the most today?"
+)
+TRANSCRIPT = "I've been feeling really anxious about work lately and I can't sleep."
+
+# A silent MPEG frame stands in for TTS audio (content doesn't matter to the backend)
+_MP3_FRAME = b'\xff\xf3\x64\xc4' + bytes(140)
+
+
+class FakeUpstreams:
+    """
+    aiohttp application implementing the parts of the Groq and Edge TTS protocols the backend uses
+
+    Each latency is `base ± jitter` seconds (uniform). A request fails with
+    HTTP 503 (or a closed websocket) with probability error_rate. The RNG is
+    seeded, so a run with the same settings sees the same delays.
+    """
+
+    def __init__(self, llm_latency=0.35, llm_token_interval=0.02, stt_latency=0.3, tts_latency=0.15,
+                 tts_chunk_interval=0.02, jitter=0.05, error_rate=0.0, reply=REPLY, transcript=TRANSCRIPT, seed=7):
+        self.llm_latency = llm_latency
+        self.llm_token_interval = llm_token_interval
+        self.stt_latency = stt_latency
+        self.tts_latency = tts_latency
+        self.tts_chunk_interval = tts_chunk_interval
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reply = reply
+        self.transcript = transcript
+        self.random = random.Random(seed)
+        self.requests = {'chat': 0, 'chat_stream': 0, 'transcription': 0, 'tts': 0, 'errors': 0}
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/openai/v1/chat/completions', self.chat_completions)
+        app.router.add_post('/openai/v1/audio/transcriptions', self.transcriptions)
+        app.router.add_get('/edge/v1', self.edge_tts)
+        app.router.add_get('/stats', self.stats)
+        return app
+
+    async def _delay(self, base):
+        await asyncio.sleep(max(0.0, base + self.random.uniform(-self.jitter, self.jitter)))
+
+    def _fails(self):
+        if self.random.random() < self.error_rate:
+            self.requests['errors'] += 1
+            return True
+        return False
+
+    def _overloaded(self):
+        return web.json_response(
+            {'error': {'message': 'Service Unavailable (fake upstream)', 'type': 'internal_server_error'}},
+            status=503
+        )
+
+    async def stats(self, request):
+        return web.json_response(self.requests)
+
+    # ------------------------------------------------------------------
+    # Groq
+    # ------------------------------------------------------------------
+    async def chat_completions(self, request):
+        body = await request.json()
+        model = body.get('model', 'fake-model')
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if self._fails():
+            return self._overloaded()
+
+        # Longer prompts take a little longer to prefill
+        prompt_chars = sum(len(message.get('content') or '') for message in body.get('messages', []))
+        await self._delay(self.llm_latency + prompt_chars / 200000)
+
+        if not body.get('stream'):
+            self.requests['chat'] += 1
+            await asyncio.sleep(self.llm_token_interval * len(self.reply.split()))
+            return web.json_response({
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': self.reply},
+                    'finish_reason': 'stop',
+                    'logprobs': None
+                }],
+                'usage': {'prompt_tokens': prompt_chars // 4, 'completion_tokens': len(self.reply) // 4,
+                          'total_tokens': (prompt_chars + len(self.reply)) // 4}
+            })
+
+        self.requests['chat_stream'] += 1
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+
+        def chunk(delta, finish_reason=None):
+            payload = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason, 'logprobs': None}]
+            }
+            return f"data: {json.dumps(payload)}\n\n".encode('utf-8')
+
+        await response.write(chunk({'role': 'assistant', 'content': ''}))
+        for index, word in enumerate(self.reply.split(' ')):
+            if index:
+                await asyncio.sleep(self.llm_token_interval)
+            await response.write(chunk({'content': word if index == 0 else ' ' + word}))
+        await response.write(chunk({}, 'stop'))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def transcriptions(self, request):
+        form = await request.post()
+        if self._fails():
+            return self._overloaded()
+
+        self.requests['transcription'] += 1
+        audio = form.get('file')
+        size = len(audio.file.read()) if audio is not None and hasattr(audio, 'file') else 0
+        # Whisper time grows with the clip length (~32 kB/s of 16 kHz PCM)
+        await self._delay(self.stt_latency + size / 32000 * 0.05)
+
+        if form.get('response_format', 'json') == 'text':
+            return web.Response(text=self.transcript + "\n", content_type='text/plain')
+        return web.json_response({'text': self.transcript})
+
+    # ------------------------------------------------------------------
+    # Edge TTS
+    # ------------------------------------------------------------------
+    async def edge_tts(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        async for message in ws:
+            if message.type != WSMsgType.TEXT or 'Path:ssml' not in message.data:
+                continue
+
+            request_id = uuid.uuid4().hex
+            if self._fails():
+                await ws.close()
+                break
+
+            self.requests['tts'] += 1
+            text = message.data.split('\r\n\r\n', 1)[-1]
+            await ws.send_str(self._text_frame(request_id, 'turn.start', '{}'))
+            await self._delay(self.tts_latency)
+
+            # ~1 s of 48 kbps audio per 15 characters, sent in a few chunks
+            frames = max(1, len(text) // 15) * 40
+            for start in range(0, frames, 40):
+                await ws.send_bytes(self._audio_frame(request_id, _MP3_FRAME * min(40, frames - start)))
+                await asyncio.sleep(self.tts_chunk_interval)
+            await ws.send_str(self._text_frame(request_id, 'turn.end', '{}'))
+
+        return ws
+
+    def _text_frame(self, request_id, path, body):
+        return (
+            f"X-RequestId:{request_id}\r\n"
+            "Content-Type:application/json; charset=utf-8\r\n"
+            f"Path:{path}\r\n\r\n{body}"
+        )
+
+    def _audio_frame(self, request_id, data):
+        # 2-byte header length, headers, then the audio (same framing as the real service)
+        header = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode('utf-8')
+        return len(header).to_bytes(2, 'big') + header + data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake Groq + Edge TTS for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--llm-latency', type=float, default=0.35, help='seconds to first token')
+    parser.add_argument('--llm-token-interval', type=float, default=0.02, help='seconds between streamed tokens')
+    parser.add_argument('--stt-latency', type=float, default=0.3)
+    parser.add_argument('--tts-latency', type=float, default=0.15, help='seconds to first audio chunk')
+    parser.add_argument('--tts-chunk-interval', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.05, help='uniform +/- seconds on every latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    fakes = FakeUpstreams(
+        llm_latency=args.llm_latency,
+        llm_token_interval=args.llm_token_interval,
+        stt_latency=args.stt_latency,
+        tts_latency=args.tts_latency,
+        tts_chunk_interval=args.tts_chunk_interval,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    print(f"🧪 Fake Groq + Edge TTS on http://{args.host}:{args.port}")
+    print(f"   GROQ_BASE_URL=http://{args.host}:{args.port}")
+    print(f"   EDGE_TTS_WSS_URL=ws://{args.host}:{args.port}/edge/v1?TrustedClientToken=bench")
+    web.run_app(fakes.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
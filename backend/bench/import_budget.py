@@ -0,0 +1,100 @@
+"""
+Import Budget - import time of each backend module against a per-module budget
+Imports must stay cheap so the server answers /health quickly after a (re)start;
+heavy clients (Groq, Edge TTS, the LLM) are built later by the service registry
+
+Run with:  python -m bench.import_budget
+Exits non-zero when a module goes over its budget (or fails to import).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budget per module, in milliseconds (a fresh interpreter,
+# so shared dependencies like asyncio and numpy count against every module that uses them)
+BUDGETS_MS = {
+    'database.database': 40,
+    'services.metrics': 10,
+    'services.service_registry': 10,
+    'services.stage_scheduler': 30,
+    'services.emotion_labeler': 15,
+    'services.ai_service': 120,
+    'services.voice_service': 80,
+    'services.audio_preprocess': 20,
+    'services.tts_service': 120,
+    'services.speech_pipeline': 120,
+    'services.knowledge_index': 200,
+}
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)')
+
+
+def measure(module, runs=3):
+    """
+    Cumulative import time of a module in a fresh interpreter (python -X importtime)
+
+    Args:
+        module (str): Dotted module name, importable from the backend directory
+        runs (int): Interpreters started; the fastest run is kept to cut noise
+
+    Returns:
+        float: Milliseconds, or None if the import failed
+    """
+    # No API key: importing must not depend on (or build) any client
+    env = {key: value for key, value in os.environ.items() if key != 'GROQ_API_KEY'}
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.stdout)
+            return None
+        for line in result.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            if match and match.group(3) == module:
+                milliseconds = int(match.group(2)) / 1000
+                best = milliseconds if best is None else min(best, milliseconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check backend import times against their budgets')
+    parser.add_argument('--runs', type=int, default=3, help='interpreters per module (fastest kept)')
+    parser.add_argument('--json', help='also write the measurements to this file')
+    args = parser.parse_args()
+
+    failures = []
+    measurements = {}
+    print(f"   {'module':<30}{'ms':>10}{'budget':>10}")
+    for module, budget in BUDGETS_MS.items():
+        milliseconds = measure(module, args.runs)
+        measurements[module] = {'ms': milliseconds, 'budget_ms': budget}
+        if milliseconds is None:
+            failures.append(module)
+            print(f"❌ {module:<30}{'failed':>10}{budget:>10}")
+        elif milliseconds > budget:
+            failures.append(module)
+            print(f"❌ {module:<30}{milliseconds:>10.1f}{budget:>10}")
+        else:
+            print(f"✅ {module:<30}{milliseconds:>10.1f}{budget:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(measurements, f, indent=2)
+        print(f"💾 Measurements written to {args.json}")
+
+    if failures:
+        print(f"\n❌ Over budget: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ All imports within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Load Driver - concurrent clients against a running backend
+Drives /chat, /voice-chat-complete or the Socket.IO voice flow at a fixed concurrency
+and reports throughput and latency percentiles per stage
+
+Run with:  python -m bench.load --scenario voice --concurrency 16 --requests 200
+(start the backend against bench/fake_upstreams.py first for reproducible numbers)
+The socket scenario needs the Socket.IO async client:  pip install -r bench/requirements.txt
+"""
+import argparse
+import array
+import asyncio
+import io
+import json
+import math
+import threading
+import time
+import wave
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+MESSAGES = [
+    "I've been feeling really anxious about work lately",
+    "I can't sleep and my mind keeps racing at night",
+    "my friend stopped talking to me and I don't know why",
+    "I have exams next week and I'm so stressed",
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def tone_pcm(seconds=1.5, sample_rate=16000, frequency=220, amplitude=6000):
+    """16-bit mono PCM of a steady tone (loud enough for the server-side VAD)"""
+    samples = array.array('h', (
+        int(amplitude * math.sin(2 * math.pi * frequency * i / sample_rate))
+        for i in range(int(seconds * sample_rate))
+    ))
+    return samples.tobytes()
+
+
+def wav_bytes(pcm, sample_rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class Results:
+    """Thread-safe latency samples per stage, plus outcome counts"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.outcomes = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def outcome(self, name):
+        with self._lock:
+            self.outcomes[name] += 1
+
+    def summary(self, wall_time):
+        completed = self.outcomes.get('ok', 0)
+        return {
+            'wall_seconds': round(wall_time, 3),
+            'throughput_rps': round(completed / wall_time, 2) if wall_time else None,
+            'outcomes': dict(self.outcomes),
+            'stages': {
+                stage: {
+                    'count': len(values),
+                    'mean_ms': round(1000 * sum(values) / len(values), 1),
+                    'p50_ms': round(1000 * percentile(values, 50), 1),
+                    'p90_ms': round(1000 * percentile(values, 90), 1),
+                    'p99_ms': round(1000 * percentile(values, 99), 1),
+                    'max_ms': round(1000 * max(values), 1)
+                }
+                for stage, values in sorted(self.samples.items()) if values
+            }
+        }
+
+
+def print_summary(scenario, concurrency, summary):
+    print(f"\n📊 {scenario} @ concurrency {concurrency}: "
+          f"{summary['throughput_rps']} req/s over {summary['wall_seconds']}s  {summary['outcomes']}")
+    print(f"   {'stage':<16}{'count':>7}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for stage, stats in summary['stages'].items():
+        print(f"   {stage:<16}{stats['count']:>7}{stats['mean_ms']:>10}{stats['p50_ms']:>10}"
+              f"{stats['p90_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    print("   (milliseconds)")
+
+
+# ----------------------------------------------------------------------
+# HTTP scenarios
+# ----------------------------------------------------------------------
+def chat_request(http, base_url, index, results, audio):
+    start = time.perf_counter()
+    response = http.post(f"{base_url}/chat", json={'message': MESSAGES[index % len(MESSAGES)]}, timeout=120)
+    results.record('total', time.perf_counter() - start)
+    return response
+
+
+def voice_request(http, base_url, index, results, audio):
+    start = time.perf_counter()
+    response = http.post(
+        f"{base_url}/voice-chat-complete",
+        files={'audio': ('utterance.wav', audio, 'audio/wav')},
+        timeout=120
+    )
+    results.record('total', time.perf_counter() - start)
+    if response.ok:
+        # Server-side step timings, as reported by the endpoint
+        timing = response.json().get('timing', {})
+        for stage in ('transcription', 'ai_generation', 'tts'):
+            if timing.get(stage) is not None:
+                results.record(f"server_{stage}", timing[stage])
+    return response
+
+
+def run_http(scenario, base_url, concurrency, total, results):
+    request_fn = chat_request if scenario == 'chat' else voice_request
+    audio = wav_bytes(tone_pcm())
+    local = threading.local()
+
+    def one(index):
+        if not hasattr(local, 'http'):
+            local.http = requests.Session()
+        try:
+            response = request_fn(local.http, base_url, index, results, audio)
+            if response.ok:
+                results.outcome('ok')
+            else:
+                # 429/503 here are the stage scheduler shedding load
+                results.outcome(f"http_{response.status_code}")
+        except Exception as e:
+            results.outcome(type(e).__name__)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+
+
+# ----------------------------------------------------------------------
+# Socket.IO scenario
+# ----------------------------------------------------------------------
+async def socket_session(base_url, index, results, pcm, timeout):
+    import socketio
+
+    client = socketio.AsyncClient(reconnection=False)
+    events = defaultdict(asyncio.Event)
+    marks = {}
+
+    def mark(event):
+        async def handler(*args):
+            marks.setdefault(event, time.perf_counter())
+            events[event].set()
+        client.on(event, handler)
+
+    for event in ('intro', 'transcription', 'reply_token', 'audio_segment', 'reply_complete', 'error'):
+        mark(event)
+
+    try:
+        start = time.perf_counter()
+        await client.connect(base_url, transports=['websocket'], headers={'Origin': 'http://localhost:3000'})
+        results.record('connect', time.perf_counter() - start)
+
+        sent = time.perf_counter()
+        await client.emit('start_session', {'duration': 5, 'sample_rate': 16000, 'encoding': 'pcm16', 'want_intro': True})
+        await asyncio.wait_for(events['intro'].wait(), timeout)
+        results.record('intro', marks['intro'] - sent)
+
+        sent = time.perf_counter()
+        await client.emit('audio_chunk', {'audio': pcm, 'final': True})
+        await asyncio.wait_for(events['reply_complete'].wait(), timeout)
+        for event, stage in (('transcription', 'transcription'), ('reply_token', 'first_token'),
+                             ('audio_segment', 'first_audio'), ('reply_complete', 'reply_complete')):
+            if event in marks:
+                results.record(stage, marks[event] - sent)
+
+        results.outcome('error_event' if 'error' in marks else 'ok')
+        await client.emit('end_session', {})
+    except Exception as e:
+        results.outcome(type(e).__name__)
+    finally:
+        if client.connected:
+            await client.disconnect()
+
+
+async def run_socket(base_url, concurrency, total, results, timeout=120):
+    pcm = tone_pcm()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with limit:
+            await socket_session(base_url, index, results, pcm, timeout)
+
+    await asyncio.gather(*(one(index) for index in range(total)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the backend with concurrent clients')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', choices=['chat', 'voice', 'socket'], default='chat')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100, help='total requests (sessions for socket)')
+    parser.add_argument('--warmup', type=int, default=2, help='requests sent first and not counted')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    def run(count, results):
+        if args.scenario == 'socket':
+            asyncio.run(run_socket(args.url, args.concurrency, count, results))
+        else:
+            run_http(args.scenario, args.url, args.concurrency, count, results)
+
+    if args.warmup:
+        run(args.warmup, Results())
+
+    results = Results()
+    start = time.perf_counter()
+    run(args.requests, results)
+    summary = results.summary(time.perf_counter() - start)
+    summary.update({'scenario': args.scenario, 'concurrency': args.concurrency, 'requests': args.requests})
+
+    print_summary(args.scenario, args.concurrency, summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Summary written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
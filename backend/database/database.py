@@ -1,43 +1,496 @@
 import sqlite3
 import os
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+import re
 import uuid
+try:
+    from database.write_behind import TurnWriter, sqlite_timestamp
+    from database.session_cache import SessionWindowCache
+    from database import insights
+except ImportError:  # running this file directly as a script
+    from write_behind import TurnWriter, sqlite_timestamp
+    from session_cache import SessionWindowCache
+    import insights
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'mental_health.db')
 
+# Connection tuning
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+CACHED_STATEMENTS = 128        # prepared statements kept per connection
+CACHE_SIZE_KB = 8192           # page cache per connection
+BUSY_TIMEOUT_MS = 5000
+
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE_PATH)
+    """Open a new tuned connection (WAL, relaxed fsync, larger page cache)"""
+    conn = sqlite3.connect(
+        DATABASE_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,  # pooled connections move between request threads
+        cached_statements=CACHED_STATEMENTS
+    )
     conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed while a writer commits
+    conn.execute('PRAGMA journal_mode=WAL')
+    # NORMAL is durable in WAL mode except on power loss, and skips an fsync per commit
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
     return conn
 
+class ConnectionPool:
+    """
+    Fixed-size pool of reusable SQLite connections
+
+    Connections are opened lazily up to `size`; callers beyond that wait
+    for one to be returned. Each connection keeps its own prepared
+    statement cache, so repeated queries skip re-parsing.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; rolled back if the block raises, always returned to the pool"""
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def _acquire(self):
+        if self._closed:
+            raise RuntimeError('Database pool is closed')
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                conn = get_db_connection()
+                self._opened += 1
+                self._all.append(conn)
+                return conn
+
+        return self._idle.get()
+
+    def close(self):
+        """Close every connection (checkpoints the WAL on the last one)"""
+        with self._lock:
+            self._closed = True
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all = []
+            self._opened = 0
+
+_pool = ConnectionPool()
+
+# Optional write-behind turn writer (see enable_write_behind)
+_turn_writer = None
+
+# Optional per-session recent-turns cache (see enable_session_cache)
+_session_cache = None
+
+# Set by init_database when this SQLite build supports FTS5 (see search_turns)
+_fts_enabled = False
+
+def close_database():
+    """Clean shutdown: flush queued turns, then close all pooled connections"""
+    if _turn_writer is not None:
+        _turn_writer.close()
+    _pool.close()
+
+atexit.register(close_database)
+
 def init_database():
     os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
-    conn = get_db_connection()
-    with open(os.path.join(os.path.dirname(__file__), 'schema.sql'), 'r') as f:
-        conn.executescript(f.read())
-    conn.close()
+    with _pool.connection() as conn:
+        existing = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        with open(os.path.join(os.path.dirname(__file__), 'schema.sql'), 'r') as f:
+            conn.executescript(f.read())
+        _migrate(conn)
+        if 'insight_users' not in existing:
+            # Aggregates are new to this database file - compute them from the existing history
+            with conn:
+                insights.rebuild(conn)
+        _init_fts(conn, existing)
     print('✅ Database initialized successfully', flush=True)
 
+def _migrate(conn):
+    """Add columns introduced after a database file was first created"""
+    session_columns = {row['name'] for row in conn.execute('PRAGMA table_info(sessions)')}
+    with conn:
+        if 'summary_through_turn' not in session_columns:
+            conn.execute('ALTER TABLE sessions ADD COLUMN summary_through_turn INTEGER NULL')
+
+def _init_fts(conn, existing):
+    """Create the FTS5 indexes and triggers, indexing existing rows the first time"""
+    global _fts_enabled
+    try:
+        with open(os.path.join(os.path.dirname(__file__), 'fts_schema.sql'), 'r') as f:
+            conn.executescript(f.read())
+    except sqlite3.OperationalError as e:
+        print(f'⚠️  Full-text search disabled (FTS5 unavailable: {e})', flush=True)
+        return
+
+    with conn:
+        for table in ('turns_fts', 'knowledge_base_fts'):
+            if table not in existing:
+                # Index rows written before the triggers existed
+                conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+    _fts_enabled = True
+
+def enable_session_cache(window=20, max_bytes=32 * 1024 * 1024, idle_ttl=1800):
+    """Serve recent-turn reads for active sessions from memory"""
+    global _session_cache
+    if _session_cache is None:
+        _session_cache = SessionWindowCache(window=window, max_bytes=max_bytes, idle_ttl=idle_ttl)
+
+def evict_session_cache(session_id):
+    """Drop a session's cached turns (call when the session ends)"""
+    if _session_cache is not None:
+        _session_cache.evict(session_id)
+
 def create_session(user_id='anonymous'):
     session_id = str(uuid.uuid4())
-    conn = get_db_connection()
-    conn.execute('INSERT INTO sessions (id, user_id) VALUES (?, ?)', (session_id, user_id))
-    conn.commit()
-    conn.close()
+    with _pool.connection() as conn:
+        with conn:
+            conn.execute('INSERT INTO sessions (id, user_id) VALUES (?, ?)', (session_id, user_id))
+            insights.record_session(conn, session_id)
+    if _session_cache is not None:
+        _session_cache.start(session_id)
     return session_id
 
+def enable_write_behind(max_queue=1000, batch_size=100):
+    """
+    Switch save_turn to write-behind mode
+
+    Turns are queued and committed in batches by a background thread;
+    reads in this process still see them immediately.
+    """
+    global _turn_writer
+    if _turn_writer is None:
+        _turn_writer = TurnWriter(_insert_turns, max_queue=max_queue, batch_size=batch_size)
+
+def flush_turns():
+    """Wait until all queued turns are committed (no-op without write-behind)"""
+    if _turn_writer is not None:
+        _turn_writer.flush()
+
+def _insert_turns(turns):
+    """Insert turns in one transaction, filling in each turn's id and updating the insights aggregates"""
+    with _pool.connection() as conn:
+        with conn:
+            for turn in turns:
+                cursor = conn.execute(
+                    'INSERT INTO turns (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)',
+                    (turn['session_id'], turn['role'], turn['content'], turn['timestamp'])
+                )
+                turn['id'] = cursor.lastrowid
+            insights.record_turns(conn, turns)
+
+@contextmanager
+def _turns_snapshot(session_id):
+    """
+    Read turns consistently with the write-behind queue
+
+    Yields the session's pending (uncommitted) turns; queries run inside
+    the block won't overlap a batch commit, so no turn is seen twice.
+    """
+    if _turn_writer is None:
+        yield []
+        return
+    _turn_writer.visibility.acquire_read()
+    try:
+        yield _turn_writer.pending(session_id)
+    finally:
+        _turn_writer.visibility.release_read()
+
 def save_turn(session_id, role, content):
-    conn = get_db_connection()
-    conn.execute('INSERT INTO turns (session_id, role, content) VALUES (?, ?, ?)', (session_id, role, content))
-    conn.commit()
-    conn.close()
+    # The same dict is shared with the session cache and the write-behind
+    # queue, so its id is filled in wherever it is eventually inserted
+    turn = {'id': None, 'session_id': session_id, 'role': role, 'content': content, 'timestamp': sqlite_timestamp()}
+
+    if _turn_writer is None or not _turn_writer.enqueue(turn):
+        _insert_turns([turn])
+
+    # Only once the turn is readable (committed, or pending in the writer): a
+    # concurrent cache miss may have loaded it already, which append() skips
+    if _session_cache is not None:
+        _session_cache.append(session_id, turn)
 
 def get_session_turns(session_id):
-    conn = get_db_connection()
-    cursor = conn.execute('SELECT role, content, timestamp FROM turns WHERE session_id = ? ORDER BY timestamp ASC', (session_id,))
-    turns = cursor.fetchall()
-    conn.close()
-    return turns
+    with _turns_snapshot(session_id) as pending:
+        with _pool.connection() as conn:
+            cursor = conn.execute('SELECT role, content, timestamp FROM turns WHERE session_id = ? ORDER BY timestamp ASC, id ASC', (session_id,))
+            turns = cursor.fetchall()
+    return turns + [{k: t[k] for k in ('role', 'content', 'timestamp')} for t in pending]
+
+def get_recent_turns(session_id, limit=6):
+    """
+    Last `limit` turns of a session as dicts, oldest first
+
+    Served from the session cache when possible; otherwise walks
+    idx_turns_session_timestamp backwards and warms the cache.
+    """
+    fetch = limit
+    version = None
+    if _session_cache is not None:
+        cached = _session_cache.get(session_id, limit)
+        if cached is not None:
+            return cached
+        fetch = max(limit, _session_cache.window)
+        version = _session_cache.version()
+
+    with _turns_snapshot(session_id) as pending:
+        with _pool.connection() as conn:
+            cursor = conn.execute(
+                'SELECT id, role, content, timestamp FROM turns WHERE session_id = ? '
+                'ORDER BY timestamp DESC, id DESC LIMIT ?',
+                (session_id, fetch)
+            )
+            rows = cursor.fetchall()
+    rows.reverse()
+    turns = [dict(row) for row in rows] + pending
+
+    if _session_cache is not None:
+        _session_cache.load(session_id, turns, version)
+    # Copies, like cache hits: pending turns are shared with the writer and the cache
+    return [dict(turn) for turn in turns[-limit:]]
+
+def get_context_turns(session_id, summarized_through=None, limit=20, max_turns=200):
+    """
+    Every turn the rolling summary doesn't cover yet, oldest first
+
+    Normally the last `limit` turns (served like get_recent_turns) already
+    reach back into the summarized part. When they don't - the summarizer
+    is behind or failing - the older unsummarized turns are read too (up to
+    max_turns), so no turn drops out of the context without being summarized.
+    """
+    turns = get_recent_turns(session_id, limit)
+    oldest = turns[0].get('id') if turns else None
+    if len(turns) < limit or oldest is None or (summarized_through and oldest <= summarized_through + 1):
+        return turns
+
+    older = [turn for turn in get_turns_after(session_id, summarized_through or 0, max_turns) if turn['id'] < oldest]
+    return older + turns
+
+def get_turns_after(session_id, after_id=0, limit=200):
+    """Committed turns of a session with id > after_id, oldest first"""
+    with _pool.connection() as conn:
+        rows = conn.execute(
+            'SELECT id, role, content, timestamp FROM turns WHERE session_id = ? AND id > ? '
+            'ORDER BY id ASC LIMIT ?',
+            (session_id, after_id, limit)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def get_session_summary(session_id):
+    """Return (session_summary, summary_through_turn) for a session"""
+    if _session_cache is not None:
+        found, summary = _session_cache.get_summary(session_id)
+        if found:
+            return summary
+
+    with _pool.connection() as conn:
+        row = conn.execute(
+            'SELECT session_summary, summary_through_turn FROM sessions WHERE id = ?', (session_id,)
+        ).fetchone()
+    summary = (row['session_summary'], row['summary_through_turn']) if row else (None, None)
+
+    if _session_cache is not None:
+        _session_cache.set_summary(session_id, *summary)
+    return summary
+
+def update_session_summary(session_id, summary, summarized_through):
+    """Store a session's rolling summary and the id of the last turn it covers"""
+    with _pool.connection() as conn:
+        with conn:
+            conn.execute(
+                'UPDATE sessions SET session_summary = ?, summary_through_turn = ? WHERE id = ?',
+                (summary, summarized_through, session_id)
+            )
+    if _session_cache is not None:
+        _session_cache.set_summary(session_id, summary, summarized_through)
+
+def get_session_turns_page(session_id, cursor=None, limit=50):
+    """
+    Page through a session's full history, oldest first
+
+    `cursor` is the next_cursor from the previous page (None for the first
+    page). Returns (turns, next_cursor); next_cursor is None on the last page.
+    """
+    with _turns_snapshot(session_id) as pending, _pool.connection() as conn:
+        if cursor:
+            timestamp, _, last_id = cursor.rpartition('|')
+            rows = conn.execute(
+                'SELECT id, role, content, timestamp FROM turns '
+                'WHERE session_id = ? AND (timestamp, id) > (?, ?) '
+                'ORDER BY timestamp ASC, id ASC LIMIT ?',
+                (session_id, timestamp, int(last_id), limit + 1)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT id, role, content, timestamp FROM turns WHERE session_id = ? '
+                'ORDER BY timestamp ASC, id ASC LIMIT ?',
+                (session_id, limit + 1)
+            ).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f'{rows[-1]["timestamp"]}|{rows[-1]["id"]}'
+    elif pending:
+        # Queued turns have no id yet, so they can only ever appear on the last page
+        rows = rows + [{k: t[k] for k in ('id', 'role', 'content', 'timestamp')} for t in pending]
+    return rows, next_cursor
+
+def add_knowledge_entry(title, content, category=None, tags=None):
+    """Insert a knowledge_base row and return its id"""
+    entry_id = str(uuid.uuid4())
+    with _pool.connection() as conn:
+        with conn:
+            conn.execute(
+                'INSERT INTO knowledge_base (id, title, content, category, tags) VALUES (?, ?, ?, ?, ?)',
+                (entry_id, title, content, category, tags)
+            )
+    return entry_id
+
+def get_knowledge_entries(ids=None):
+    """
+    knowledge_base rows as dicts
+
+    With `ids`, only those rows are returned, in the order given (unknown
+    ids are skipped); otherwise every row, oldest first.
+    """
+    with _pool.connection() as conn:
+        if ids is None:
+            rows = conn.execute(
+                'SELECT id, title, content, category, tags FROM knowledge_base ORDER BY created_at ASC, id ASC'
+            ).fetchall()
+            return [dict(row) for row in rows]
+        if not ids:
+            return []
+        placeholders = ', '.join('?' * len(ids))
+        rows = conn.execute(
+            f'SELECT id, title, content, category, tags FROM knowledge_base WHERE id IN ({placeholders})',
+            list(ids)
+        ).fetchall()
+    by_id = {row['id']: dict(row) for row in rows}
+    return [by_id[entry_id] for entry_id in ids if entry_id in by_id]
+
+def get_unlabeled_turns(limit=64):
+    """Oldest committed user turns without emotion labels, as dicts with id and content"""
+    with _pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT id, content FROM turns WHERE role = 'user' AND emotion_labels IS NULL ORDER BY id LIMIT ?",
+            (limit,)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def apply_emotion_labels(labelled):
+    """
+    Store emotion labels for turns and update the insights aggregates
+
+    Args:
+        labelled (list): (turn_id, [{label, score}, ...]) pairs
+
+    Returns:
+        int: Number of turns newly labelled (already-labelled turns are skipped)
+    """
+    with _pool.connection() as conn:
+        with conn:
+            return insights.record_emotions(conn, labelled)
+
+def get_insights(user_id='anonymous', days=30, sessions=30, words=50):
+    """Precomputed insights for a user (see database/insights.py)"""
+    with _pool.connection() as conn:
+        return insights.read_insights(conn, user_id, days=days, sessions=sessions, words=words)
+
+def fts_available():
+    """Whether search_turns / search_knowledge can be used"""
+    return _fts_enabled
+
+def _fts_query(text):
+    """
+    Turn free text into a safe FTS5 query
+
+    Every word must match (implicit AND) and the last word also matches as
+    a prefix, so results show up while the user is still typing. Quoting
+    each word keeps FTS5 operators and punctuation in the input inert.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def search_turns(text, session_id, limit=20, offset=0):
+    """
+    Full-text search over one session's committed turns, best match first
+
+    Search is always scoped to a session: an unscoped query would hand out
+    other users' turns (and the session ids that open their transcripts).
+
+    Args:
+        text (str): Free-text query
+        session_id (str): Session to search
+        limit (int): Page size
+        offset (int): Results to skip
+
+    Returns:
+        tuple: (results, has_more); each result carries a highlighted snippet
+    """
+    if not session_id:
+        raise ValueError('search_turns needs a session_id')
+    query = _fts_query(text)
+    if query is None:
+        return [], False
+
+    with _pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT t.id, t.session_id, t.role, t.timestamp, "
+            "snippet(turns_fts, 0, '<mark>', '</mark>', '…', 16) AS snippet, bm25(turns_fts) AS score "
+            "FROM turns_fts JOIN turns t ON t.id = turns_fts.rowid "
+            "WHERE turns_fts MATCH ? AND t.session_id = ? ORDER BY score LIMIT ? OFFSET ?",
+            (query, session_id, limit + 1, offset)
+        ).fetchall()
+    return [dict(row) for row in rows[:limit]], len(rows) > limit
+
+def search_knowledge(text, limit=20, offset=0):
+    """Full-text search over knowledge_base titles and content; returns (results, has_more)"""
+    query = _fts_query(text)
+    if query is None:
+        return [], False
+
+    with _pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT k.id, k.title, k.category, "
+            "snippet(knowledge_base_fts, 1, '<mark>', '</mark>', '…', 16) AS snippet, "
+            "bm25(knowledge_base_fts, 2.0, 1.0) AS score "
+            "FROM knowledge_base_fts JOIN knowledge_base k ON k.rowid = knowledge_base_fts.rowid "
+            "WHERE knowledge_base_fts MATCH ? ORDER BY score LIMIT ? OFFSET ?",
+            (query, limit + 1, offset)
+        ).fetchall()
+    return [dict(row) for row in rows[:limit]], len(rows) > limit
 
 if __name__ == '__main__':
     print(' Testing database functionality...', flush=True)
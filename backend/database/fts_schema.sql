@@ -0,0 +1,46 @@
+-- Full-text search over conversation turns and the knowledge base (requires FTS5)
+-- External-content tables: the text lives in turns / knowledge_base only and
+-- the triggers below keep the indexes in sync with every insert, update and delete
+
+CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+    content,
+    content='turns',
+    content_rowid='id',
+    tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS turns_fts_insert AFTER INSERT ON turns BEGIN
+    INSERT INTO turns_fts (rowid, content) VALUES (new.id, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS turns_fts_delete AFTER DELETE ON turns BEGIN
+    INSERT INTO turns_fts (turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS turns_fts_update AFTER UPDATE OF content ON turns BEGIN
+    INSERT INTO turns_fts (turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO turns_fts (rowid, content) VALUES (new.id, new.content);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_base_fts USING fts5(
+    title,
+    content,
+    content='knowledge_base',
+    content_rowid='rowid',
+    tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS knowledge_base_fts_insert AFTER INSERT ON knowledge_base BEGIN
+    INSERT INTO knowledge_base_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS knowledge_base_fts_delete AFTER DELETE ON knowledge_base BEGIN
+    INSERT INTO knowledge_base_fts (knowledge_base_fts, rowid, title, content)
+    VALUES ('delete', old.rowid, old.title, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS knowledge_base_fts_update AFTER UPDATE OF title, content ON knowledge_base BEGIN
+    INSERT INTO knowledge_base_fts (knowledge_base_fts, rowid, title, content)
+    VALUES ('delete', old.rowid, old.title, old.content);
+    INSERT INTO knowledge_base_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
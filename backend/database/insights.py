@@ -0,0 +1,413 @@
+import json
+import math
+import re
+from collections import Counter, defaultdict
+
+# Same grouping as the Insights page (insightsDataUtils.js)
+POSITIVE_EMOTIONS = frozenset(['joy', 'surprise'])
+NEGATIVE_EMOTIONS = frozenset(['sadness', 'anger', 'fear', 'anxiety'])
+
+# Word-cloud stop words, matching generateWordCloudData
+CLOUD_STOP_WORDS = frozenset([
+    'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'i', 'me', 'my',
+    'you', 'your', 'it', 'this', 'that', 'to', 'in', 'on', 'for', 'with', 'as', 'be',
+    'have', 'has', 'had', 'do', 'does', 'did', 'of', 'at', 'by', 'from', 'about', 'can',
+    'could', 'would', 'should', 'been', 'being', 'will', 'shall', 'may', 'might', 'must',
+    'very', 'just', 'only', 'also', 'not', 'no', 'yes', 'what', 'which', 'who', 'when',
+    'where', 'why', 'how', 'all', 'each', 'every', 'both', 'few', 'more', 'most', 'other',
+    'some', 'such', 'than', 'too', 'up', 'out', 'if', 'into', 'through', 'during', 'before'
+])
+
+REBUILD_CHUNK = 1000
+
+
+def cloud_words(text):
+    """Words of a user message that count towards the word cloud"""
+    words = re.sub(r'[^\w\s]', '', text.lower()).split()
+    return [word for word in words if len(word) > 3 and word not in CLOUD_STOP_WORDS]
+
+
+def sentiment_bucket(label):
+    if label in POSITIVE_EMOTIONS:
+        return 'positive'
+    if label in NEGATIVE_EMOTIONS:
+        return 'negative'
+    return 'neutral'
+
+
+def record_session(conn, session_id):
+    """Count a newly created session (call inside the creating transaction)"""
+    conn.execute(
+        'INSERT OR IGNORE INTO insight_sessions (session_id, user_id, started_at) '
+        'SELECT id, user_id, started_at FROM sessions WHERE id = ?',
+        (session_id,)
+    )
+    conn.execute(
+        'INSERT INTO insight_users (user_id, sessions, first_activity, last_activity) '
+        'SELECT user_id, 1, started_at, started_at FROM sessions WHERE id = ? '
+        'ON CONFLICT (user_id) DO UPDATE SET sessions = sessions + 1, '
+        'last_activity = MAX(last_activity, excluded.last_activity)',
+        (session_id,)
+    )
+    row = conn.execute('SELECT user_id FROM sessions WHERE id = ?', (session_id,)).fetchone()
+    if row is not None:
+        _advance_split(conn, row['user_id'])
+
+
+def record_turns(conn, turns):
+    """
+    Fold newly inserted turns into the aggregates (call inside the inserting transaction)
+
+    Args:
+        turns (list): Dicts with session_id, role, content and timestamp
+    """
+    owners = _session_owners(conn, {turn['session_id'] for turn in turns})
+
+    users = defaultdict(lambda: [0, 0, 0, None])   # user_id -> turns, user_turns, words, last_activity
+    sessions = defaultdict(lambda: [0, 0])         # session_id -> turns, user_turns
+    days = defaultdict(lambda: [0, 0])             # (user_id, day) -> turns, user_turns
+    words = Counter()                              # (user_id, word) -> count
+
+    for turn in turns:
+        user_id = owners.get(turn['session_id'])
+        if user_id is None:
+            continue
+        is_user = turn['role'] == 'user'
+        timestamp = str(turn['timestamp'])
+
+        user = users[user_id]
+        user[0] += 1
+        user[1] += is_user
+        user[3] = max(user[3] or timestamp, timestamp)
+        sessions[turn['session_id']][0] += 1
+        sessions[turn['session_id']][1] += is_user
+        day = days[(user_id, timestamp[:10])]
+        day[0] += 1
+        day[1] += is_user
+
+        if is_user:
+            turn_words = cloud_words(turn['content'])
+            user[2] += len(turn_words)
+            words.update((user_id, word) for word in turn_words)
+
+    conn.executemany(
+        'INSERT INTO insight_users (user_id, turns, user_turns, words, first_activity, last_activity) '
+        'VALUES (?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (user_id) DO UPDATE SET turns = turns + excluded.turns, '
+        'user_turns = user_turns + excluded.user_turns, words = words + excluded.words, '
+        'last_activity = MAX(COALESCE(last_activity, excluded.last_activity), excluded.last_activity)',
+        [(user_id, n, nu, nw, last, last) for user_id, (n, nu, nw, last) in users.items()]
+    )
+    conn.executemany(
+        'UPDATE insight_sessions SET turns = turns + ?, user_turns = user_turns + ? WHERE session_id = ?',
+        [(n, nu, session_id) for session_id, (n, nu) in sessions.items()]
+    )
+    conn.executemany(
+        'INSERT INTO insight_daily (user_id, day, turns, user_turns) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT (user_id, day) DO UPDATE SET turns = turns + excluded.turns, '
+        'user_turns = user_turns + excluded.user_turns',
+        [(user_id, day, n, nu) for (user_id, day), (n, nu) in days.items()]
+    )
+    conn.executemany(
+        'INSERT INTO insight_words (user_id, word, count) VALUES (?, ?, ?) '
+        'ON CONFLICT (user_id, word) DO UPDATE SET count = count + excluded.count',
+        [(user_id, word, count) for (user_id, word), count in words.items()]
+    )
+
+
+def record_emotions(conn, labelled):
+    """
+    Store emotion labels on turns and fold them into the aggregates
+
+    Turns that already carry labels are skipped, so re-labelling the same
+    turn never counts it twice.
+
+    Args:
+        labelled (list): (turn_id, labels) pairs; labels are [{label, score}, ...]
+
+    Returns:
+        int: Number of turns labelled
+    """
+    stored = []
+    for turn_id, labels in labelled:
+        cursor = conn.execute(
+            'UPDATE turns SET emotion_labels = ? WHERE id = ? AND emotion_labels IS NULL',
+            (json.dumps(labels), turn_id)
+        )
+        if cursor.rowcount:
+            stored.append((turn_id, labels))
+    _count_emotions(conn, stored)
+    return len(stored)
+
+
+def _count_emotions(conn, labelled):
+    if not labelled:
+        return
+    ids = [turn_id for turn_id, _ in labelled]
+    rows = conn.execute(
+        'SELECT t.id, t.session_id, t.timestamp, s.user_id FROM turns t JOIN sessions s ON s.id = t.session_id '
+        f'WHERE t.id IN ({", ".join("?" * len(ids))})',
+        ids
+    ).fetchall()
+    owners = {row['id']: row for row in rows}
+
+    emotions = defaultdict(lambda: [0, 0.0])   # (user_id, label) -> count, score_sum
+    sentiment = defaultdict(Counter)           # session or (user_id, day) -> positive/negative/neutral
+    joys = Counter()                           # session_id -> joy labels
+    for turn_id, labels in labelled:
+        row = owners.get(turn_id)
+        if row is None:
+            continue
+        for label in labels:
+            emotion = emotions[(row['user_id'], label['label'])]
+            emotion[0] += 1
+            emotion[1] += float(label.get('score', 0))
+            bucket = sentiment_bucket(label['label'])
+            sentiment[('session', row['session_id'])][bucket] += 1
+            sentiment[('day', row['user_id'], str(row['timestamp'])[:10])][bucket] += 1
+            joys[row['session_id']] += label['label'] == 'joy'
+
+    # Session state before this batch, to spot sessions that just got their first positive/joy label
+    session_ids = [key[1] for key in sentiment if key[0] == 'session']
+    before = {}
+    if session_ids:
+        before = {row['session_id']: row for row in conn.execute(
+            'SELECT rowid AS seq, session_id, user_id, started_at, positive, joy FROM insight_sessions '
+            f'WHERE session_id IN ({", ".join("?" * len(session_ids))})',
+            session_ids
+        ).fetchall()}
+
+    conn.executemany(
+        'INSERT INTO insight_emotions (user_id, emotion, count, score_sum) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT (user_id, emotion) DO UPDATE SET count = count + excluded.count, '
+        'score_sum = score_sum + excluded.score_sum',
+        [(user_id, label, count, score) for (user_id, label), (count, score) in emotions.items()]
+    )
+    for key, counts in sentiment.items():
+        values = (counts['positive'], counts['negative'], counts['neutral'])
+        if key[0] == 'session':
+            conn.execute(
+                'UPDATE insight_sessions SET positive = positive + ?, negative = negative + ?, '
+                'neutral = neutral + ?, joy = joy + ? WHERE session_id = ?',
+                values + (joys[key[1]], key[1])
+            )
+        else:
+            conn.execute(
+                'INSERT INTO insight_daily (user_id, day, positive, negative, neutral) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (user_id, day) DO UPDATE SET positive = positive + excluded.positive, '
+                'negative = negative + excluded.negative, neutral = neutral + excluded.neutral',
+                (key[1], key[2]) + values
+            )
+
+    # Labels are only ever added, so a session's flags only go from 0 to 1
+    for session_id, row in before.items():
+        if not row['positive'] and sentiment[('session', session_id)]['positive']:
+            _extend_positive_streak(conn, row)
+        if not row['joy'] and joys[session_id]:
+            _count_joy_session(conn, row)
+
+
+def _milestones(conn, user_id):
+    conn.execute('INSERT OR IGNORE INTO insight_milestones (user_id) VALUES (?)', (user_id,))
+    return conn.execute('SELECT * FROM insight_milestones WHERE user_id = ?', (user_id,)).fetchone()
+
+
+def _extend_positive_streak(conn, session):
+    """
+    A session just became positive: measure the run of positive sessions around it
+
+    Runs only ever grow or merge, so the longest one so far stays a valid
+    maximum. Both boundary lookups walk idx_insight_sessions_user from the
+    session outwards, so the cost is the length of the run.
+    """
+    position = (session['started_at'], session['seq'])
+    previous = conn.execute(
+        'SELECT started_at, rowid AS seq FROM insight_sessions WHERE user_id = ? AND positive = 0 '
+        'AND (started_at, rowid) < (?, ?) ORDER BY started_at DESC, rowid DESC LIMIT 1',
+        (session['user_id'],) + position
+    ).fetchone()
+    following = conn.execute(
+        'SELECT started_at, rowid AS seq FROM insight_sessions WHERE user_id = ? AND positive = 0 '
+        'AND (started_at, rowid) > (?, ?) ORDER BY started_at ASC, rowid ASC LIMIT 1',
+        (session['user_id'],) + position
+    ).fetchone()
+
+    sql = 'SELECT COUNT(*) FROM insight_sessions WHERE user_id = ?'
+    params = [session['user_id']]
+    if previous is not None:
+        sql += ' AND (started_at, rowid) > (?, ?)'
+        params += [previous['started_at'], previous['seq']]
+    if following is not None:
+        sql += ' AND (started_at, rowid) < (?, ?)'
+        params += [following['started_at'], following['seq']]
+    run = conn.execute(sql, params).fetchone()[0]
+
+    _milestones(conn, session['user_id'])
+    conn.execute(
+        'UPDATE insight_milestones SET max_positive_streak = MAX(max_positive_streak, ?) WHERE user_id = ?',
+        (run, session['user_id'])
+    )
+
+
+def _count_joy_session(conn, session):
+    """A session just got its first joy label: count it, and in the first half if it falls there"""
+    state = _milestones(conn, session['user_id'])
+    in_first_half = state['split_seq'] is not None and (
+        (str(session['started_at']), session['seq']) <= (str(state['split_started_at']), state['split_seq'])
+    )
+    conn.execute(
+        'UPDATE insight_milestones SET joy_sessions = joy_sessions + 1, '
+        'joy_first_half = joy_first_half + ? WHERE user_id = ?',
+        (int(in_first_half), session['user_id'])
+    )
+
+
+def _advance_split(conn, user_id):
+    """Move the end of the first half forward as the user's session count grows"""
+    users = conn.execute('SELECT sessions FROM insight_users WHERE user_id = ?', (user_id,)).fetchone()
+    state = _milestones(conn, user_id)
+    target = ((users['sessions'] if users else 0) + 1) // 2
+    count, started_at, seq, joy_first_half = (
+        state['split_sessions'], state['split_started_at'], state['split_seq'], state['joy_first_half']
+    )
+
+    # New sessions are appended at the end, so this takes at most one step per session
+    while count < target:
+        if seq is None:
+            following = conn.execute(
+                'SELECT started_at, rowid AS seq, joy FROM insight_sessions WHERE user_id = ? '
+                'ORDER BY started_at ASC, rowid ASC LIMIT 1',
+                (user_id,)
+            ).fetchone()
+        else:
+            following = conn.execute(
+                'SELECT started_at, rowid AS seq, joy FROM insight_sessions WHERE user_id = ? '
+                'AND (started_at, rowid) > (?, ?) ORDER BY started_at ASC, rowid ASC LIMIT 1',
+                (user_id, started_at, seq)
+            ).fetchone()
+        if following is None:
+            break
+        count += 1
+        started_at, seq = following['started_at'], following['seq']
+        joy_first_half += following['joy'] > 0
+
+    conn.execute(
+        'UPDATE insight_milestones SET split_sessions = ?, split_started_at = ?, split_seq = ?, '
+        'joy_first_half = ? WHERE user_id = ?',
+        (count, started_at, seq, joy_first_half, user_id)
+    )
+
+
+def _session_owners(conn, session_ids):
+    if not session_ids:
+        return {}
+    session_ids = list(session_ids)
+    rows = conn.execute(
+        f'SELECT id, user_id FROM sessions WHERE id IN ({", ".join("?" * len(session_ids))})',
+        session_ids
+    ).fetchall()
+    return {row['id']: row['user_id'] for row in rows}
+
+
+def rebuild(conn):
+    """Recompute every aggregate from sessions and turns (first run, or after a repair)"""
+    for table in ('insight_users', 'insight_sessions', 'insight_daily', 'insight_emotions', 'insight_words',
+                  'insight_milestones'):
+        conn.execute(f'DELETE FROM {table}')
+
+    # In creation order, like record_session (rowid breaks started_at ties)
+    conn.execute(
+        'INSERT INTO insight_sessions (session_id, user_id, started_at) '
+        'SELECT id, user_id, started_at FROM sessions ORDER BY started_at, rowid'
+    )
+    conn.execute(
+        'INSERT INTO insight_users (user_id, sessions, first_activity, last_activity) '
+        'SELECT user_id, COUNT(*), MIN(started_at), MAX(started_at) FROM sessions GROUP BY user_id'
+    )
+    for row in conn.execute('SELECT user_id FROM insight_users').fetchall():
+        _advance_split(conn, row['user_id'])
+
+    cursor = conn.execute('SELECT id, session_id, role, content, timestamp, emotion_labels FROM turns ORDER BY id')
+    while True:
+        rows = cursor.fetchmany(REBUILD_CHUNK)
+        if not rows:
+            break
+        record_turns(conn, [dict(row) for row in rows])
+        _count_emotions(conn, [
+            (row['id'], json.loads(row['emotion_labels'])) for row in rows if row['emotion_labels']
+        ])
+
+
+def read_insights(conn, user_id, days=30, sessions=30, words=50):
+    """
+    Precomputed insights for one user
+
+    Every metric is a primary-key or index range read on an aggregate
+    table, so the cost doesn't grow with the user's history.
+    """
+    totals = conn.execute('SELECT * FROM insight_users WHERE user_id = ?', (user_id,)).fetchone()
+    totals = dict(totals) if totals else {
+        'user_id': user_id, 'sessions': 0, 'turns': 0, 'user_turns': 0, 'words': 0,
+        'first_activity': None, 'last_activity': None
+    }
+
+    emotion_rows = conn.execute(
+        'SELECT emotion, count, score_sum FROM insight_emotions WHERE user_id = ? ORDER BY count DESC',
+        (user_id,)
+    ).fetchall()
+    total_labels = sum(row['count'] for row in emotion_rows)
+    emotions = [{
+        'label': row['emotion'],
+        'count': row['count'],
+        'percentage': round(100 * row['count'] / total_labels, 1),
+        'avg_score': round(row['score_sum'] / row['count'], 3)
+    } for row in emotion_rows]
+
+    daily = conn.execute(
+        'SELECT day, turns, user_turns, positive, negative, neutral FROM insight_daily '
+        'WHERE user_id = ? ORDER BY day DESC LIMIT ?',
+        (user_id, days)
+    ).fetchall()
+    session_rows = conn.execute(
+        'SELECT session_id, started_at, turns, user_turns, positive, negative, neutral FROM insight_sessions '
+        'WHERE user_id = ? ORDER BY started_at DESC LIMIT ?',
+        (user_id, sessions)
+    ).fetchall()
+    word_rows = conn.execute(
+        'SELECT word, count FROM insight_words WHERE user_id = ? ORDER BY count DESC LIMIT ?',
+        (user_id, words)
+    ).fetchall()
+
+    milestones = conn.execute('SELECT * FROM insight_milestones WHERE user_id = ?', (user_id,)).fetchone()
+
+    def with_sentiment(row):
+        item = dict(row)
+        item['sentiment'] = item['positive'] - item['negative']
+        return item
+
+    return {
+        'totals': totals,
+        'emotion_distribution': emotions,
+        'dominant_emotion': emotions[0]['label'] if emotions else None,
+        'avg_messages_per_session': round(totals['turns'] / totals['sessions']) if totals['sessions'] else 0,
+        'sentiment_by_day': [with_sentiment(row) for row in reversed(daily)],
+        'sentiment_by_session': [with_sentiment(row) for row in reversed(session_rows)],
+        'word_cloud': [{'text': row['word'], 'value': row['count']} for row in word_rows],
+        'milestones': _read_milestones(milestones, totals['sessions'])
+    }
+
+
+def _read_milestones(milestones, sessions):
+    """Positive streak and joy improvement, as calculateSessionMilestones computes them"""
+    if milestones is None:
+        return {'positive_streak': 0, 'joy_improvement': None}
+
+    # Joy improvement needs more than 6 sessions; the first half is the older ceil(n / 2)
+    joy_improvement = None
+    first_half = (sessions + 1) // 2
+    if sessions > 6:
+        second = milestones['joy_sessions'] - milestones['joy_first_half']
+        # Math.round: halves round up
+        joy_improvement = math.floor(100 * (second - milestones['joy_first_half']) / first_half + 0.5)
+
+    return {'positive_streak': milestones['max_positive_streak'], 'joy_improvement': joy_improvement}
@@ -5,7 +5,8 @@ CREATE TABLE IF NOT EXISTS sessions (
     started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     ended_at TIMESTAMP NULL,
     user_id TEXT DEFAULT 'anonymous',
-    session_summary TEXT NULL
+    session_summary TEXT NULL,
+    summary_through_turn INTEGER NULL
 );
 
 CREATE TABLE IF NOT EXISTS turns (
@@ -27,3 +28,72 @@ CREATE TABLE IF NOT EXISTS knowledge_base (
     tags TEXT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- History reads filter by session and order by time
+CREATE INDEX IF NOT EXISTS idx_turns_session_timestamp ON turns (session_id, timestamp);
+
+-- The emotion labeler's work queue: user turns that have no labels yet
+CREATE INDEX IF NOT EXISTS idx_turns_unlabeled ON turns (id) WHERE role = 'user' AND emotion_labels IS NULL;
+
+-- Insights aggregates, maintained incrementally as sessions, turns and emotion labels are written
+CREATE TABLE IF NOT EXISTS insight_users (
+    user_id TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    turns INTEGER NOT NULL DEFAULT 0,
+    user_turns INTEGER NOT NULL DEFAULT 0,
+    words INTEGER NOT NULL DEFAULT 0,
+    first_activity TIMESTAMP NULL,
+    last_activity TIMESTAMP NULL
+);
+
+CREATE TABLE IF NOT EXISTS insight_sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    started_at TIMESTAMP,
+    turns INTEGER NOT NULL DEFAULT 0,
+    user_turns INTEGER NOT NULL DEFAULT 0,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    neutral INTEGER NOT NULL DEFAULT 0,
+    joy INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_insight_sessions_user ON insight_sessions (user_id, started_at);
+
+CREATE TABLE IF NOT EXISTS insight_daily (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    turns INTEGER NOT NULL DEFAULT 0,
+    user_turns INTEGER NOT NULL DEFAULT 0,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    neutral INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS insight_emotions (
+    user_id TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, emotion)
+);
+
+CREATE TABLE IF NOT EXISTS insight_words (
+    user_id TEXT NOT NULL,
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, word)
+);
+CREATE INDEX IF NOT EXISTS idx_insight_words_top ON insight_words (user_id, count);
+
+-- Milestones (Insights page): longest run of sessions with a positive emotion, and joy
+-- sessions in the first half of the user's sessions (split_* is the last session of that half)
+CREATE TABLE IF NOT EXISTS insight_milestones (
+    user_id TEXT PRIMARY KEY,
+    max_positive_streak INTEGER NOT NULL DEFAULT 0,
+    joy_sessions INTEGER NOT NULL DEFAULT 0,
+    joy_first_half INTEGER NOT NULL DEFAULT 0,
+    split_sessions INTEGER NOT NULL DEFAULT 0,
+    split_started_at TIMESTAMP NULL,
+    split_seq INTEGER NULL
+);
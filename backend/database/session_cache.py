@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Rough per-turn bookkeeping overhead on top of the message text
+TURN_OVERHEAD_BYTES = 200
+
+
+class SessionWindowCache:
+    """
+    In-process cache of each active session's most recent turns
+
+    Every entry holds the newest `window` turns of its session (or all of
+    them, if there are fewer), so any read of up to `window` recent turns
+    can be answered from memory. That only holds while this process sees
+    every save_turn for the session, which is true for the single-process
+    server; entries are kept current by append() and dropped on session
+    end, after idle_ttl seconds, or least-recently-used first once the
+    cache exceeds max_bytes.
+    """
+
+    # Markers for saves to uncached sessions; older ones are forgotten past this
+    MAX_UNCACHED_MARKERS = 10000
+
+    def __init__(self, window=20, max_bytes=32 * 1024 * 1024, idle_ttl=1800):
+        self.window = window
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+
+        self._entries = OrderedDict()  # session_id -> _Entry, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        # Guards load() against racing saves: a load that read the database
+        # before a save to an uncached session must not install stale turns
+        self._seq = 0
+        self._uncached_saves = OrderedDict()  # session_id -> seq of last save while uncached
+        self._pruned_seq = 0
+
+        self.hits = 0
+        self.misses = 0
+        print(f'✅ Session window cache ready ({window} turns/session, {max_bytes // (1024 * 1024)} MB)', flush=True)
+
+    def get(self, session_id, limit):
+        """Return the last `limit` turns (oldest first) or None if they aren't cached"""
+        if limit > self.window:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or self._expired(entry):
+                if entry is not None:
+                    self._remove(session_id)
+                self.misses += 1
+                return None
+            self._touch(session_id, entry)
+            self.hits += 1
+            turns = list(entry.turns)[-limit:] if limit else []
+            return [dict(turn) for turn in turns]
+
+    def start(self, session_id):
+        """Register a brand-new session (its empty history is complete)"""
+        self.load(session_id, [])
+        self.set_summary(session_id, None, None)
+
+    def version(self):
+        """Take before reading the database; pass to load()"""
+        with self._lock:
+            return self._seq
+
+    def load(self, session_id, turns, version=None):
+        """
+        Populate an entry from the newest turns read from the database (oldest first)
+
+        If `version` is given and the session saved a turn since it was
+        taken, the read may be stale and is not cached. Turns are kept as
+        given (not copied): pending write-behind turns are the writer's own
+        dicts, and their ids are filled in when they are committed.
+        """
+        with self._lock:
+            if session_id in self._entries:
+                # Already cached and kept current by append()
+                return
+            if version is not None and (
+                    self._pruned_seq > version or self._uncached_saves.get(session_id, -1) > version):
+                return
+            self._uncached_saves.pop(session_id, None)
+            entry = _Entry(self.window)
+            for turn in turns[-self.window:]:
+                entry.push(turn)
+            self._entries[session_id] = entry
+            self._total_bytes += entry.bytes
+            self._enforce_budget()
+
+    def append(self, session_id, turn):
+        """Record a newly saved turn; ignored for sessions that aren't cached"""
+        with self._lock:
+            self._seq += 1
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self._uncached_saves[session_id] = self._seq
+                self._uncached_saves.move_to_end(session_id)
+                if len(self._uncached_saves) > self.MAX_UNCACHED_MARKERS:
+                    _, self._pruned_seq = self._uncached_saves.popitem(last=False)
+                return
+            if entry.contains(turn):
+                # A load() that raced with the save already picked this turn up
+                self._touch(session_id, entry)
+                return
+            before = entry.bytes
+            # Stored as-is: save_turn fills in the id once the row is inserted
+            entry.push(turn)
+            self._total_bytes += entry.bytes - before
+            self._touch(session_id, entry)
+            self._enforce_budget()
+
+    def get_summary(self, session_id):
+        """Return (found, (summary, summarized_through)) for a cached session"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry.summary is _UNKNOWN:
+                return False, None
+            return True, entry.summary
+
+    def set_summary(self, session_id, summary, summarized_through):
+        """Remember a session's rolling summary; ignored for sessions that aren't cached"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.summary = (summary, summarized_through)
+
+    def evict(self, session_id):
+        """Drop a session (e.g. when it ends)"""
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _expired(self, entry):
+        return time.time() - entry.last_access > self.idle_ttl
+
+    def _touch(self, session_id, entry):
+        entry.last_access = time.time()
+        self._entries.move_to_end(session_id)
+
+    def _enforce_budget(self):
+        """Drop idle entries, then least-recently-used ones until under max_bytes (lock held)"""
+        # LRU order means idle entries are all at the front
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if not self._expired(entry):
+                break
+            self._remove(session_id)
+        while self._entries and self._total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, session_id):
+        entry = self._entries.pop(session_id)
+        self._total_bytes -= entry.bytes
+
+
+# Marks a summary that hasn't been read from the database yet
+_UNKNOWN = object()
+
+
+class _Entry:
+    """Ring buffer of one session's recent turns, plus its rolling summary"""
+
+    __slots__ = ('turns', 'bytes', 'last_access', 'summary')
+
+    def __init__(self, window):
+        self.turns = deque(maxlen=window)
+        self.bytes = 0
+        self.last_access = time.time()
+        self.summary = _UNKNOWN
+
+    def contains(self, turn):
+        """Whether this turn (the same dict, or a row with its id) is already in the window"""
+        return any(cached is turn or (turn.get('id') is not None and cached.get('id') == turn['id'])
+                   for cached in self.turns)
+
+    def push(self, turn):
+        if len(self.turns) == self.turns.maxlen:
+            self.bytes -= _turn_size(self.turns[0])
+        self.turns.append(turn)
+        self.bytes += _turn_size(turn)
+
+
+def _turn_size(turn):
+    return len(turn.get('content') or '') + TURN_OVERHEAD_BYTES
@@ -0,0 +1,217 @@
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def sqlite_timestamp():
+    """Current UTC time in the same format as SQLite's CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writing = True
+
+    def release_write(self):
+        with self._cond:
+            self._writing = False
+            self._cond.notify_all()
+
+
+class TurnWriter:
+    """
+    Write-behind queue for conversation turns
+
+    save_turn enqueues and returns immediately; a background thread commits
+    queued turns in batched transactions. Turns stay visible to readers
+    (read-your-writes) from the moment they are enqueued: readers take the
+    shared side of `visibility` while they query and merge pending(), and the
+    writer takes the exclusive side only to commit a batch and drop it from
+    the pending set, so a turn is never seen twice or missed.
+
+    A turn is never dropped while the process runs: turns that keep failing
+    stay pending and are retried every retry_interval seconds (flush() waits
+    for them), and close() makes one last attempt before the process exits.
+    """
+
+    def __init__(self, insert_batch, max_queue=1000, batch_size=100, linger=0.02, put_timeout=1.0,
+                 retry_interval=5.0):
+        self._insert_batch = insert_batch
+        self.batch_size = batch_size
+        self.linger = linger
+        self.put_timeout = put_timeout
+        self.retry_interval = retry_interval
+        self._retry = []  # failed turns, written before the queue (writer thread only)
+        self._retry_at = 0.0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}  # session_id -> list of turn dicts not yet committed
+        self._pending_lock = threading.Lock()
+        self.visibility = ReadWriteLock()
+        self._stopping = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, daemon=True, name='turn-writer')
+        self._thread.start()
+        print(f'✅ Write-behind turn writer started (queue {max_queue}, batch {batch_size})', flush=True)
+
+    def enqueue(self, turn):
+        """
+        Queue a turn for writing
+
+        Args:
+            turn (dict): session_id, role, content and timestamp; its id is
+                set once the batch containing it is inserted
+
+        Blocks for up to put_timeout when the queue is full (backpressure).
+        Returns False if it is still full, in which case the caller should
+        write synchronously.
+        """
+        with self._pending_lock:
+            self._pending.setdefault(turn['session_id'], []).append(turn)
+        try:
+            self._queue.put(turn, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self._discard([turn])
+            return False
+
+    def pending(self, session_id):
+        """
+        Turns for session_id that are queued but not committed yet (oldest first)
+
+        These are the queued dicts themselves, not copies, so a reader that
+        keeps one (the session cache) sees its id once the batch is inserted.
+        Treat them as read-only.
+        """
+        with self._pending_lock:
+            return list(self._pending.get(session_id, []))
+
+    def flush(self):
+        """Block until every queued turn has been committed"""
+        self._queue.join()
+
+    def close(self):
+        """Flush remaining turns and stop the writer thread"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            if self._retry:
+                self._write_retry()
+                if self._retry and self._stopping.is_set():
+                    lost = len(self._retry) + self._queue.qsize()
+                    print(f'❌ {lost} turns could not be saved before shutdown', flush=True)
+                    for _ in range(lost):
+                        self._queue.task_done()
+                    return
+                continue
+
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            # Give concurrent requests a moment to join this transaction
+            if self.linger and not self._stopping.is_set():
+                time.sleep(self.linger)
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    def _write(self, batch):
+        """
+        Commit turns in queue order
+
+        If the batch keeps failing, the turns before the failing one are
+        committed on their own; that turn and everything after it are kept
+        (still pending, so still readable) and retried after retry_interval,
+        ahead of anything queued later, so turns are never stored out of order.
+        """
+        for attempt in range(3):
+            if self._commit(batch):
+                self._done(len(batch))
+                return
+            time.sleep(0.1 * (attempt + 1))
+
+        for index, turn in enumerate(batch):
+            if not self._commit([turn]):
+                break
+            self._done(1)
+        self._retry = batch[index:]
+        self._retry_at = time.monotonic() + self.retry_interval
+        print(f'⚠️  Keeping {len(self._retry)} turns queued after repeated write failures', flush=True)
+
+    def _write_retry(self):
+        wait = self._retry_at - time.monotonic()
+        if wait > 0 and not self._stopping.is_set():
+            # close() cuts the wait short for one last attempt
+            self._stopping.wait(wait)
+            return
+        retry, self._retry = self._retry, []
+        self._write(retry)
+
+    def _done(self, count):
+        for _ in range(count):
+            self._queue.task_done()
+
+    def _commit(self, batch):
+        """Insert a batch and drop it from pending() atomically for readers; False if it failed"""
+        self.visibility.acquire_write()
+        try:
+            self._insert_batch(batch)
+            self._discard(batch)
+            return True
+        except Exception as e:
+            print(f'❌ Write-behind insert of {len(batch)} turns failed: {e}', flush=True)
+            for turn in batch:
+                turn['id'] = None  # The transaction was rolled back
+            return False
+        finally:
+            self.visibility.release_write()
+
+    def _discard(self, batch):
+        with self._pending_lock:
+            for turn in batch:
+                turns = self._pending.get(turn['session_id'])
+                if turns is None:
+                    continue
+                try:
+                    turns.remove(turn)
+                except ValueError:
+                    pass
+                if not turns:
+                    del self._pending[turn['session_id']]
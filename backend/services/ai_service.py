@@ -1,108 +1,39 @@
 """
 AI Service - GROQ CLOUD OPTIMIZED (10x faster than local)
-Uses Groq API for ultra-fast inference
+Uses Groq API for ultra-fast inference (or a local llama.cpp model, see llm_backends)
 """
 
 import os
+import threading
 import time
-from groq import Groq
 from dotenv import load_dotenv
+from services.context_builder import ContextBuilder, turn_text
+from services.llm_backends import create_backend
+from services.metrics import LLM_SECONDS, LLM_FIRST_TOKEN_SECONDS, UPSTREAM_ERRORS, FALLBACKS
 
 # Load environment variables
 load_dotenv()
 
+# Groq model used for all chat completions
+CHAT_MODEL = "llama-3.3-70b-versatile"
 
-class MentalHealthAI:
-    """
-    Singleton AI service using GROQ API for ultra-fast responses
-    """
-    _instance = None
-    _client = None
-    _is_initialized = False
-    
-    def __new__(cls):
-        """Ensure only one instance exists (Singleton pattern)"""
-        if cls._instance is None:
-            print("🧠 Creating new AI service instance (Groq Cloud)...")
-            cls._instance = super(MentalHealthAI, cls).__new__(cls)
-        return cls._instance
-    
-    def __init__(self):
-        """Initialize Groq client only once"""
-        if not MentalHealthAI._is_initialized:
-            print("🔄 Initializing Groq API client...")
-            self._initialize_groq()
-            MentalHealthAI._is_initialized = True
-            print("✅ Groq AI service ready! (Ultra-fast cloud inference)")
-        else:
-            print("♻️  Using existing Groq client")
-    
-    def _initialize_groq(self):
-        """Initialize Groq API client"""
-        api_key = os.getenv('GROQ_API_KEY')
-        
-        if not api_key:
-            raise ValueError(
-                "GROQ_API_KEY not found in environment variables!\n"
-                "Please create a .env file in backend folder with:\n"
-                "GROQ_API_KEY=your_key_here"
-            )
-        
-        MentalHealthAI._client = Groq(api_key=api_key)
-        print("✅ Groq client initialized successfully!")
-    
-    def _build_context(self, conversation_history):
-        """Build conversation context for Groq"""
-        if not conversation_history:
-            return []
-        
-        # Convert to Groq chat format (only last 6 messages)
-        messages = []
-        recent_turns = conversation_history[-6:] if len(conversation_history) > 6 else conversation_history
-        
-        for turn in recent_turns:
-            role = turn.get('role', 'unknown')
-            message = turn.get('message', '')
-            
-            if role == 'user':
-                messages.append({
-                    "role": "user",
-                    "content": message
-                })
-            elif role == 'assistant':
-                messages.append({
-                    "role": "assistant",
-                    "content": message
-                })
-        
-        return messages
-    
-    def generate_response(self, user_message, conversation_history=None):
-        """
-        Generate therapeutic response using Groq API (ULTRA FAST!)
-        
-        Args:
-            user_message (str): User's input message
-            conversation_history (list): Previous conversation turns
-            
-        Returns:
-            str: AI's therapeutic response
-        """
-        total_start = time.time()
-        
-        if conversation_history is None:
-            conversation_history = []
-        
-        # Build context
-        context_start = time.time()
-        context_messages = self._build_context(conversation_history)
-        context_time = time.time() - context_start
-        print(f"   ⏱️  Context building: {context_time:.3f}s")
-        
-        # System prompt for therapeutic responses
-        system_message = {
-            "role": "system",
-            "content": """You are Neo, a funny, emotionally intelligent, Gen-Z friendly AI mental health companion and therapist-friend
+# Most recent turns loaded as context candidates (the token budget decides how many are sent)
+CONTEXT_TURNS = 20
+
+# Estimated tokens of conversation context (summary + recent turns) sent per request
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1200'))
+
+# Characters of each retrieved knowledge_base entry included in the prompt
+KNOWLEDGE_MAX_CHARS = 600
+
+# Returned when the Groq API call fails
+FALLBACK_RESPONSE = "I'm having trouble connecting right now. Could you please try again?"
+
+# Returned when the intro can't be generated
+FALLBACK_INTRO = "Hello! I'm Neo, your AI mental health companion. I'm here to listen and support you. How are you feeling today?"
+
+# System prompt for therapeutic responses
+SYSTEM_PROMPT = """You are Neo, a funny, emotionally intelligent, Gen-Z friendly AI mental health companion and therapist-friend
 
 Personality:
 You’re a mix of humor, empathy, and emotional depth — like a therapist who’s also your funniest, most supportive .
@@ -167,75 +98,352 @@ Never sound like a therapist bot reading a script.
 Never use sarcasm that minimizes emotion.
 Never give medical, crisis, or diagnostic responses.
 Never overuse slang — it should feel real, not performative. """
-        }
+
+
+class MentalHealthAI:
+    """
+    Singleton AI service using GROQ API for ultra-fast responses
+    
+    All completions go through a pluggable backend (LLM_BACKEND=groq|llama_cpp)
+    """
+    _instance = None
+    _backend = None
+    _context_builder = None
+    _intro_pool = None
+    _is_initialized = False
+    
+    def __new__(cls):
+        """Ensure only one instance exists (Singleton pattern)"""
+        if cls._instance is None:
+            print("🧠 Creating new AI service instance...")
+            cls._instance = super(MentalHealthAI, cls).__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        """Initialize the LLM backend only once"""
+        if not MentalHealthAI._is_initialized:
+            print("🔄 Initializing LLM backend...")
+            self._initialize_backend()
+            MentalHealthAI._context_builder = ContextBuilder(token_budget=CONTEXT_TOKEN_BUDGET)
+            MentalHealthAI._is_initialized = True
+            print(f"✅ AI service ready! ({MentalHealthAI._backend.label})")
+        else:
+            print("♻️  Using existing LLM backend")
+    
+    @property
+    def context_builder(self):
+        """The ContextBuilder used to fit history into the token budget"""
+        return MentalHealthAI._context_builder
+    
+    @property
+    def backend(self):
+        """The completion backend (GroqBackend or LlamaCppBackend)"""
+        return MentalHealthAI._backend
+    
+    def _initialize_backend(self):
+        """Create the backend selected by LLM_BACKEND (Groq by default)"""
+        MentalHealthAI._backend = create_backend(CHAT_MODEL, SYSTEM_PROMPT)
+    
+    def _build_context(self, conversation_history, user_message=None, session_summary=None, summarized_through=None):
+        """Build token-budgeted conversation context for the model"""
+        if not conversation_history and not session_summary:
+            return []
         
-        # Build complete messages array
-        messages = [system_message] + context_messages + [{
+        turns = list(conversation_history or [])
+        
+        # History is read after the user's message was saved - don't send it twice
+        if turns and turns[-1].get('role') == 'user' and turn_text(turns[-1]) == user_message:
+            turns = turns[:-1]
+        
+        return self._context_builder.build(turns, session_summary, summarized_through)
+    
+    def _build_knowledge_message(self, knowledge):
+        """Format retrieved knowledge_base entries as a system message (None if there are none)"""
+        if not knowledge:
+            return None
+        
+        lines = []
+        for entry in knowledge:
+            content = entry['content']
+            if len(content) > KNOWLEDGE_MAX_CHARS:
+                content = content[:KNOWLEDGE_MAX_CHARS].rsplit(' ', 1)[0] + '...'
+            lines.append(f"- {entry['title']}: {content}")
+        
+        return {
+            "role": "system",
+            "content": "Coping material that may be relevant (weave it in only if it fits naturally, "
+                       "in your own words):\n" + "\n".join(lines)
+        }
+    
+    def _build_messages(self, user_message, context_messages, knowledge=None):
+        """Build complete messages array: system prompt, retrieved material, context, new user message"""
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        knowledge_message = self._build_knowledge_message(knowledge)
+        if knowledge_message:
+            messages.append(knowledge_message)
+        return messages + context_messages + [{
             "role": "user",
             "content": user_message
         }]
+    
+    def generate_response(self, user_message, conversation_history=None, session_summary=None, summarized_through=None,
+                          knowledge=None):
+        """
+        Generate therapeutic response using Groq API (ULTRA FAST!)
+        
+        Args:
+            user_message (str): User's input message
+            conversation_history (list): Previous conversation turns
+            session_summary (str): Rolling summary of earlier turns
+            summarized_through (int): Id of the last turn the summary covers
+            knowledge (list): Retrieved knowledge_base entries (title, content)
+            
+        Returns:
+            str: AI's therapeutic response
+        """
+        total_start = time.perf_counter()
+        
+        if conversation_history is None:
+            conversation_history = []
+        
+        # Build context
+        context_start = time.perf_counter()
+        context_messages = self._build_context(
+            conversation_history, user_message, session_summary, summarized_through
+        )
+        context_time = time.perf_counter() - context_start
+        print(f"   ⏱️  Context building: {context_time:.3f}s")
+        
+        # Build complete messages array
+        messages = self._build_messages(user_message, context_messages, knowledge)
         
-        # Call Groq API (ULTRA FAST!)
-        print("   🚀 Calling Groq API...")
-        api_start = time.time()
+        # Call the LLM backend (Groq API by default - ULTRA FAST!)
+        print(f"   🚀 Calling {MentalHealthAI._backend.label}...")
+        api_start = time.perf_counter()
         
         try:
-            chat_completion = MentalHealthAI._client.chat.completions.create(
-                messages=messages,
-                model="llama-3.3-70b-versatile",  # UPDATED: Latest, excellent quality
-                temperature=0.7,
-                max_tokens=150,
-                top_p=0.9,
-                stream=False
+            response_text = MentalHealthAI._backend.complete(
+                messages, temperature=0.7, max_tokens=150, top_p=0.9
             )
             
-            api_time = time.time() - api_start
-            print(f"   ⏱️  Groq API call: {api_time:.3f}s ← SUPER FAST!")
+            api_time = time.perf_counter() - api_start
+            LLM_SECONDS.labels('complete').observe(api_time)
+            print(f"   ⏱️  LLM call: {api_time:.3f}s")
             
-            response_text = chat_completion.choices[0].message.content.strip()
-            
-            total_time = time.time() - total_start
+            total_time = time.perf_counter() - total_start
             print(f"   ✅ Total AI generation: {total_time:.3f}s")
             
             return response_text
         
         except Exception as e:
-            print(f"   ❌ Groq API Error: {str(e)}")
+            print(f"   ❌ LLM Error: {str(e)}")
+            UPSTREAM_ERRORS.labels('llm').inc()
+            FALLBACKS.labels('response').inc()
             # Fallback response
-            return "I'm having trouble connecting right now. Could you please try again?"
+            return FALLBACK_RESPONSE
     
-    def generate_intro_response(self, user_name=None):
-        """Generate warm introduction for new session"""
-        print("🎭 Generating introduction via Groq...")
+    def generate_response_stream(self, user_message, conversation_history=None, session_summary=None, summarized_through=None,
+                                 knowledge=None):
+        """
+        Stream therapeutic response tokens from the LLM backend as they are generated
+        
+        Args:
+            user_message (str): User's input message
+            conversation_history (list): Previous conversation turns
+            session_summary (str): Rolling summary of earlier turns
+            summarized_through (int): Id of the last turn the summary covers
+            knowledge (list): Retrieved knowledge_base entries (title, content)
+            
+        Yields:
+            str: Response text fragments in generation order. If the API call
+            fails before any token arrives, the fallback response is yielded
+            as a single fragment instead.
+        """
+        total_start = time.perf_counter()
+        
+        if conversation_history is None:
+            conversation_history = []
+        
+        context_messages = self._build_context(
+            conversation_history, user_message, session_summary, summarized_through
+        )
+        messages = self._build_messages(user_message, context_messages, knowledge)
         
-        if user_name:
+        print(f"   🚀 Calling {MentalHealthAI._backend.label} (streaming)...")
+        api_start = time.perf_counter()
+        first_token_time = None
+        started = False
+        
+        try:
+            for token in MentalHealthAI._backend.stream(messages, temperature=0.7, max_tokens=150, top_p=0.9):
+                # Drop leading whitespace so the assembled reply matches generate_response
+                if not started:
+                    token = token.lstrip()
+                    if not token:
+                        continue
+                    started = True
+                    first_token_time = time.perf_counter() - api_start
+                    LLM_FIRST_TOKEN_SECONDS.observe(first_token_time)
+                    print(f"   ⏱️  LLM first token: {first_token_time:.3f}s")
+                
+                yield token
+            
+            LLM_SECONDS.labels('stream').observe(time.perf_counter() - api_start)
+            total_time = time.perf_counter() - total_start
+            print(f"   ✅ Total AI generation (streamed): {total_time:.3f}s")
+        
+        except Exception as e:
+            print(f"   ❌ LLM Error (streaming): {str(e)}")
+            UPSTREAM_ERRORS.labels('llm').inc()
+            # Fallback response, only if nothing has been sent yet
+            if not started:
+                FALLBACKS.labels('response').inc()
+                yield FALLBACK_RESPONSE
+
+    async def generate_response_stream_async(self, user_message, conversation_history=None, session_summary=None,
+                                             summarized_through=None, knowledge=None):
+        """
+        Async generate_response_stream for the asyncio server (same arguments and fallback)
+
+        Yields:
+            str: Response text fragments in generation order
+        """
+        total_start = time.perf_counter()
+
+        context_messages = self._build_context(
+            conversation_history or [], user_message, session_summary, summarized_through
+        )
+        messages = self._build_messages(user_message, context_messages, knowledge)
+
+        print(f"   🚀 Calling {MentalHealthAI._backend.label} (async streaming)...")
+        api_start = time.perf_counter()
+        started = False
+
+        try:
+            async for token in MentalHealthAI._backend.astream(messages, temperature=0.7, max_tokens=150, top_p=0.9):
+                if not started:
+                    token = token.lstrip()
+                    if not token:
+                        continue
+                    started = True
+                    first_token_time = time.perf_counter() - api_start
+                    LLM_FIRST_TOKEN_SECONDS.observe(first_token_time)
+                    print(f"   ⏱️  LLM first token: {first_token_time:.3f}s")
+
+                yield token
+
+            LLM_SECONDS.labels('stream').observe(time.perf_counter() - api_start)
+            print(f"   ✅ Total AI generation (streamed): {time.perf_counter() - total_start:.3f}s")
+
+        except Exception as e:
+            print(f"   ❌ LLM Error (streaming): {str(e)}")
+            UPSTREAM_ERRORS.labels('llm').inc()
+            if not started:
+                FALLBACKS.labels('response').inc()
+                yield FALLBACK_RESPONSE
+
+    def summarize_conversation(self, previous_summary, turns):
+        """
+        Fold turns into a rolling session summary (called off the request path)
+        
+        Args:
+            previous_summary (str): Existing summary, or None
+            turns (list): Turns to fold in, oldest first
+            
+        Returns:
+            str: Updated summary, or None if the call failed
+        """
+        transcript = "\n".join(
+            f"{'User' if turn.get('role') == 'user' else 'Neo'}: {turn_text(turn)}" for turn in turns
+        )
+        prompt = (
+            "You maintain a running summary of a supportive conversation between a user and Neo, "
+            "an AI mental health companion. Update the summary with the new messages. Keep what the "
+            "user shared about their feelings, situation, people and events, and any coping ideas "
+            "discussed. Write at most 120 words in plain third person.\n\n"
+            f"Current summary:\n{previous_summary or '(none yet)'}\n\n"
+            f"New messages:\n{transcript}\n\n"
+            "Updated summary:"
+        )
+        
+        try:
+            return MentalHealthAI._backend.complete(
+                [{"role": "user", "content": prompt}], temperature=0.3, max_tokens=200
+            )
+        
+        except Exception as e:
+            print(f"❌ LLM summary error: {str(e)}")
+            UPSTREAM_ERRORS.labels('llm').inc()
+            return None
+    
+    def use_intro_pool(self, intro_pool):
+        """Serve intros from a pre-generated IntroPool (falls back to the model when it's empty)"""
+        MentalHealthAI._intro_pool = intro_pool
+    
+    def generate_intro_response(self, user_name=None, use_model=True):
+        """
+        Warm introduction for a new session (from the intro pool when one is ready)
+        
+        Args:
+            user_name (str): Name to greet the user by
+            use_model (bool): On a pool miss, generate one with the model; when
+                False, return FALLBACK_INTRO at once instead of blocking
+        """
+        if MentalHealthAI._intro_pool is not None:
+            intro = MentalHealthAI._intro_pool.take(user_name)
+            if intro:
+                return intro
+        if not use_model:
+            FALLBACKS.labels('intro').inc()
+            return FALLBACK_INTRO
+        intro = self.generate_fresh_intro(user_name)
+        if intro == FALLBACK_INTRO:
+            FALLBACKS.labels('intro').inc()
+        return intro
+    
+    def generate_fresh_intro(self, user_name=None, template=False):
+        """
+        Generate a new introduction with the model
+        
+        Args:
+            user_name (str): Name to greet the user by
+            template (bool): Write the greeting with a literal {name} placeholder
+                instead (used to fill the intro pool)
+            
+        Returns:
+            str: The intro, or FALLBACK_INTRO if the call failed
+        """
+        print("🎭 Generating introduction...")
+        
+        if template:
+            prompt = "You are neo, a compassionate AI therapist. Greet the user warmly in 2-3 sentences, introduce yourself, and ask how they're feeling today. Address the user as {name}, writing that placeholder exactly as shown, braces included."
+        elif user_name:
             prompt = f"You are neo, a compassionate AI therapist. Greet {user_name} warmly in 2-3 sentences, introduce yourself, and ask how they're feeling today."
         else:
             prompt = "You are neo, a compassionate AI therapist. Introduce yourself warmly in 2-3 sentences and generate a sentence to ask like what been on you mind lately?"
         
         try:
-            chat_completion = MentalHealthAI._client.chat.completions.create(
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }],
-                model="llama-3.3-70b-versatile",  # UPDATED: Same model
-                temperature=0.8,
-                max_tokens=100
+            return MentalHealthAI._backend.complete(
+                [{"role": "user", "content": prompt}], temperature=0.8, max_tokens=100
             )
-            
-            return chat_completion.choices[0].message.content.strip()
         
         except Exception as e:
-            print(f"❌ Groq intro error: {str(e)}")
-            return "Hello! I'm Neo, your AI mental health companion. I'm here to listen and support you. How are you feeling today?"
+            print(f"❌ LLM intro error: {str(e)}")
+            UPSTREAM_ERRORS.labels('llm').inc()
+            return FALLBACK_INTRO
 
 
-# Create singleton instance
-print("🚀 Initializing Groq-powered AI service...")
-ai_service = MentalHealthAI()
+# Singleton instance, created on first use so importing this module stays cheap
+_ai_service = None
+_ai_service_lock = threading.Lock()
 
 
 def get_ai_service():
     """Get the singleton AI service instance"""
-    return ai_service
\ No newline at end of file
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                print("🚀 Initializing AI service...")
+                _ai_service = MentalHealthAI()
+    return _ai_service
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Audio Preprocessing - shrink uploaded audio before it goes to Whisper
+Resamples to 16 kHz mono, trims leading/trailing silence and optionally re-encodes
+to FLAC or Ogg/Opus, all in memory (pydub; only the re-encoding needs ffmpeg)
+"""
+import io
+import os
+import shutil
+import time
+import warnings
+from services.metrics import AUDIO_BYTES_IN, AUDIO_BYTES_SAVED, AUDIO_PREPROCESS_SECONDS
+
+# Whisper works at 16 kHz mono internally - anything more is upload overhead
+TARGET_SAMPLE_RATE = 16000
+
+# Re-encoding options: pydub export format, extra arguments, filename extension
+CODECS = {
+    'wav': ('wav', {}, 'wav'),
+    'flac': ('flac', {}, 'flac'),
+    'ogg': ('ogg', {'codec': 'libopus', 'bitrate': '24k'}, 'ogg'),
+}
+
+
+class AudioPreprocessor:
+    """
+    Normalizes uploads for transcription
+
+    Anything that can't be decoded (e.g. webm without ffmpeg) or that
+    wouldn't get smaller is sent as received, so preprocessing never
+    costs a transcription.
+    """
+
+    def __init__(self, codec='wav', silence_threshold=-45.0, silence_padding_ms=200,
+                 min_speech_ms=300, sample_rate=TARGET_SAMPLE_RATE):
+        """
+        Args:
+            codec (str): Output encoding - 'wav', 'flac' or 'ogg' (the last two need ffmpeg)
+            silence_threshold (float): dBFS below which audio counts as silence
+            silence_padding_ms (int): Silence kept before and after the speech
+            min_speech_ms (int): Audio whose trimmed length would be shorter is left untrimmed
+            sample_rate (int): Output sample rate
+        """
+        # pydub warns at import when ffmpeg is missing; we check for it ourselves
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            from pydub import AudioSegment
+            from pydub.silence import detect_leading_silence
+        self._AudioSegment = AudioSegment
+        self._detect_leading_silence = detect_leading_silence
+
+        codec = codec.lower()
+        if codec not in CODECS:
+            raise ValueError(f"Unknown audio codec '{codec}' (use {', '.join(CODECS)})")
+        self.has_ffmpeg = shutil.which('ffmpeg') is not None or shutil.which('avconv') is not None
+        if codec != 'wav' and not self.has_ffmpeg:
+            print(f"⚠️ {codec} encoding needs ffmpeg - sending 16 kHz mono WAV instead")
+            codec = 'wav'
+
+        self.codec = codec
+        self.silence_threshold = silence_threshold
+        self.silence_padding_ms = silence_padding_ms
+        self.min_speech_ms = min_speech_ms
+        self.sample_rate = sample_rate
+        print(f"✅ Audio preprocessing ready ({sample_rate} Hz mono, {codec}, silence < {silence_threshold} dBFS trimmed)")
+
+    def process(self, audio, filename=None):
+        """
+        Normalize one upload
+
+        Args:
+            audio: Raw bytes, a path, or a file-like object (read once, in memory)
+            filename (str): Uploaded name; its extension tells the input format
+
+        Returns:
+            tuple: (audio bytes, filename) to send for transcription
+        """
+        start_time = time.perf_counter()
+
+        if isinstance(audio, (str, os.PathLike)):
+            filename = filename or os.path.basename(audio)
+            with open(audio, 'rb') as audio_file:
+                data = audio_file.read()
+        elif isinstance(audio, (bytes, bytearray, memoryview)):
+            data = bytes(audio)
+        else:
+            data = audio.read()
+        filename = filename or 'audio.wav'
+        AUDIO_BYTES_IN.inc(len(data))
+
+        extension = os.path.splitext(filename)[1].lstrip('.').lower() or 'wav'
+        if extension != 'wav' and not self.has_ffmpeg:
+            return data, filename  # Only WAV can be decoded without ffmpeg
+
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                segment = self._AudioSegment.from_file(io.BytesIO(data), format=extension)
+            original_ms = len(segment)
+            # Downmix/resample first so trimming scans the smaller signal
+            segment = segment.set_channels(1).set_frame_rate(self.sample_rate).set_sample_width(2)
+            segment = self._trim_silence(segment)
+
+            export_format, export_args, output_extension = CODECS[self.codec]
+            buffer = io.BytesIO()
+            segment.export(buffer, format=export_format, **export_args)
+            processed = buffer.getvalue()
+        except Exception as e:
+            print(f"⚠️ Audio preprocessing skipped ({filename}): {str(e)}")
+            return data, filename
+
+        AUDIO_PREPROCESS_SECONDS.observe(time.perf_counter() - start_time)
+        if len(processed) >= len(data):
+            return data, filename
+
+        saved = len(data) - len(processed)
+        AUDIO_BYTES_SAVED.inc(saved)
+        print(f"🎚️  Audio preprocessed: {len(data) / 1024:.1f} KB -> {len(processed) / 1024:.1f} KB "
+              f"({saved / len(data):.0%} saved, {original_ms / 1000:.2f}s -> {len(segment) / 1000:.2f}s)")
+        return processed, f"{os.path.splitext(filename)[0]}.{output_extension}"
+
+    def _trim_silence(self, segment):
+        """Cut leading/trailing audio below the energy threshold, keeping a little padding"""
+        lead = self._detect_leading_silence(segment, silence_threshold=self.silence_threshold)
+        trail = self._detect_leading_silence(segment.reverse(), silence_threshold=self.silence_threshold)
+        start = max(0, lead - self.silence_padding_ms)
+        end = min(len(segment), len(segment) - trail + self.silence_padding_ms)
+
+        # Nothing (or only a blip) above the threshold - let Whisper hear all of it
+        if lead >= len(segment) or end - start < self.min_speech_ms:
+            return segment
+        return segment[start:end]
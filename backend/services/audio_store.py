@@ -0,0 +1,338 @@
+"""
+Audio Store - where synthesized replies live until the client has played them
+In memory (byte-bounded, evicted after playback or TTL) or on disk (indexed files
+garbage-collected by a background sweeper against a TTL and a disk quota)
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Names TTSService gives its replies; anything else in the directory is left alone
+AUDIO_FILENAME = re.compile(r'^response_[0-9a-f]{8}\.mp3$')
+
+
+class AudioClip:
+    """One synthesized reply held in memory"""
+
+    __slots__ = ('audio_id', 'data', 'mimetype', 'etag', 'created_at', 'expires_at')
+
+    def __init__(self, audio_id, data, mimetype, ttl):
+        self.audio_id = audio_id
+        self.data = data
+        self.mimetype = mimetype
+        self.etag = hashlib.md5(data).hexdigest()
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl
+
+    @property
+    def size(self):
+        return len(self.data)
+
+
+class MemoryAudioStore:
+    """
+    Thread-safe, byte-bounded in-memory store for TTS audio
+
+    Clips are evicted when their TTL runs out, a short grace period after
+    they have been played to the end, or oldest-first when the store would
+    exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=600, played_grace=60):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.played_grace = played_grace
+        self._clips = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        print(f"✅ In-memory audio store ready ({max_bytes // (1024 * 1024)} MB, TTL {ttl}s)")
+
+    def put(self, data, mimetype='audio/mpeg'):
+        """
+        Store a clip and return its id (usable as /audio/<id>)
+
+        Args:
+            data (bytes): Encoded audio
+            mimetype (str): Content type to serve it with
+
+        Returns:
+            str: Audio id
+        """
+        audio_id = f"response_{uuid.uuid4().hex[:8]}.mp3"
+        clip = AudioClip(audio_id, bytes(data), mimetype, self.ttl)
+
+        with self._lock:
+            self._evict_expired()
+            # Make room oldest-first
+            while self._clips and self._total_bytes + clip.size > self.max_bytes:
+                self._remove(next(iter(self._clips)))
+            self._clips[audio_id] = clip
+            self._total_bytes += clip.size
+
+        return audio_id
+
+    def get(self, audio_id):
+        """Return the clip for audio_id, or None if unknown or expired"""
+        with self._lock:
+            clip = self._clips.get(audio_id)
+            if clip is None:
+                return None
+            if clip.expires_at <= time.time():
+                self._remove(audio_id)
+                return None
+            return clip
+
+    def mark_played(self, audio_id):
+        """Shorten a clip's lifetime once the client has fetched its last byte"""
+        with self._lock:
+            clip = self._clips.get(audio_id)
+            if clip is not None:
+                clip.expires_at = min(clip.expires_at, time.time() + self.played_grace)
+
+    def stats(self):
+        """Current store usage"""
+        with self._lock:
+            return {
+                'clips': len(self._clips),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def _evict_expired(self):
+        """Drop expired clips (caller holds the lock)"""
+        now = time.time()
+        expired = [audio_id for audio_id, clip in self._clips.items() if clip.expires_at <= now]
+        for audio_id in expired:
+            self._remove(audio_id)
+
+    def _remove(self, audio_id):
+        """Remove one clip (caller holds the lock)"""
+        clip = self._clips.pop(audio_id)
+        self._total_bytes -= clip.size
+
+
+class DiskClip:
+    """One synthesized reply stored as a file"""
+
+    __slots__ = ('audio_id', 'path', 'size', 'mimetype', 'etag', 'created_at', 'expires_at')
+
+    def __init__(self, audio_id, path, size, mimetype, etag, created_at, ttl):
+        self.audio_id = audio_id
+        self.path = path
+        self.size = size
+        self.mimetype = mimetype
+        self.etag = etag
+        self.created_at = created_at
+        self.expires_at = created_at + ttl
+
+
+class DiskAudioStore:
+    """
+    Thread-safe store for TTS audio files with an in-memory index
+
+    Files are deleted by a background sweeper once their TTL runs out, and
+    oldest-first whenever the directory would exceed max_bytes. Reply files
+    already in the directory (from before a restart, or written by another
+    worker sharing it) are adopted into the index, so they expire too.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, ttl=3600, sweep_interval=60, played_grace=None):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.played_grace = played_grace
+        self._clips = OrderedDict()    # audio_id -> DiskClip, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.removed_files = 0
+        self.removed_bytes = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._adopt_files()
+        print(f"✅ Disk audio store ready ({self.directory}, {len(self._clips)} files, "
+              f"{max_bytes // (1024 * 1024)} MB, TTL {ttl}s)")
+
+    def start(self):
+        """Start the background sweeper"""
+        self._thread = threading.Thread(target=self._run, daemon=True, name="audio-sweeper")
+        self._thread.start()
+        print(f"✅ Audio sweeper running in background (every {self.sweep_interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def put(self, data, mimetype='audio/mpeg'):
+        """
+        Write a clip and return its id (usable as /audio/<id>)
+
+        Args:
+            data (bytes): Encoded audio
+            mimetype (str): Content type to serve it with
+
+        Returns:
+            str: Audio id
+        """
+        audio_id = f"response_{uuid.uuid4().hex[:8]}.mp3"
+        path = os.path.join(self.directory, audio_id)
+
+        # Write under a temporary name so a half-written file is never served
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        clip = DiskClip(audio_id, path, len(data), mimetype, hashlib.md5(data).hexdigest(), time.time(), self.ttl)
+        with self._lock:
+            self._index(clip)
+            doomed = self._over_quota()
+        self._delete(doomed)
+        return audio_id
+
+    def get(self, audio_id):
+        """Return the clip for audio_id, or None if unknown, expired or gone from disk"""
+        if not AUDIO_FILENAME.match(audio_id):
+            return None
+
+        with self._lock:
+            clip = self._clips.get(audio_id)
+        if clip is None:
+            # Written by another worker sharing the directory since the last sweep
+            clip = self._adopt(audio_id)
+            if clip is None:
+                return None
+
+        if clip.expires_at <= time.time() or not os.path.exists(clip.path):
+            with self._lock:
+                expired = self._unindex([audio_id])
+            self._delete(expired)
+            return None
+        return clip
+
+    def mark_played(self, audio_id):
+        """Shorten a clip's lifetime once fully played (only when played_grace is set)"""
+        if self.played_grace is None:
+            return
+        with self._lock:
+            clip = self._clips.get(audio_id)
+            if clip is not None:
+                clip.expires_at = min(clip.expires_at, time.time() + self.played_grace)
+
+    def sweep(self):
+        """
+        Delete expired files and enforce the quota
+
+        Returns:
+            int: Files deleted
+        """
+        self._adopt_files()
+        now = time.time()
+        with self._lock:
+            expired = [audio_id for audio_id, clip in self._clips.items() if clip.expires_at <= now]
+            doomed = self._unindex(expired) + self._over_quota()
+        self._delete(doomed)
+        if doomed:
+            print(f"🧹 Audio sweeper removed {len(doomed)} files ({sum(clip.size for clip in doomed) / 1024:.1f} KB)")
+        return len(doomed)
+
+    def stats(self):
+        """Current store usage"""
+        with self._lock:
+            return {
+                'files': len(self._clips),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'removed_files': self.removed_files,
+                'removed_bytes': self.removed_bytes
+            }
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"❌ Audio sweep error: {e}")
+
+    def _adopt_files(self):
+        """Index reply files that are on disk but not in the index"""
+        try:
+            names = [entry.name for entry in os.scandir(self.directory) if AUDIO_FILENAME.match(entry.name)]
+        except OSError:
+            return
+        with self._lock:
+            unknown = [name for name in names if name not in self._clips]
+
+        # Oldest first, so the index stays in age order
+        found = []
+        for name in unknown:
+            try:
+                found.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+            except OSError:
+                pass
+        for _, name in sorted(found):
+            self._adopt(name)
+
+    def _adopt(self, audio_id):
+        """Index an existing file by its mtime; None if it isn't there"""
+        path = os.path.join(self.directory, audio_id)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        clip = DiskClip(audio_id, path, stat.st_size, 'audio/mpeg',
+                        f"{stat.st_mtime_ns:x}-{stat.st_size:x}", stat.st_mtime, self.ttl)
+        with self._lock:
+            if audio_id in self._clips:
+                return self._clips[audio_id]
+            self._index(clip)
+            # Keep the index oldest-first so quota eviction removes the oldest files
+            if clip.created_at < next(iter(self._clips.values())).created_at:
+                self._clips.move_to_end(audio_id, last=False)
+        return clip
+
+    def _index(self, clip):
+        """Add a clip to the index (caller holds the lock)"""
+        self._clips[clip.audio_id] = clip
+        self._total_bytes += clip.size
+
+    def _unindex(self, audio_ids):
+        """Remove clips from the index and return them (caller holds the lock)"""
+        removed = []
+        for audio_id in audio_ids:
+            clip = self._clips.pop(audio_id, None)
+            if clip is not None:
+                self._total_bytes -= clip.size
+                removed.append(clip)
+        return removed
+
+    def _over_quota(self):
+        """Unindex oldest clips until under max_bytes and return them (caller holds the lock)"""
+        removed = []
+        while self._clips and self._total_bytes > self.max_bytes:
+            removed.extend(self._unindex([next(iter(self._clips))]))
+        return removed
+
+    def _delete(self, clips):
+        """Delete unindexed clips' files (outside the lock - file I/O)"""
+        for clip in clips:
+            try:
+                os.remove(clip.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"❌ Could not delete {clip.path}: {e}")
+                continue
+            with self._lock:
+                self.removed_files += 1
+                self.removed_bytes += clip.size
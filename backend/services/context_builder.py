@@ -0,0 +1,150 @@
+"""
+Context Builder - token-budgeted conversation context with rolling summaries
+Recent turns fill the budget newest-first; older turns are folded into a
+summary by a background worker and stored in sessions.session_summary
+"""
+import queue
+import threading
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token plus message overhead)"""
+    return len(text or '') // 4 + 4
+
+
+def turn_text(turn):
+    """Message text of a turn (database rows use 'content')"""
+    return turn.get('content') or turn.get('message') or ''
+
+
+class ContextBuilder:
+    """
+    Selects which turns go into the prompt
+
+    Turns already folded into the session summary (id <= summarized_through)
+    are skipped; of the rest, the newest are taken until the token budget
+    is used up. The summary itself is charged against the same budget.
+    """
+
+    def __init__(self, token_budget=1200):
+        self.token_budget = token_budget
+
+    def select_recent(self, turns, budget=None):
+        """Return the newest turns (oldest first) whose estimated tokens fit in budget"""
+        remaining = self.token_budget if budget is None else budget
+        selected = []
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn_text(turn))
+            if cost > remaining:
+                break
+            selected.append(turn)
+            remaining -= cost
+        selected.reverse()
+        return selected
+
+    def unsummarized(self, turns, summarized_through):
+        """Drop turns covered by the summary (turns without an id are always newer)"""
+        if not summarized_through:
+            return list(turns)
+        return [turn for turn in turns if turn.get('id') is None or turn['id'] > summarized_through]
+
+    def build(self, turns, summary=None, summarized_through=None):
+        """
+        Build chat messages for the model
+
+        Args:
+            turns (list): Recent turns, oldest first
+            summary (str): Rolling summary of earlier turns, if any
+            summarized_through (int): Id of the last turn the summary covers
+
+        Returns:
+            list: Chat-format messages (summary first, then recent turns)
+        """
+        messages = []
+        budget = self.token_budget
+
+        if summary:
+            summary_text = f"Summary of the earlier conversation (for your context only): {summary}"
+            messages.append({"role": "system", "content": summary_text})
+            budget -= estimate_tokens(summary_text)
+
+        for turn in self.select_recent(self.unsummarized(turns, summarized_through), max(budget, 0)):
+            role = turn.get('role')
+            if role in ('user', 'assistant'):
+                messages.append({"role": role, "content": turn_text(turn)})
+
+        return messages
+
+
+class SessionSummarizer:
+    """
+    Background worker that keeps each session's rolling summary current
+
+    schedule() is cheap and safe to call after every turn. Once a session's
+    unsummarized turns no longer fit in the context budget, or outnumber
+    max_turns (the recent-turn window the server reads per request),
+    everything but the newest keep_ratio of that budget/window is folded
+    into the summary, so the builder never has to drop turns the summary
+    doesn't cover yet.
+    """
+
+    def __init__(self, ai_service, builder, load_state, load_turns_after, store_summary,
+                 keep_ratio=0.5, max_fold_turns=200, max_turns=None):
+        self.ai_service = ai_service
+        self.builder = builder
+        self.keep_ratio = keep_ratio
+        self.max_turns = max_turns
+        self.max_fold_turns = max_fold_turns
+        self._load_state = load_state
+        self._load_turns_after = load_turns_after
+        self._store_summary = store_summary
+
+        self._queue = queue.Queue()
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="session-summarizer")
+        self._thread.start()
+        print("✅ Session summarizer running in background")
+
+    def schedule(self, session_id):
+        """Ask for session_id to be checked (deduplicated while queued)"""
+        with self._lock:
+            if session_id in self._scheduled:
+                return
+            self._scheduled.add(session_id)
+        self._queue.put(session_id)
+
+    def _run(self):
+        while True:
+            session_id = self._queue.get()
+            with self._lock:
+                self._scheduled.discard(session_id)
+            try:
+                self.summarize_if_needed(session_id)
+            except Exception as e:
+                print(f"❌ Summarizer error for session {session_id}: {e}")
+
+    def summarize_if_needed(self, session_id):
+        """Fold older turns into the summary once they overflow the budget or the turn window"""
+        summary, summarized_through = self._load_state(session_id)
+        turns = self._load_turns_after(session_id, summarized_through or 0, self.max_fold_turns)
+
+        total = sum(estimate_tokens(turn_text(turn)) for turn in turns)
+        too_many = self.max_turns is not None and len(turns) > self.max_turns
+        if total <= self.builder.token_budget and not too_many:
+            return False
+
+        keep = self.builder.select_recent(turns, int(self.builder.token_budget * self.keep_ratio))
+        if self.max_turns is not None:
+            keep = keep[-max(1, int(self.max_turns * self.keep_ratio)):]
+        fold = turns[:len(turns) - len(keep)]
+        if not fold:
+            return False
+
+        new_summary = self.ai_service.summarize_conversation(summary, fold)
+        if not new_summary:
+            return False
+
+        self._store_summary(session_id, new_summary, fold[-1]['id'])
+        print(f"🧾 Folded {len(fold)} turns into the summary for session {session_id}")
+        return True
@@ -0,0 +1,257 @@
+"""
+Emotion Labeler - server-side emotion labels for user turns
+Keyword matching in one pass (Aho-Corasick) plus optional batched model inference,
+run in micro-batches off the request thread; `--backfill` labels existing rows
+"""
+import argparse
+import threading
+from collections import deque
+
+# Same vocabulary as the browser's emotionDetection.js
+EMOTION_KEYWORDS = {
+    'joy': ['happy', 'joy', 'excited', 'grateful', 'proud', 'wonderful', 'excellent', 'amazing', 'love', 'success', 'achievement', 'celebrate', 'thrilled'],
+    'sadness': ['sad', 'unhappy', 'depressed', 'down', 'lonely', 'miserable', 'devastated', 'grief', 'loss', 'disappointed', 'failed', 'upset'],
+    'anger': ['angry', 'furious', 'rage', 'mad', 'frustrated', 'irritated', 'annoyed', 'hateful', 'disgusted', 'hostile', 'aggressive'],
+    'fear': ['fear', 'afraid', 'terrified', 'anxious', 'nervous', 'worried', 'scared', 'panic', 'dread', 'phobia', 'threatened'],
+    'anxiety': ['anxiety', 'anxious', 'stress', 'stressed', 'tension', 'worry', 'uneasy', 'restless', 'overwhelmed', 'nervous', 'pressured'],
+    'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'unexpected', 'wow', 'incredible', 'stunning'],
+    'neutral': ['okay', 'fine', 'alright', 'normal', 'nothing', 'whatever', 'sure']
+}
+
+NEUTRAL = [{'label': 'neutral', 'score': 1.0}]
+
+# Sentiment model used by the browser; its labels are mapped onto emotions below
+SENTIMENT_MODEL = 'distilbert-base-uncased-finetuned-sst-2-english'
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over all emotion keywords
+
+    Finds every keyword occurring anywhere in a text (substring semantics,
+    like the browser's includes() loop) in a single pass over the text,
+    instead of one scan per keyword.
+    """
+
+    def __init__(self, keywords_by_label=EMOTION_KEYWORDS):
+        self._labels = {}  # keyword -> labels it counts for
+        for label, keywords in keywords_by_label.items():
+            for keyword in keywords:
+                self._labels.setdefault(keyword, [])
+                if label not in self._labels[keyword]:
+                    self._labels[keyword].append(label)
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for keyword in self._labels:
+            self._insert(keyword)
+        self._build_failure_links()
+
+    def _insert(self, keyword):
+        node = 0
+        for char in keyword:
+            if char not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[node][char] = len(self._goto) - 1
+            node = self._goto[node][char]
+        self._output[node] = self._output[node] + (keyword,)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                # A match ending here also ends every suffix match
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text):
+        """Return the set of keywords that occur in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        node = 0
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def labels(self, text):
+        """
+        Emotion labels for a text, scored by keyword share
+
+        Returns:
+            list: Up to three {label, score} dicts, highest score first
+            (empty if no keyword matched)
+        """
+        counts = {}
+        for keyword in self.find(text):
+            for label in self._labels[keyword]:
+                counts[label] = counts.get(label, 0) + 1
+
+        total = sum(counts.values())
+        if not total:
+            return []
+        top = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:3]
+        return _normalize([{'label': label, 'score': count / total} for label, count in top])
+
+
+def _normalize(labels):
+    """Rescale scores to sum to 1 and drop anything under 5% (as the browser does)"""
+    total = sum(item['score'] for item in labels)
+    normalized = [
+        {'label': item['label'], 'score': round(item['score'] / total, 4)}
+        for item in labels if total and item['score'] / total > 0.05
+    ]
+    return sorted(normalized, key=lambda item: item['score'], reverse=True)
+
+
+class SentimentClassifier:
+    """Batched transformers sentiment pipeline (loaded lazily on first use)"""
+
+    def __init__(self, model_name=SENTIMENT_MODEL, batch_size=32, min_confidence=0.9):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.min_confidence = min_confidence
+        self._pipeline = None
+
+    def _load(self):
+        if self._pipeline is None:
+            from transformers import pipeline
+            print(f"🧠 Loading emotion model {self.model_name}...")
+            self._pipeline = pipeline('text-classification', model=self.model_name)
+        return self._pipeline
+
+    def classify(self, texts):
+        """
+        Emotion labels for many texts in one batched forward pass each
+
+        Returns:
+            list: Per text, a list of {label, score} dicts, or [] when the
+            model isn't confident enough to say anything
+        """
+        results = self._load()(list(texts), batch_size=self.batch_size, truncation=True)
+        return [self._to_emotions(result) for result in results]
+
+    def _to_emotions(self, result):
+        score = result['score']
+        if score < self.min_confidence:
+            return []
+        # Same sentiment -> emotion split as emotionDetection.js
+        if 'positive' in result['label'].lower():
+            labels = [('joy', 0.7), ('surprise', 0.3)]
+        else:
+            labels = [('sadness', 0.4), ('anxiety', 0.3), ('anger', 0.2), ('fear', 0.1)]
+        return _normalize([{'label': label, 'score': score * share} for label, share in labels])
+
+
+class EmotionLabeler:
+    """
+    Background worker that fills turns.emotion_labels for user turns
+
+    Unlabelled turns are fetched, labelled and written back in micro-batches.
+    notify() wakes the worker right after new turns are saved; it also polls
+    every `interval` seconds so turns committed later (write-behind) are
+    picked up. Keywords decide the labels; the model, if enabled, only
+    labels turns where no keyword matched.
+    """
+
+    def __init__(self, load_unlabeled, apply_labels, classifier=None, batch_size=64, interval=5.0):
+        self.matcher = KeywordMatcher()
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.interval = interval
+        self._load_unlabeled = load_unlabeled
+        self._apply_labels = apply_labels
+
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="emotion-labeler")
+        self._thread.start()
+        print(f"✅ Emotion labeler running in background (batch {self.batch_size})")
+
+    def notify(self):
+        """Signal that new user turns were saved"""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                while self.label_next_batch() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"❌ Emotion labeling error: {e}")
+
+    def label_texts(self, texts):
+        """Label a batch of texts (keywords first, one model pass for the rest)"""
+        labels = [self.matcher.labels(text) for text in texts]
+
+        if self.classifier is not None:
+            unmatched = [i for i, found in enumerate(labels) if not found and texts[i].strip()]
+            if unmatched:
+                try:
+                    for i, found in zip(unmatched, self.classifier.classify([texts[i] for i in unmatched])):
+                        labels[i] = found
+                except Exception as e:
+                    print(f"❌ Emotion model error (keywords only for this batch): {e}")
+
+        return [found or NEUTRAL for found in labels]
+
+    def label_next_batch(self):
+        """
+        Label up to batch_size unlabelled user turns
+
+        Returns:
+            int: Number of turns fetched (less than batch_size means caught up)
+        """
+        turns = self._load_unlabeled(self.batch_size)
+        if not turns:
+            return 0
+        labels = self.label_texts([turn['content'] for turn in turns])
+        self._apply_labels([(turn['id'], found) for turn, found in zip(turns, labels)])
+        return len(turns)
+
+    def backfill(self):
+        """Label every existing unlabelled user turn; returns how many were labelled"""
+        total = 0
+        while True:
+            count = self.label_next_batch()
+            total += count
+            if count:
+                print(f"🏷️  Labelled {total} turns so far...")
+            if count < self.batch_size:
+                return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Label stored user turns with emotions')
+    parser.add_argument('--backfill', action='store_true', help='label every existing unlabelled turn and exit')
+    parser.add_argument('--model', action='store_true', help='also use the sentiment model for turns without keywords')
+    parser.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.error('nothing to do (pass --backfill)')
+
+    from database.database import init_database, get_unlabeled_turns, apply_emotion_labels
+    init_database()
+    labeler = EmotionLabeler(
+        get_unlabeled_turns,
+        apply_emotion_labels,
+        classifier=SentimentClassifier() if args.model else None,
+        batch_size=args.batch_size
+    )
+    print(f"✅ Backfill complete: {labeler.backfill()} turns labelled")
@@ -0,0 +1,146 @@
+"""
+Intro Pool - pre-generated session introductions
+A background thread keeps a pool of greetings (generic ones and {name} templates)
+topped up, so starting a session is a memory lookup instead of an LLM round trip
+"""
+import random
+import threading
+import time
+
+NAME_PLACEHOLDER = "{name}"
+
+
+class _Intro:
+    __slots__ = ('text', 'created_at', 'uses')
+
+    def __init__(self, text):
+        self.text = text
+        self.created_at = time.time()
+        self.uses = 0
+
+
+class IntroPool:
+    """
+    Pools of ready-made intros, refilled in the background
+
+    Two pools are kept: generic greetings, and templates containing
+    {name} for when the user's name is known. An intro is retired after
+    max_uses sessions or once it is older than max_age seconds, so users
+    don't keep hearing the same greeting; the refill thread then replaces
+    it. When a pool is empty, take() returns None and the caller falls
+    back (it never waits on the model).
+
+    If a tts_service is given, generic intros are pre-synthesized so their
+    audio comes straight from the TTS cache.
+    """
+
+    def __init__(self, generate, size=6, max_uses=3, max_age=3600, tts_service=None,
+                 voice_name="emma", prepare_speech=None, retry_delay=30):
+        """
+        Args:
+            generate: callable(template) -> intro text, or None on failure;
+                template=True must return text containing {name}
+            size (int): Intros kept in each pool
+            max_uses (int): Sessions an intro is used for before it is retired
+            max_age (int): Seconds before an intro is retired regardless of use
+            tts_service: Optional TTSService used to pre-synthesize generic intros
+            voice_name (str): Voice to pre-synthesize with
+            prepare_speech: Optional callable(text) -> text as it will be spoken
+            retry_delay (int): Seconds to wait after a failed generation
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.tts_service = tts_service
+        self.voice_name = voice_name
+        self.retry_delay = retry_delay
+        self._generate = generate
+        self._prepare_speech = prepare_speech or (lambda text: text)
+
+        self._pools = {False: [], True: []}  # template? -> list of _Intro
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True, name="intro-pool")
+        self._thread.start()
+        print(f"✅ Intro pool refilling in background ({size} generic + {size} named)")
+
+    def take(self, user_name=None):
+        """
+        Return a ready intro (personalized if user_name is given), or None if none is ready
+
+        Never blocks on the model.
+        """
+        template = bool(user_name)
+        with self._lock:
+            pool = self._pools[template]
+            self._expire(pool)
+            if not pool:
+                self.misses += 1
+                self._wake.set()
+                return None
+
+            intro = random.choice(pool)
+            intro.uses += 1
+            if intro.uses >= self.max_uses:
+                pool.remove(intro)
+                self._wake.set()
+            self.hits += 1
+
+        if template:
+            return intro.text.replace(NAME_PLACEHOLDER, user_name)
+        return intro.text
+
+    def stats(self):
+        with self._lock:
+            return {
+                'generic': len(self._pools[False]),
+                'named': len(self._pools[True]),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _expire(self, pool):
+        """Drop intros past max_age (lock held)"""
+        cutoff = time.time() - self.max_age
+        stale = [intro for intro in pool if intro.created_at < cutoff]
+        for intro in stale:
+            pool.remove(intro)
+        if stale:
+            self._wake.set()
+
+    def _missing(self):
+        """Which pool needs an intro next (None when both are full)"""
+        with self._lock:
+            for template in (False, True):
+                self._expire(self._pools[template])
+                if len(self._pools[template]) < self.size:
+                    return template
+        return None
+
+    def _run(self):
+        while True:
+            template = self._missing()
+            if template is None:
+                # Full: sleep until an intro is used up, or the oldest one ages out
+                self._wake.wait(self.max_age / 4)
+                self._wake.clear()
+                continue
+
+            try:
+                text = self._generate(template)
+            except Exception as e:
+                print(f"❌ Intro pool generation error: {e}")
+                text = None
+
+            if not text or (template and NAME_PLACEHOLDER not in text):
+                time.sleep(self.retry_delay)
+                continue
+
+            with self._lock:
+                self._pools[template].append(_Intro(text))
+
+            if not template and self.tts_service is not None:
+                self.tts_service.prewarm([self._prepare_speech(text)], voice_names=(self.voice_name,))
@@ -0,0 +1,252 @@
+"""
+Knowledge Index - vector retrieval over the knowledge_base table
+Embeddings live in one contiguous float32 matrix on disk, memory-mapped at startup
+"""
+import json
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+# Words too common to say anything about which entry matches
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from have how i i'm if in is it its just me my "
+    "not of on or so that the this to too was we what when with you your".split()
+)
+
+
+class HashingEmbedder:
+    """
+    Lightweight offline embedder (no model download)
+
+    Hashes word unigrams and bigrams into a fixed number of buckets and
+    L2-normalizes the result. Good enough for keyword-level matching of
+    coping material; swap in SentenceTransformerEmbedder for semantics.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+
+    def embed(self, texts):
+        """Embed a batch of texts into an (n, dim) float32 matrix of unit vectors"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [_stem(word) for word in re.findall(r"[a-z0-9']+", text.lower()) if word not in STOPWORDS]
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                digest = zlib.crc32(feature.encode('utf-8'))
+                # Top bit picks the sign so collisions tend to cancel out
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                matrix[row, digest % self.dim] += sign
+        return _normalize(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """sentence-transformers embedder (loaded lazily on first use)"""
+
+    def __init__(self, model_name='all-MiniLM-L6-v2'):
+        self.model_name = model_name
+        self.name = f'sentence-transformers/{model_name}'
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def dim(self):
+        return self._load().get_sentence_embedding_dimension()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"🧠 Loading embedding model {self.model_name}...")
+                self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def embed(self, texts):
+        vectors = self._load().encode(list(texts), batch_size=32, convert_to_numpy=True,
+                                      normalize_embeddings=True)
+        return vectors.astype(np.float32)
+
+
+def _stem(word):
+    """Crude suffix stripping so plurals and -ing/-ed forms share buckets"""
+    for suffix in ('ing', 'ed', 'ly', 'es', 's'):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def get_embedder(name=None):
+    """Pick an embedder by name ('hashing' or 'sentence-transformers')"""
+    name = name or os.getenv('KB_EMBEDDER', 'hashing')
+    if name == 'sentence-transformers':
+        return SentenceTransformerEmbedder(os.getenv('KB_EMBEDDING_MODEL', 'all-MiniLM-L6-v2'))
+    return HashingEmbedder()
+
+
+def entry_text(entry):
+    """Text that represents a knowledge_base row for embedding"""
+    return f"{entry.get('title') or ''}. {entry.get('content') or ''}"
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class KnowledgeIndex:
+    """
+    Top-k cosine search over knowledge_base embeddings
+
+    Layout in index_dir:
+        embeddings.f32  row-major float32 matrix, one unit vector per entry
+        meta.json       embedder name, dimension and the row -> entry id list
+
+    New rows are appended to the matrix file and the memory map is
+    refreshed, so adding entries never re-embeds existing ones. meta.json
+    is the commit point: matrix rows beyond its id list (left by a crash
+    between the two writes) are cut off before the file is mapped or grown.
+    The dimension comes from meta.json or the first embedded batch, so
+    opening an index never loads the embedding model.
+    """
+
+    def __init__(self, index_dir, embedder=None):
+        self.index_dir = index_dir
+        self.embedder = embedder or get_embedder()
+        self.matrix_path = os.path.join(index_dir, 'embeddings.f32')
+        self.meta_path = os.path.join(index_dir, 'meta.json')
+
+        self._lock = threading.Lock()
+        self._ids = []
+        self._dim = None
+        self._matrix = None
+
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _load(self):
+        """Memory-map the stored matrix if it matches the current embedder"""
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.matrix_path)):
+            return
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta.get('embedder') != self.embedder.name:
+            print("♻️  Knowledge index was built with a different embedder - rebuilding")
+            self._reset()
+            return
+
+        self._ids = meta['ids']
+        self._dim = meta['dim']
+        if os.path.getsize(self.matrix_path) < self._matrix_bytes():
+            print("♻️  Knowledge index matrix is shorter than its metadata - rebuilding")
+            self._reset()
+            return
+        self._truncate()
+        self._map()
+        print(f"✅ Knowledge index loaded ({len(self._ids)} entries, memory-mapped)")
+
+    def _matrix_bytes(self):
+        return len(self._ids) * self._dim * 4 if self._ids else 0
+
+    def _truncate(self):
+        """Drop matrix rows that meta.json doesn't list (an add interrupted before its commit)"""
+        if os.path.exists(self.matrix_path) and os.path.getsize(self.matrix_path) > self._matrix_bytes():
+            with open(self.matrix_path, 'r+b') as f:
+                f.truncate(self._matrix_bytes())
+
+    def _map(self):
+        if self._ids:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r',
+                                     shape=(len(self._ids), self._dim))
+        else:
+            self._matrix = None
+
+    def _reset(self):
+        self._ids = []
+        self._dim = None
+        self._matrix = None
+        for path in (self.matrix_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _write_meta(self):
+        temp_path = f"{self.meta_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'embedder': self.embedder.name, 'dim': self._dim, 'ids': self._ids}, f)
+        os.replace(temp_path, self.meta_path)
+
+    def add(self, entries):
+        """
+        Embed and append knowledge_base rows that aren't indexed yet
+
+        Args:
+            entries: Iterable of dicts with id, title and content
+
+        Returns:
+            int: Number of rows added
+        """
+        with self._lock:
+            known = set(self._ids)
+            new_entries = [entry for entry in entries if entry['id'] not in known]
+            if not new_entries:
+                return 0
+
+            vectors = self.embedder.embed([entry_text(entry) for entry in new_entries])
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            # Release the old map before growing the file underneath it
+            self._matrix = None
+            self._truncate()
+            with open(self.matrix_path, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            self._ids = self._ids + [entry['id'] for entry in new_entries]
+            self._write_meta()
+            self._map()
+            return len(new_entries)
+
+    def sync(self, entries):
+        """Bring the index in line with the current knowledge_base rows"""
+        entries = list(entries)
+        current = {entry['id'] for entry in entries}
+        with self._lock:
+            stale = any(entry_id not in current for entry_id in self._ids)
+            if stale:
+                # Rows were deleted - rebuild rather than leave holes in the matrix
+                self._reset()
+        added = self.add(entries)
+        print(f"✅ Knowledge index synced: {len(self)} entries ({added} newly embedded)")
+        return added
+
+    def search(self, query, k=3, min_score=0.0):
+        """Return up to k (entry_id, score) pairs for one query, best first"""
+        return self.search_batch([query], k, min_score)[0]
+
+    def search_batch(self, queries, k=3, min_score=0.0):
+        """
+        Vectorized top-k cosine search for several queries at once
+
+        Returns:
+            list: One list of (entry_id, score) pairs per query, best first
+        """
+        with self._lock:
+            matrix, ids = self._matrix, self._ids
+        if not len(ids) or not queries:
+            return [[] for _ in queries]
+
+        query_vectors = self.embedder.embed(list(queries))
+        scores = query_vectors @ matrix.T  # (queries, entries); rows are unit vectors
+        k = min(k, len(ids))
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ranked = candidates[np.argsort(-scores[row, candidates])]
+            results.append([(ids[i], float(scores[row, i])) for i in ranked if scores[row, i] >= min_score])
+        return results
@@ -0,0 +1,253 @@
+"""
+LLM Backends - chat completion engines behind MentalHealthAI
+Groq cloud API, or a local llama.cpp model that keeps the system prompt's KV cache warm
+"""
+import asyncio
+import os
+import threading
+import time
+
+
+class GroqBackend:
+    """Groq cloud inference (default)"""
+
+    label = "Groq API"
+
+    def __init__(self, model, api_key=None):
+        from groq import Groq
+
+        api_key = api_key or os.getenv('GROQ_API_KEY')
+        if not api_key:
+            raise ValueError(
+                "GROQ_API_KEY not found in environment variables!\n"
+                "Please create a .env file in backend folder with:\n"
+                "GROQ_API_KEY=your_key_here"
+            )
+        self.model = model
+        self.client = Groq(api_key=api_key)
+        # Created on the asyncio server's event loop the first time astream() runs
+        self._api_key = api_key
+        self._async_client = None
+        print("✅ Groq client initialized successfully!")
+
+    def complete(self, messages, temperature=0.7, max_tokens=150, top_p=1.0):
+        """Return the full completion text for chat-format messages"""
+        chat_completion = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            stream=False
+        )
+        return chat_completion.choices[0].message.content.strip()
+
+    def stream(self, messages, temperature=0.7, max_tokens=150, top_p=1.0):
+        """Yield completion text fragments as they are generated"""
+        stream = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+
+    async def astream(self, messages, temperature=0.7, max_tokens=150, top_p=1.0):
+        """Async stream() using AsyncGroq (for the asyncio server)"""
+        from groq import AsyncGroq
+
+        if self._async_client is None:
+            self._async_client = AsyncGroq(api_key=self._api_key)
+        stream = await self._async_client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            stream=True
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+
+
+# Prompt layouts for local models; placeholders are filled per message.
+# 'open' starts the first user turn when no system message has opened it already
+CHAT_FORMATS = {
+    'llama-2': {
+        'system': "[INST] <<SYS>>\n{content}\n<</SYS>>\n\n",
+        'open': "[INST] ",
+        'user': "{content} [/INST]",
+        'assistant': " {content} [INST] ",
+        'generation': "",
+        'stop': ["[INST]", "</s>"]
+    },
+    'chatml': {
+        'system': "<|im_start|>system\n{content}<|im_end|>\n",
+        'open': "",
+        'user': "<|im_start|>user\n{content}<|im_end|>\n",
+        'assistant': "<|im_start|>assistant\n{content}<|im_end|>\n",
+        'generation': "<|im_start|>assistant\n",
+        'stop': ["<|im_end|>", "<|im_start|>"]
+    }
+}
+
+
+def render_prompt(chat_format, messages):
+    """
+    Chat-format messages -> prompt text for a local model
+
+    A leading system message becomes the prompt's prefix (so the cached
+    system-prompt state matches); user-only prompts such as summaries and
+    pooled intros open their first turn with the format's 'open' text.
+
+    Args:
+        chat_format (dict): One of CHAT_FORMATS
+        messages (list): {'role', 'content'} dicts
+
+    Returns:
+        str: Prompt ending where the model should start generating
+    """
+    parts = []
+    notes = []
+    for index, message in enumerate(messages):
+        role, content = message['role'], message['content']
+        if role == 'system':
+            if index == 0:
+                parts.append(chat_format['system'].format(content=content))
+            else:
+                # Extra system messages (summary, knowledge) ride along with the next user turn
+                notes.append(content)
+            continue
+        if role == 'user':
+            if notes:
+                content = "\n\n".join(notes + [content])
+                notes = []
+            if not parts:
+                parts.append(chat_format['open'])
+        parts.append(chat_format[role].format(content=content))
+    return "".join(parts) + chat_format['generation']
+
+
+class LlamaCppBackend:
+    """
+    Local CPU inference through llama-cpp-python (no network)
+
+    The fixed system prompt is evaluated once at startup and its KV state
+    saved. Every chat prompt starts with exactly that text, so before a
+    request the model is rewound to the saved state if it has drifted
+    (llama.cpp then skips the shared prefix and only evaluates the new
+    tokens). Consecutive turns of one session share even more and reuse
+    the whole previous prompt. The model holds one context, so requests
+    are serialized.
+    """
+
+    label = "local llama.cpp model"
+
+    def __init__(self, model_path, system_prompt, chat_format='llama-2', n_ctx=4096, n_threads=None):
+        from llama_cpp import Llama
+
+        if chat_format not in CHAT_FORMATS:
+            raise ValueError(f"Unknown chat format '{chat_format}' (choose from {', '.join(CHAT_FORMATS)})")
+
+        print(f"🧠 Loading local model {model_path}...")
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        self.format = CHAT_FORMATS[chat_format]
+        self.system_prompt = system_prompt
+        self._lock = threading.Lock()
+
+        # Evaluate the system prompt once and keep its KV state for every request
+        start = time.time()
+        self._prefix = self.format['system'].format(content=system_prompt)
+        self._prefix_tokens = self.llm.tokenize(self._prefix.encode('utf-8'))
+        self.llm.eval(self._prefix_tokens)
+        self._prefix_state = self.llm.save_state()
+        print(f"✅ System prompt cached ({len(self._prefix_tokens)} tokens in {time.time() - start:.1f}s)")
+
+    def _render(self, messages):
+        return render_prompt(self.format, messages)
+
+    def _rewind_to_prefix(self, prompt):
+        """Restore the cached system-prompt state unless the model already holds it"""
+        if not prompt.startswith(self._prefix):
+            return
+        held = self.llm.longest_token_prefix(self.llm._input_ids.tolist(), self._prefix_tokens)
+        if held < len(self._prefix_tokens):
+            self.llm.load_state(self._prefix_state)
+
+    def complete(self, messages, temperature=0.7, max_tokens=150, top_p=1.0):
+        """Return the full completion text for chat-format messages"""
+        return "".join(self.stream(messages, temperature, max_tokens, top_p)).strip()
+
+    def stream(self, messages, temperature=0.7, max_tokens=150, top_p=1.0):
+        """Yield completion text fragments as they are generated"""
+        prompt = self._render(messages)
+        with self._lock:
+            self._rewind_to_prefix(prompt)
+            for chunk in self.llm.create_completion(
+                prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                stop=self.format['stop'],
+                stream=True
+            ):
+                token = chunk['choices'][0]['text']
+                if token:
+                    yield token
+
+    async def astream(self, messages, temperature=0.7, max_tokens=150, top_p=1.0):
+        """
+        Async stream() for the asyncio server
+
+        Inference is CPU-bound, so it runs on a worker thread; the event
+        loop only waits for each token.
+        """
+        tokens = self.stream(messages, temperature, max_tokens, top_p)
+        done = object()
+        try:
+            while True:
+                token = await asyncio.to_thread(next, tokens, done)
+                if token is done:
+                    return
+                yield token
+        finally:
+            await asyncio.to_thread(tokens.close)
+
+
+def create_backend(model, system_prompt):
+    """
+    Build the backend selected by LLM_BACKEND ('groq' or 'llama_cpp')
+
+    Args:
+        model (str): Groq model name (used by the groq backend)
+        system_prompt (str): Prompt every chat request starts with
+    """
+    backend = os.getenv('LLM_BACKEND', 'groq').lower()
+
+    if backend == 'llama_cpp':
+        model_path = os.getenv('LLAMA_MODEL_PATH')
+        if not model_path:
+            raise ValueError("LLM_BACKEND=llama_cpp needs LLAMA_MODEL_PATH (path to a GGUF model file)")
+        n_threads = os.getenv('LLAMA_THREADS')
+        return LlamaCppBackend(
+            model_path,
+            system_prompt,
+            chat_format=os.getenv('LLAMA_CHAT_FORMAT', 'llama-2'),
+            n_ctx=int(os.getenv('LLAMA_CTX', '4096')),
+            n_threads=int(n_threads) if n_threads else None
+        )
+
+    if backend != 'groq':
+        raise ValueError(f"Unknown LLM_BACKEND '{backend}' (use groq or llama_cpp)")
+    return GroqBackend(model)
@@ -0,0 +1,284 @@
+"""
+Metrics - counters, gauges and latency histograms for the voice pipeline
+Recorded in-process with monotonic clocks and rendered in the Prometheus text format at /metrics
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets (seconds) spanning cache hits to slow upstream calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    """Base class: a named family of children, one per label combination"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values):
+        """Child metric for one combination of label values (cached, so cheap to call per request)"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics act as their own single child
+        return self.labels()
+
+    def _label_text(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ('value', 'function', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = float(value)
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time (for sizes owned elsewhere)"""
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (errors, fallbacks, rejections)"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {_format_value(child.get())}"]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (active sessions, queue depth)"""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {_format_value(child.get())}"]
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of a with-block (perf_counter, so clock changes don't matter)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """Latency distribution in fixed buckets (p50/p99 via histogram_quantile)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child):
+        with child.lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            lines.append(
+                f"{self.name}_bucket{self._label_text(values, [('le', _format_value(bound))])} {cumulative}"
+            )
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """All metrics of the process, in registration order"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StepTimer:
+    """Times the consecutive steps of one request into STAGE_SECONDS"""
+
+    def __init__(self, histogram=None):
+        self._histogram = histogram or STAGE_SECONDS
+        self.started = self._last = time.perf_counter()
+        self.steps = {}
+
+    def step(self, name):
+        """Close the step that ran since the previous one; returns its seconds"""
+        now = time.perf_counter()
+        elapsed = self.steps[name] = now - self._last
+        self._last = now
+        self._histogram.labels(name).observe(elapsed)
+        return elapsed
+
+    def total(self, name='total'):
+        """Record the whole request's time; returns its seconds"""
+        elapsed = time.perf_counter() - self.started
+        self._histogram.labels(name).observe(elapsed)
+        return elapsed
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.steps.items())
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ============================================================================
+# Pipeline metrics (recorded where the old print timings were)
+# ============================================================================
+STAGE_SECONDS = Histogram(
+    'zenith_stage_seconds', 'Latency of each voice/chat pipeline step', ['stage']
+)
+LLM_SECONDS = Histogram(
+    'zenith_llm_seconds', 'LLM call latency (complete = whole reply, stream = until the last token)', ['mode']
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    'zenith_llm_first_token_seconds', 'Time from the streaming LLM request to its first token'
+)
+TRANSCRIPTION_SECONDS = Histogram(
+    'zenith_transcription_seconds', 'Whisper transcription latency'
+)
+TTS_SECONDS = Histogram(
+    'zenith_tts_synthesis_seconds', 'Edge TTS synthesis latency (cache hits included)'
+)
+UPSTREAM_ERRORS = Counter(
+    'zenith_upstream_errors_total', 'Failed calls to upstream services', ['service']
+)
+FALLBACKS = Counter(
+    'zenith_fallbacks_total', 'Canned texts sent because generation failed', ['kind']
+)
+ACTIVE_SESSIONS = Gauge(
+    'zenith_active_sessions', 'Real-time voice sessions currently open'
+)
+STAGE_QUEUE_DEPTH = Gauge(
+    'zenith_stage_queue_depth', 'Jobs admitted to a stage but not started yet', ['stage']
+)
+STAGE_RUNNING = Gauge(
+    'zenith_stage_running', 'Jobs a stage is running right now', ['stage']
+)
+STAGE_WAIT_SECONDS = Histogram(
+    'zenith_stage_wait_seconds', 'Time jobs spend queued before a stage worker picks them up', ['stage']
+)
+STAGE_REJECTED = Counter(
+    'zenith_stage_rejected_total', 'Jobs shed because the stage queue was full', ['stage']
+)
+AUDIO_BYTES_IN = Counter(
+    'zenith_audio_bytes_received_total', 'Uploaded audio bytes before preprocessing'
+)
+AUDIO_BYTES_SAVED = Counter(
+    'zenith_audio_bytes_saved_total', 'Audio bytes not sent to Whisper thanks to preprocessing'
+)
+AUDIO_PREPROCESS_SECONDS = Histogram(
+    'zenith_audio_preprocess_seconds', 'Time spent resampling, trimming and re-encoding uploads'
+)
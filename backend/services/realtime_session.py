@@ -0,0 +1,281 @@
+"""
+Realtime Session - streaming audio intake for Socket.IO voice sessions
+Ring-buffers incoming frames and detects end-of-utterance with an energy VAD
+"""
+import io
+import threading
+import wave
+
+import numpy as np
+
+# Client-supplied stream settings are checked against these before anything is allocated
+SAMPLE_RATES = (8000, 16000, 24000, 48000)
+ENCODINGS = ('pcm16', 'opus', 'webm')
+
+
+def stream_options(data):
+    """
+    Validate the audio settings a client sends with start_session
+
+    Args:
+        data (dict): start_session payload (sample_rate, encoding; both optional)
+
+    Returns:
+        tuple: (sample_rate, encoding)
+
+    Raises:
+        ValueError: Unsupported sample rate or encoding
+    """
+    encoding = data.get('encoding', 'pcm16')
+    try:
+        sample_rate = int(data.get('sample_rate', 16000))
+    except (TypeError, ValueError):
+        sample_rate = None
+    if sample_rate not in SAMPLE_RATES:
+        raise ValueError(f"sample_rate must be one of {', '.join(map(str, SAMPLE_RATES))}")
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+    return sample_rate, encoding
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity byte ring buffer
+
+    Positions are absolute byte offsets into the stream, so a reader can ask
+    for "everything since position N" as long as it hasn't been overwritten.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._written = 0  # total bytes ever written
+
+    @property
+    def position(self):
+        """Absolute offset of the next byte to be written"""
+        return self._written
+
+    @property
+    def oldest_position(self):
+        """Absolute offset of the oldest byte still held"""
+        return max(0, self._written - self.capacity)
+
+    def write(self, data):
+        """Append bytes, overwriting the oldest data once full"""
+        data = memoryview(data)
+        if len(data) >= self.capacity:
+            # Only the tail fits
+            self._written += len(data) - self.capacity
+            data = data[-self.capacity:]
+
+        start = self._written % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        self._buffer[0:len(data) - first] = data[first:]
+        self._written += len(data)
+
+    def read_since(self, position):
+        """Return all bytes from absolute position (clamped to what is still held) to now"""
+        position = max(position, self.oldest_position)
+        length = self._written - position
+        if length <= 0:
+            return b""
+
+        start = position % self.capacity
+        end = start + length
+        if end <= self.capacity:
+            return bytes(self._buffer[start:end])
+        return bytes(self._buffer[start:]) + bytes(self._buffer[:end - self.capacity])
+
+
+class EnergyVAD:
+    """
+    Frame-energy voice activity detector for 16-bit little-endian mono PCM
+
+    Speech starts after start_ms of consecutive loud frames and ends after
+    end_silence_ms of consecutive quiet frames.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=30, threshold=500, start_ms=90, end_silence_ms=700):
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.threshold = threshold
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_silence_ms // frame_ms)
+
+        self.in_speech = False
+        self._loud_run = 0
+        self._quiet_run = 0
+        self._pending = b""
+
+    def process(self, pcm):
+        """
+        Feed PCM bytes and return VAD events
+
+        Args:
+            pcm (bytes): 16-bit little-endian mono samples
+
+        Returns:
+            list: (event, byte_offset) tuples where event is 'speech_start' or
+            'speech_end' and byte_offset is relative to the start of pcm
+            (negative for speech that began in earlier chunks)
+        """
+        data = self._pending + pcm
+        base = -len(self._pending)
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+
+        events = []
+        if not usable:
+            return events
+
+        samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32)
+        frames = samples.reshape(-1, self.frame_bytes // 2)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+
+        for index, energy in enumerate(rms):
+            frame_end = base + (index + 1) * self.frame_bytes
+            if energy >= self.threshold:
+                self._loud_run += 1
+                self._quiet_run = 0
+                if not self.in_speech and self._loud_run >= self.start_frames:
+                    self.in_speech = True
+                    events.append(('speech_start', frame_end - self._loud_run * self.frame_bytes))
+            else:
+                self._quiet_run += 1
+                self._loud_run = 0
+                if self.in_speech and self._quiet_run >= self.end_frames:
+                    self.in_speech = False
+                    events.append(('speech_end', frame_end))
+
+        return events
+
+    def reset(self):
+        self.in_speech = False
+        self._loud_run = 0
+        self._quiet_run = 0
+        self._pending = b""
+
+
+def pcm_to_wav(pcm, sample_rate=16000):
+    """Wrap raw 16-bit mono PCM in a WAV container (in memory)"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class RealtimeVoiceSession:
+    """
+    Per-client streaming audio state
+
+    For 'pcm16' input the energy VAD finds utterance boundaries on its own.
+    Compressed input ('opus', 'webm') can't be inspected without decoding,
+    so the client marks the end of each utterance with final=True (and
+    starts a fresh recorder per utterance so every clip has its own header).
+
+    At most max_pending finished utterances are processed or waiting at a
+    time (claim_utterance / release_utterance); a client that talks faster
+    than replies come back has the extra utterances dropped.
+    """
+
+    def __init__(self, sample_rate=16000, encoding='pcm16', max_utterance_seconds=30,
+                 pre_roll_ms=300, vad_threshold=500, end_silence_ms=700, max_pending=2):
+        if sample_rate not in SAMPLE_RATES:
+            raise ValueError(f"Unsupported sample rate {sample_rate}")
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding {encoding}")
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        self.pre_roll_bytes = int(sample_rate * pre_roll_ms / 1000) * 2
+        self.max_utterance_bytes = int(sample_rate * max_utterance_seconds) * 2
+
+        self.ring = AudioRingBuffer(self.max_utterance_bytes + self.pre_roll_bytes)
+        self.vad = EnergyVAD(sample_rate=sample_rate, threshold=vad_threshold, end_silence_ms=end_silence_ms)
+        self._utterance_start = None  # absolute ring position
+        self._encoded_frames = []      # compressed frames for non-PCM input
+        self._encoded_bytes = 0
+
+        self.max_pending = max_pending
+        self._pending_utterances = 0
+        self._pending_lock = threading.Lock()
+
+    @property
+    def is_pcm(self):
+        return self.encoding == 'pcm16'
+
+    def claim_utterance(self):
+        """Reserve a processing place for one finished utterance; False when all are taken"""
+        with self._pending_lock:
+            if self._pending_utterances >= self.max_pending:
+                return False
+            self._pending_utterances += 1
+            return True
+
+    def release_utterance(self):
+        """Give back a place taken by claim_utterance (once the utterance has been answered)"""
+        with self._pending_lock:
+            self._pending_utterances -= 1
+
+    def feed(self, chunk, final=False):
+        """
+        Add one incoming chunk
+
+        Args:
+            chunk (bytes): Audio frame(s) from the client
+            final (bool): Client-side end-of-utterance marker
+
+        Returns:
+            list: Finished utterances as (audio_bytes, filename) ready for transcription
+        """
+        if not self.is_pcm:
+            return self._feed_encoded(chunk, final)
+
+        utterances = []
+        chunk_start = self.ring.position
+        self.ring.write(chunk)
+
+        for event, offset in self.vad.process(chunk):
+            position = chunk_start + offset
+            if event == 'speech_start':
+                self._utterance_start = max(position - self.pre_roll_bytes, self.ring.oldest_position)
+            elif event == 'speech_end' and self._utterance_start is not None:
+                utterances.append(self._take_utterance(position))
+
+        # Too long without a pause - cut it here rather than lose the start
+        if self._utterance_start is not None and \
+                self.ring.position - self._utterance_start >= self.max_utterance_bytes:
+            utterances.append(self._take_utterance(self.ring.position))
+            self.vad.reset()
+
+        if final and self._utterance_start is not None:
+            utterances.append(self._take_utterance(self.ring.position))
+            self.vad.reset()
+
+        return utterances
+
+    def _take_utterance(self, end_position):
+        """Cut [utterance start, end_position) out of the ring as a WAV file"""
+        pcm = self.ring.read_since(self._utterance_start)
+        pcm = pcm[:end_position - max(self._utterance_start, self.ring.oldest_position)]
+        self._utterance_start = None
+        return pcm_to_wav(pcm, self.sample_rate), 'utterance.wav'
+
+    def _feed_encoded(self, chunk, final):
+        """Collect compressed frames until the client marks the end of the utterance"""
+        if chunk:
+            self._encoded_frames.append(bytes(chunk))
+            self._encoded_bytes += len(chunk)
+
+        if not final and self._encoded_bytes < self.max_utterance_bytes:
+            return []
+
+        audio = b"".join(self._encoded_frames)
+        self._encoded_frames = []
+        self._encoded_bytes = 0
+        if not audio:
+            return []
+        return [(audio, f'utterance.{self.encoding}')]
@@ -0,0 +1,128 @@
+"""
+Service Registry - lazily built singletons with background warm-up
+Services are created on first use (or warmed up in parallel right after startup), and
+their state is reported per service so /ready can be answered separately from /health
+"""
+import threading
+import time
+
+
+class _Entry:
+    """One registered service: its factory, the built instance and how building went"""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.state = 'pending'    # pending -> starting -> ready | failed
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Build the service on first use; concurrent callers wait for the same build"""
+        if self.state == 'ready':
+            return self.instance
+
+        with self._lock:
+            if self.state == 'ready':
+                return self.instance
+
+            self.state = 'starting'
+            start = time.perf_counter()
+            try:
+                self.instance = self.factory()
+            except Exception as e:
+                # Left retryable: the next get() tries again
+                self.state = 'failed'
+                self.error = str(e)
+                print(f"❌ {self.name} failed to start: {e}")
+                raise
+            self.seconds = time.perf_counter() - start
+            self.error = None
+            self.state = 'ready'
+            print(f"✅ {self.name} ready in {self.seconds:.2f}s")
+            return self.instance
+
+    def status(self):
+        status = {'state': self.state}
+        if self.seconds is not None:
+            status['startup_seconds'] = round(self.seconds, 3)
+        if self.error:
+            status['error'] = self.error
+        return status
+
+
+class LazyService:
+    """
+    Stand-in for a registered service that builds it on first attribute access
+
+    Lets module-level names (ai_service, tts_service, ...) keep working
+    unchanged while the real objects are created later.
+    """
+
+    __slots__ = ('_entry',)
+
+    def __init__(self, entry):
+        object.__setattr__(self, '_entry', entry)
+
+    def __getattr__(self, name):
+        return getattr(self._entry.get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._entry.get(), name, value)
+
+    def __repr__(self):
+        return f"<LazyService {self._entry.name} ({self._entry.state})>"
+
+
+class ServiceRegistry:
+    """Named lazy services"""
+
+    def __init__(self):
+        self._entries = {}
+
+    def register(self, name, factory):
+        """
+        Register a service factory
+
+        Args:
+            name (str): Name reported by status()
+            factory: callable() -> service instance (called at most once on success)
+
+        Returns:
+            LazyService: Proxy to use wherever the service itself would be used
+        """
+        entry = _Entry(name, factory)
+        self._entries[name] = entry
+        return LazyService(entry)
+
+    def get(self, name):
+        return self._entries[name].get()
+
+    def warm_up(self, names=None):
+        """
+        Build services in parallel on background threads (returns immediately)
+
+        Requests that need a service before its warm-up finishes simply
+        wait for that build instead of starting another one.
+        """
+        threads = []
+        for name in names or list(self._entries):
+            entry = self._entries[name]
+            thread = threading.Thread(target=self._warm, args=(entry,), daemon=True, name=f"warmup-{name}")
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _warm(self, entry):
+        try:
+            entry.get()
+        except Exception:
+            pass  # Recorded in the entry; the first request will retry
+
+    def ready(self):
+        return all(entry.state == 'ready' for entry in self._entries.values())
+
+    def status(self):
+        return {name: entry.status() for name, entry in self._entries.items()}
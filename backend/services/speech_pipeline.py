@@ -0,0 +1,189 @@
+"""
+Speech Pipeline - overlaps TTS synthesis with streamed LLM generation
+Splits the reply at sentence boundaries and synthesizes each sentence as soon as it is complete
+"""
+import asyncio
+import re
+
+
+# A sentence ends at . ! ? or … (optionally followed by closing quotes/brackets) plus whitespace
+_SENTENCE_END = re.compile(r'[.!?…]+["\'”’)\]]*\s+')
+
+
+def clean_for_tts(text):
+    """Clean up text for more natural TTS"""
+    clean_text = text.strip()
+    clean_text = clean_text.replace('...', '.')
+    clean_text = clean_text.replace('..', '.')
+    return clean_text
+
+
+class SentenceSplitter:
+    """
+    Incrementally splits a token stream into sentences
+
+    Sentences shorter than min_chars are merged with the next one so that
+    short interjections ("ngl.", "oh no.") don't become their own TTS request.
+    """
+
+    def __init__(self, min_chars=20):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, token):
+        """
+        Add a token and return any sentences it completed
+
+        Args:
+            token (str): Next text fragment from the LLM
+
+        Returns:
+            list: Complete sentences, in order (possibly empty)
+        """
+        self._buffer += token
+        sentences = []
+        start = 0
+
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended"""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return remainder
+
+
+class SpeechPipeline:
+    """
+    Sentence-level TTS pipeline
+
+    Consumes a token stream, submits every finished sentence for synthesis
+    while generation continues, and yields audio segments strictly in order.
+    """
+
+    def __init__(self, tts_service, min_sentence_chars=20):
+        self.tts_service = tts_service
+        self.min_sentence_chars = min_sentence_chars
+        print("✅ Speech pipeline ready")
+
+    def _segment(self, index, text, audio_id):
+        """Describe a finished audio segment for the client"""
+        return {
+            'index': index,
+            'text': text,
+            'audio_id': audio_id,
+            'audio_url': f'/audio/{audio_id}' if audio_id else None
+        }
+
+    def stream(self, tokens, voice_name="emma"):
+        """
+        Run the pipeline over a token stream
+
+        Args:
+            tokens: Iterable of text fragments (e.g. MentalHealthAI.generate_response_stream)
+            voice_name: TTS voice to use for every segment
+
+        Yields:
+            tuple: ('token', str) for every LLM fragment as it arrives, and
+            ('audio', dict) for every synthesized sentence, in sentence order
+        """
+        splitter = SentenceSplitter(min_chars=self.min_sentence_chars)
+        pending = []  # (index, text, future) in sentence order
+        next_index = 0
+
+        def submit(sentence):
+            nonlocal next_index
+            # Runs on the TTS service's event loop, concurrently with generation
+            future = self.tts_service.submit_speech_id(clean_for_tts(sentence), voice_name=voice_name)
+            pending.append((next_index, sentence, future))
+            next_index += 1
+
+        def ready_segments():
+            # Only release the head of the queue so segments never arrive out of order
+            while pending and pending[0][2].done():
+                index, sentence, future = pending.pop(0)
+                yield self._segment(index, sentence, self._result(future))
+
+        try:
+            for token in tokens:
+                yield 'token', token
+                for sentence in splitter.feed(token):
+                    submit(sentence)
+                for segment in ready_segments():
+                    yield 'audio', segment
+
+            remainder = splitter.flush()
+            if remainder:
+                submit(remainder)
+
+            # Generation is done - wait for the rest in order
+            while pending:
+                index, sentence, future = pending.pop(0)
+                yield 'audio', self._segment(index, sentence, self._result(future))
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            # Stop generation too if the listener went away mid-reply
+            close = getattr(tokens, 'close', None)
+            if close is not None:
+                close()
+
+    async def astream(self, tokens, voice_name="emma"):
+        """
+        Async stream() for the asyncio server
+
+        Args:
+            tokens: Async iterable of text fragments (e.g. generate_response_stream_async)
+            voice_name: TTS voice to use for every segment
+
+        Yields:
+            tuple: Same ('token', str) / ('audio', dict) items as stream()
+        """
+        splitter = SentenceSplitter(min_chars=self.min_sentence_chars)
+        pending = []  # (index, text, task) in sentence order
+        next_index = 0
+
+        def submit(sentence):
+            nonlocal next_index
+            # Synthesis runs as its own task, concurrently with generation
+            task = asyncio.ensure_future(
+                self.tts_service.speech_id(clean_for_tts(sentence), voice_name=voice_name)
+            )
+            pending.append((next_index, sentence, task))
+            next_index += 1
+
+        try:
+            async for token in tokens:
+                yield 'token', token
+                for sentence in splitter.feed(token):
+                    submit(sentence)
+                while pending and pending[0][2].done():
+                    index, sentence, task = pending.pop(0)
+                    yield 'audio', self._segment(index, sentence, task.result())
+
+            remainder = splitter.flush()
+            if remainder:
+                submit(remainder)
+
+            while pending:
+                index, sentence, task = pending.pop(0)
+                yield 'audio', self._segment(index, sentence, await task)
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+
+    def _result(self, future):
+        """Get a synthesis result, treating failures as a missing segment"""
+        try:
+            return future.result(timeout=self.tts_service.timeout)
+        except Exception as e:
+            print(f"❌ Pipeline TTS segment failed: {e}")
+            return None
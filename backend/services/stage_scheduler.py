@@ -0,0 +1,271 @@
+"""
+Stage Scheduler - bounded worker pools for the voice pipeline
+Transcription, generation and synthesis each get their own sized pool and a bounded
+queue; when a queue is full the request is rejected at once with a Retry-After hint
+"""
+import contextlib
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.metrics import STAGE_QUEUE_DEPTH, STAGE_RUNNING, STAGE_WAIT_SECONDS, STAGE_REJECTED
+
+
+class StageOverloaded(Exception):
+    """A stage's queue is full; the caller should retry after retry_after seconds"""
+
+    def __init__(self, stage, retry_after):
+        super().__init__(f"{stage} is overloaded, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+_DONE = object()
+
+
+class _Handoff:
+    """Consumer side of Stage.stream(): items from the pool thread, in order"""
+
+    def __init__(self, handoff, abandoned):
+        self._handoff = handoff
+        self._abandoned = abandoned
+        self._finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        ok, item = self._handoff.get()
+        if not ok:
+            self.close()
+            raise item
+        if item is _DONE:
+            self.close()
+            raise StopIteration
+        return item
+
+    def close(self):
+        """Stop consuming; the producer stops at its next item"""
+        self._finished = True
+        self._abandoned.set()
+
+    def __del__(self):
+        self.close()
+
+
+class Stage:
+    """
+    One pipeline stage: a thread pool of `workers` plus at most `max_queue` waiting jobs
+
+    Admission is checked before anything is queued, so a burst beyond
+    workers + max_queue is shed immediately instead of piling up and
+    timing out together.
+    """
+
+    def __init__(self, name, workers, max_queue, timeout=60):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"stage-{name}")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._async_workers = None  # asyncio.Semaphore, built on first slot()
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_avg = 0.0       # seconds, moving average
+        self.wait_max = 0.0
+        self.service_avg = 0.0    # seconds, moving average
+
+        STAGE_QUEUE_DEPTH.labels(name).set_function(lambda: self.queued)
+        STAGE_RUNNING.labels(name).set_function(lambda: self.running)
+        self._wait_histogram = STAGE_WAIT_SECONDS.labels(name)
+        self._rejected_counter = STAGE_REJECTED.labels(name)
+
+    def _admit(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            self._rejected_counter.inc()
+            raise StageOverloaded(self.name, self.retry_after())
+        with self._lock:
+            self.queued += 1
+        return time.perf_counter()
+
+    def _started(self, admitted):
+        wait = time.perf_counter() - admitted
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.wait_avg += 0.2 * (wait - self.wait_avg)
+            self.wait_max = max(self.wait_max, wait)
+        self._wait_histogram.observe(wait)
+        return time.perf_counter()
+
+    def _finished(self, started):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+            self.service_avg += 0.2 * (elapsed - self.service_avg)
+        self._slots.release()
+
+    def _withdrawn(self):
+        # Admitted but never started (e.g. the waiting coroutine was cancelled)
+        with self._lock:
+            self.queued -= 1
+        self._slots.release()
+
+    def retry_after(self):
+        """Seconds until the current queue should have drained (at least 1)"""
+        with self._lock:
+            backlog = self.queued + self.running
+        return max(1, math.ceil(backlog / self.workers * self.service_avg))
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) on this stage's pool
+
+        Returns:
+            concurrent.futures.Future: Resolves to fn's result
+
+        Raises:
+            StageOverloaded: The queue is full
+        """
+        admitted = self._admit()
+
+        def job():
+            started = self._started(admitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._finished(started)
+
+        return self._executor.submit(job)
+
+    def run(self, fn, *args, **kwargs):
+        """submit() and wait for the result (up to the stage timeout)"""
+        return self.submit(fn, *args, **kwargs).result(timeout=self.timeout)
+
+    def stream(self, items):
+        """
+        Iterate a (lazy) iterable on this stage's pool and hand the items back
+
+        Admission happens here, before the first item, so an overloaded
+        stage is reported while the caller can still send a plain error.
+        The producer stops early if the consumer goes away.
+
+        Args:
+            items: Iterable that does the stage's work as it is consumed
+                (e.g. generate_response_stream(...))
+
+        Returns:
+            iterator: The same items, in order; close() it (even before the
+            first item) to stop the producer
+        """
+        admitted = self._admit()
+        handoff = queue.Queue()
+        abandoned = threading.Event()
+
+        def pump():
+            started = self._started(admitted)
+            try:
+                if abandoned.is_set():
+                    return  # Closed while still queued
+                for item in items:
+                    if abandoned.is_set():
+                        break
+                    handoff.put((True, item))
+                handoff.put((True, _DONE))
+            except Exception as e:
+                handoff.put((False, e))
+            finally:
+                close = getattr(items, 'close', None)
+                if close is not None:
+                    close()
+                self._finished(started)
+
+        self._executor.submit(pump)
+        return _Handoff(handoff, abandoned)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Hold one of this stage's places while async work runs on the event loop
+
+        For coroutines (AsyncGroq, Edge TTS) that don't need a pool thread:
+        admission shares the same workers + max_queue places as submit()
+        and stream(), so a burst is shed the same way in either serving
+        mode, and at most `workers` slot holders run at once.
+
+        Raises:
+            StageOverloaded: The queue is full (raised on entry, before any work)
+        """
+        admitted = self._admit()
+        if self._async_workers is None:
+            import asyncio
+            self._async_workers = asyncio.Semaphore(self.workers)
+        try:
+            await self._async_workers.acquire()
+        except BaseException:
+            self._withdrawn()
+            raise
+        started = self._started(admitted)
+        try:
+            yield
+        finally:
+            self._async_workers.release()
+            self._finished(started)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_limit': self.max_queue,
+                'queued': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'wait_ms_avg': round(self.wait_avg * 1000, 1),
+                'wait_ms_max': round(self.wait_max * 1000, 1),
+                'service_ms_avg': round(self.service_avg * 1000, 1)
+            }
+
+
+class StageScheduler:
+    """Named stages (transcription, generation, synthesis) with their own pools"""
+
+    def __init__(self, stages, timeout=60):
+        """
+        Args:
+            stages (dict): Stage name -> (workers, max_queue)
+            timeout (int): Seconds run() waits for a result
+        """
+        self.stages = {
+            name: Stage(name, workers, max_queue, timeout)
+            for name, (workers, max_queue) in stages.items()
+        }
+        print("✅ Stage scheduler ready (" + ", ".join(
+            f"{name}: {stage.workers} workers/{stage.max_queue} queued" for name, stage in self.stages.items()
+        ) + ")")
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def run(self, name, fn, *args, **kwargs):
+        return self.stages[name].run(fn, *args, **kwargs)
+
+    def stream(self, name, items):
+        return self.stages[name].stream(items)
+
+    def slot(self, name):
+        return self.stages[name].slot()
+
+    def stats(self):
+        return {name: stage.stats() for name, stage in self.stages.items()}
@@ -0,0 +1,243 @@
+"""
+TTS Cache - content-addressed cache for synthesized phrases
+Memory tier + disk tier, both size-bounded with LRU eviction
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Normalize text so trivially different spellings share a cache entry"""
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class TTSCache:
+    """
+    Two-tier LRU cache for TTS audio keyed by (text, voice, rate, volume, pitch)
+
+    The memory tier is checked first; disk hits are promoted into memory.
+    Every put goes to memory, but only phrases that repeat reach the disk
+    tier: pinned ones (pre-warmed fallbacks and intros) and any text asked
+    for a second time. One-off reply sentences are never written out.
+    Disk entries unused for disk_ttl seconds expire, and each tier evicts
+    least-recently-used entries once it exceeds its byte budget.
+    """
+
+    def __init__(self, cache_dir, memory_max_bytes=16 * 1024 * 1024, disk_max_bytes=256 * 1024 * 1024,
+                 max_text_chars=300, disk_ttl=7 * 24 * 3600, max_seen=10000):
+        self.cache_dir = cache_dir
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.max_text_chars = max_text_chars
+        self.disk_ttl = disk_ttl
+        self.max_seen = max_seen
+
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_bytes = 0
+        self._disk = OrderedDict()    # key -> (size, last used), least recently used first
+        self._disk_bytes = 0
+        self._pinned = set()          # keys that go to disk on their first put
+        self._seen = OrderedDict()    # keys stored once, in memory only (bounded)
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_disk_index()
+        print(f"✅ TTS cache ready ({len(self._disk)} phrases on disk)")
+
+    @staticmethod
+    def make_key(text, voice, rate, volume, pitch):
+        """Content address for one synthesis request"""
+        raw = '\x1f'.join([normalize_text(text), voice, rate, volume, pitch])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def cacheable(self, text):
+        """Long one-off replies aren't worth caching - only short phrases are"""
+        return len(text) <= self.max_text_chars
+
+    def pin(self, key):
+        """Keep a known-repeating phrase (fallback, intro) on disk as soon as it is stored"""
+        with self._lock:
+            self._pinned.add(key)
+
+    def contains(self, key):
+        """Check for a key without touching LRU order or counters"""
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def get(self, key):
+        """Return cached audio bytes for key, or None on a miss"""
+        with self._lock:
+            self._expire_disk()
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                # Asked for again: it repeats, so it is worth keeping on disk
+                repeated = key not in self._disk
+                if repeated:
+                    self._seen.pop(key, None)
+                else:
+                    self._touch_disk(key)
+                    self._touch_file(key)
+            elif key not in self._disk:
+                self.misses += 1
+                return None
+            else:
+                self._touch_disk(key)
+
+        if data is not None:
+            if repeated:
+                self._write_disk(key, data)
+            return data
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self._touch_file(key)
+        except OSError:
+            with self._lock:
+                self._forget_disk(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._put_memory(key, data)
+        return data
+
+    def put(self, key, data):
+        """Store audio bytes in memory, and on disk if the phrase is pinned or has been stored before"""
+        if not data:
+            return
+
+        with self._lock:
+            self._put_memory(key, data)
+            persist = key in self._pinned or key in self._seen
+            if persist:
+                self._seen.pop(key, None)
+            else:
+                self._seen[key] = None
+                while len(self._seen) > self.max_seen:
+                    self._seen.popitem(last=False)
+        if persist:
+            self._write_disk(key, data)
+
+    def _write_disk(self, key, data):
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"❌ TTS cache write failed: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            path = None
+
+        if path is None:
+            return
+        with self._lock:
+            self._forget_disk(key)
+            self._disk[key] = (len(data), time.time())
+            self._disk_bytes += len(data)
+            while self._disk and self._disk_bytes > self.disk_max_bytes:
+                self._remove_disk(next(iter(self._disk)))
+
+    def stats(self):
+        """Hit/miss counters and tier usage"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes
+            }
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _load_disk_index(self):
+        """Rebuild the disk LRU order from file modification times, dropping expired files"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.mp3'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for last_used, key, size in sorted(entries):
+            self._disk[key] = (size, last_used)
+            self._disk_bytes += size
+        self._expire_disk()
+
+    def _touch_file(self, key):
+        # Keep the on-disk LRU order (and TTL) across restarts
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _touch_disk(self, key):
+        """Mark a disk entry as just used (caller holds the lock)"""
+        size, _ = self._disk.pop(key)
+        self._disk[key] = (size, time.time())
+
+    def _expire_disk(self):
+        """Delete disk entries unused for disk_ttl seconds (caller holds the lock)"""
+        if not self.disk_ttl:
+            return
+        cutoff = time.time() - self.disk_ttl
+        # Least recently used first, so expired entries are all at the front
+        while self._disk:
+            key, (_, last_used) = next(iter(self._disk.items()))
+            if last_used >= cutoff:
+                break
+            self._remove_disk(key)
+
+    def _remove_disk(self, key):
+        """Drop a disk entry and its file (caller holds the lock)"""
+        self._forget_disk(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _put_memory(self, key, data):
+        """Insert into the memory tier (caller holds the lock)"""
+        if len(data) > self.memory_max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _forget_disk(self, key):
+        """Drop a key from the disk index (caller holds the lock)"""
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            self._disk_bytes -= entry[0]
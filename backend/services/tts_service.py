@@ -6,26 +6,50 @@ import os
 import uuid
 import ssl
 import asyncio
+import atexit
+import threading
+from services.metrics import TTS_SECONDS, UPSTREAM_ERRORS
 
-# NUCLEAR OPTION: Monkey patch ssl module BEFORE anything else imports it
-_original_create_default_context = ssl.create_default_context
+# Reply files when no audio store is configured (anchored to backend/, not the working directory)
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'audio')
 
-def _create_unverified_context(*args, **kwargs):
-    """Create SSL context with verification disabled"""
-    context = _original_create_default_context(*args, **kwargs)
+
+def _create_unverified_context():
+    """SSL context with verification disabled (works around the Edge TTS cert issue)"""
+    context = ssl.create_default_context()
     context.check_hostname = False
     context.verify_mode = ssl.CERT_NONE
     return context
 
-# Replace globally
-ssl.create_default_context = _create_unverified_context
-ssl._create_default_https_context = _create_unverified_context
 
-print("🔓 SSL verification disabled globally (fixes Edge TTS cert issue)")
+def _disable_edge_tts_ssl_verification():
+    """
+    Apply the unverified context to Edge TTS connections only
+
+    edge_tts keeps its SSL context in module globals, so swapping those leaves
+    every other HTTPS client in the process (Groq, requests) verifying certificates.
+    """
+    import edge_tts.communicate
+    import edge_tts.voices
+    context = _create_unverified_context()
+    edge_tts.communicate._SSL_CTX = context
+    edge_tts.voices._SSL_CTX = context
+    print("🔓 SSL verification disabled for Edge TTS (fixes Edge TTS cert issue)")
 
 
 class TTSService:
-    def __init__(self):
+    def __init__(self, audio_store=None, cache=None, max_concurrency=4, timeout=30):
+        # When an audio store is given, replies are kept in memory instead of written to disk
+        self.audio_store = audio_store
+        
+        # Optional TTSCache - hits skip the Edge TTS round-trip entirely
+        self.cache = cache
+        
+        # Prosody settings (part of the cache key)
+        self.rate = "+0%"      # Normal speed (try -10% to +10% for variation)
+        self.volume = "+0%"    # Normal volume
+        self.pitch = "+0Hz"    # Normal pitch
+        
         # PREMIUM VOICES - Most natural sounding neural voices
         self.voices = {
             # English (US) - Most natural
@@ -49,34 +73,202 @@ class TTSService:
         # Use Michelle for mental health - most empathetic and natural
         self.current_voice = self.voices["michelle"]
         
-        # Try to import edge_tts AFTER ssl patch
+        # edge_tts is imported here (not at module level) so importing this module stays cheap
         try:
             import edge_tts
+            _disable_edge_tts_ssl_verification()
             self.edge_tts = edge_tts
+            # Benchmarks point Edge TTS at a local stand-in (bench/fake_upstreams.py)
+            wss_url = os.getenv('EDGE_TTS_WSS_URL')
+            if wss_url:
+                import edge_tts.communicate
+                edge_tts.communicate.WSS_URL = wss_url
+                print(f"🧪 Edge TTS redirected to {wss_url}")
             print("✅ TTS Service initialized with Michelle (Premium Natural Voice)")
         except ImportError:
             print("❌ Edge TTS not installed. Install with: pip install edge-tts")
             raise ImportError("Please install Edge TTS: pip install edge-tts")
+        
+        # One long-lived event loop for all syntheses instead of asyncio.run() per request
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._loop_thread = threading.Thread(target=self._run_loop, daemon=True, name="tts-loop")
+        self._loop_thread.start()
+        atexit.register(self.close)
+        print(f"✅ TTS event loop running (max {max_concurrency} concurrent syntheses)")
+
+    def _run_loop(self):
+        """Background thread body: run the TTS event loop forever"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _limited(self, coro):
+        """Run a synthesis coroutine under the concurrency limit"""
+        async with self._semaphore:
+            return await coro
+
+    def _submit(self, coro):
+        """Schedule a coroutine on the TTS loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(self._limited(coro), self._loop)
+
+    def submit_speech(self, text, voice_name="michelle"):
+        """
+        Thread-safe: schedule synthesis into memory
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the MP3 bytes
+        """
+        voice = self.voices.get(voice_name, self.current_voice)
+        return self._submit(self.synthesize_bytes_async(text, voice))
+
+    def submit_speech_file(self, text, voice_name="michelle"):
+        """
+        Thread-safe: schedule synthesis to an MP3 file under static/audio
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the file path
+        """
+        voice = self.voices.get(voice_name, self.current_voice)
+        return self._submit(self.synthesize_async(text, voice))
+
+    def submit_speech_id(self, text, voice_name="michelle"):
+        """
+        Thread-safe: schedule synthesis and resolve to an id servable at /audio/<id>
+        
+        Uses the in-memory audio store when one is configured, otherwise
+        writes an MP3 file under static/audio.
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the audio id
+        """
+        voice = self.voices.get(voice_name, self.current_voice)
+        return self._submit(self._synthesize_id_async(text, voice))
+
+    @property
+    def loop(self):
+        """The TTS event loop (asgi.py runs the whole server on it)"""
+        return self._loop
+    
+    async def speech_id(self, text, voice_name="michelle"):
+        """
+        Awaitable submit_speech_id for async callers
+        
+        Runs directly when awaited on the TTS loop (asgi.py serves on it);
+        from any other loop it is handed over to the TTS loop.
+        
+        Returns:
+            str: Audio id servable at /audio/<id>, or None on failure
+        """
+        voice = self.voices.get(voice_name, self.current_voice)
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                pending = self._limited(self._synthesize_id_async(text, voice))
+            else:
+                pending = asyncio.wrap_future(self._submit(self._synthesize_id_async(text, voice)))
+            return await asyncio.wait_for(pending, self.timeout)
+        except Exception as e:
+            print(f"❌ Error generating speech: {e}")
+            return None
+    
+    async def _synthesize_id_async(self, text, voice):
+        """Synthesize and return the audio id for either storage mode"""
+        if self.audio_store is not None:
+            data = await self.synthesize_bytes_async(text, voice)
+            if not data:
+                raise RuntimeError("Edge TTS returned no audio")
+            return self.audio_store.put(data)
+        
+        filepath = await self.synthesize_async(text, voice)
+        return os.path.basename(filepath)
 
     async def synthesize_async(self, text, voice):
         """Generate speech with optimal settings for natural voice"""
         filename = f"response_{uuid.uuid4().hex[:8]}.mp3"
-        directory = os.path.join("static", "audio")
-        os.makedirs(directory, exist_ok=True)
-        filepath = os.path.join(directory, filename)
+        os.makedirs(AUDIO_DIR, exist_ok=True)
+        filepath = os.path.join(AUDIO_DIR, filename)
+        
+        data = await self.synthesize_bytes_async(text, voice)
+        if not data:
+            raise RuntimeError("Edge TTS returned no audio")
+        
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        
+        return filepath
+
+    async def synthesize_bytes_async(self, text, voice):
+        """Generate speech into memory by collecting the Communicate.stream() audio chunks"""
+        with TTS_SECONDS.time():
+            return await self._synthesize_bytes(text, voice)
+
+    async def _synthesize_bytes(self, text, voice):
+        key = None
+        if self.cache is not None and self.cache.cacheable(text):
+            key = self.cache.make_key(text, voice, self.rate, self.volume, self.pitch)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
         # Create communicate with optimal settings
         communicate = self.edge_tts.Communicate(
             text=text,
             voice=voice,
-            rate="+0%",      # Normal speed (try -10% to +10% for variation)
-            volume="+0%",    # Normal volume
-            pitch="+0Hz"     # Normal pitch
+            rate=self.rate,
+            volume=self.volume,
+            pitch=self.pitch
         )
         
-        await communicate.save(filepath)
+        buffer = bytearray()
+        try:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    buffer.extend(chunk["data"])
+        except Exception:
+            UPSTREAM_ERRORS.labels('edge_tts').inc()
+            raise
         
-        return filepath
+        data = bytes(buffer)
+        if key is not None and data:
+            self.cache.put(key, data)
+        
+        return data
+
+    def generate_speech_bytes(self, text, voice_name="michelle"):
+        """
+        Generate speech and return the MP3 bytes without touching the disk
+        
+        Args:
+            text: Text to convert to speech
+            voice_name: Voice to use (michelle, aria, jenny, emma, ashley, ryan, etc.)
+        """
+        try:
+            data = self.submit_speech(text, voice_name).result(timeout=self.timeout)
+            if not data:
+                print(f"❌ Edge TTS returned no audio (voice: {voice_name})")
+                return None
+            print(f"✅ Edge TTS audio created in memory: {len(data)} bytes (voice: {voice_name})")
+            return data
+            
+        except Exception as e:
+            print(f"❌ Error generating speech: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def generate_speech_id(self, text, voice_name="michelle"):
+        """
+        Generate speech and return an audio id that /audio/<id> can serve
+        
+        Uses the in-memory audio store when one is configured, otherwise
+        falls back to writing an MP3 file under static/audio.
+        """
+        try:
+            return self.submit_speech_id(text, voice_name).result(timeout=self.timeout)
+        except Exception as e:
+            print(f"❌ Error generating speech: {e}")
+            return None
 
     def generate_speech(self, text, voice_name="michelle"):
         """
@@ -87,10 +279,8 @@ class TTSService:
             voice_name: Voice to use (michelle, aria, jenny, emma, ashley, ryan, etc.)
         """
         try:
-            # Get voice, default to michelle if not found
-            voice = self.voices.get(voice_name, self.current_voice)
-            
-            filepath = asyncio.run(self.synthesize_async(text, voice))
+            # Unknown voice names fall back to michelle
+            filepath = self.submit_speech_file(text, voice_name).result(timeout=self.timeout)
             print(f"✅ Edge TTS audio created: {filepath} (voice: {voice_name})")
             return filepath
             
@@ -100,6 +290,55 @@ class TTSService:
             traceback.print_exc()
             return None
     
+    def prewarm(self, phrases, voice_names=("emma",)):
+        """
+        Pre-synthesize phrases into the cache without blocking the caller
+        
+        The phrases are pinned, so they are kept on disk across restarts.
+        
+        Args:
+            phrases: Texts that are known to repeat (fallbacks, intros, short replies)
+            voice_names: Voices to synthesize each phrase with
+        
+        Returns:
+            list: Futures for the phrases that weren't cached yet
+        """
+        if self.cache is None:
+            return []
+        
+        futures = []
+        for voice_name in voice_names:
+            voice = self.voices.get(voice_name, self.current_voice)
+            for phrase in phrases:
+                if not self.cache.cacheable(phrase):
+                    continue
+                key = self.cache.make_key(phrase, voice, self.rate, self.volume, self.pitch)
+                self.cache.pin(key)
+                if not self.cache.contains(key):
+                    futures.append(self.submit_speech(phrase, voice_name))
+        
+        remaining = [len(futures)]
+        lock = threading.Lock()
+        
+        def report(_future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            failed = sum(1 for f in futures if f.cancelled() or f.exception() is not None)
+            print(f"✅ TTS cache pre-warmed: {len(futures) - failed} new phrases, {failed} failed")
+        
+        for future in futures:
+            future.add_done_callback(report)
+        
+        return futures
+    
+    def close(self):
+        """Stop the background event loop"""
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout=5)
+    
     def set_voice(self, voice_name):
         """Change the default voice"""
         if voice_name in self.voices:
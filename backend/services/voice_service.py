@@ -2,10 +2,11 @@
 Voice Service - GROQ OPTIMIZED for ultra-fast transcription
 """
 
+import asyncio
 import os
-from groq import Groq
 from dotenv import load_dotenv
 import time
+from services.metrics import TRANSCRIPTION_SECONDS, UPSTREAM_ERRORS
 
 load_dotenv()
 
@@ -15,45 +16,117 @@ class VoiceService:
     Voice transcription service using Groq Whisper API (10x faster than local)
     """
     
-    def __init__(self):
-        """Initialize Groq client for Whisper"""
+    def __init__(self, preprocessor=None):
+        """
+        Initialize Groq client for Whisper
+        
+        Args:
+            preprocessor (AudioPreprocessor): Optional - shrinks uploads (16 kHz mono,
+                silence trimmed) before they are sent
+        """
         print("🎤 Initializing Groq Whisper service...")
         
         api_key = os.getenv('GROQ_API_KEY')
         if not api_key:
             raise ValueError("GROQ_API_KEY not found in .env file")
         
+        # groq is imported here (not at module level) so importing this module stays cheap
+        from groq import Groq
         self.client = Groq(api_key=api_key)
+        # Async client for the asyncio server (asgi.py), created on its event loop when first used
+        self._api_key = api_key
+        self._async_client = None
+        self.preprocessor = preprocessor
         print("✅ Groq Whisper ready!")
     
-    def transcribe_audio(self, audio_path):
+    def transcribe_audio(self, audio, filename=None):
         """
-        Transcribe audio file using Groq Whisper API (ULTRA FAST!)
+        Transcribe audio using Groq Whisper API (ULTRA FAST!)
         
         Args:
-            audio_path (str): Path to audio file
+            audio: Path to an audio file, raw bytes, or a file-like object
+                (e.g. request.files['audio'].stream) - nothing is copied to disk
+            filename (str): Name sent with in-memory audio so the API can tell
+                the format (defaults to audio.wav)
             
         Returns:
             str: Transcribed text
         """
-        print(f"🎧 Transcribing with Groq Whisper: {audio_path}")
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            # Open and send audio file to Groq
-            with open(audio_path, "rb") as audio_file:
-                transcription = self.client.audio.transcriptions.create(
-                    file=audio_file,
-                    model="whisper-large-v3",  # Best accuracy
-                    response_format="text",
-                    language="en"  # Specify if you know the language
-                )
-            
-            elapsed = time.time() - start_time
+            if self.preprocessor is not None:
+                audio, filename = self.preprocessor.process(audio, filename)
+            
+            if isinstance(audio, (str, os.PathLike)):
+                print(f"🎧 Transcribing with Groq Whisper: {audio}")
+                with open(audio, "rb") as audio_file:
+                    transcription = self._transcribe(audio_file)
+            else:
+                print(f"🎧 Transcribing with Groq Whisper: {filename or 'audio.wav'} (in memory)")
+                transcription = self._transcribe((filename or "audio.wav", audio))
+            
+            elapsed = time.perf_counter() - start_time
+            TRANSCRIPTION_SECONDS.observe(elapsed)
             print(f"✅ Groq transcription completed in {elapsed:.3f}s")
             
             return transcription.strip()
         
         except Exception as e:
             print(f"❌ Groq transcription error: {str(e)}")
+            UPSTREAM_ERRORS.labels('whisper').inc()
             return ""
+    
+    async def transcribe_audio_async(self, audio, filename=None):
+        """
+        Async transcribe_audio for the asyncio server - no thread waits on the API
+        
+        Args:
+            audio: Raw bytes or a path to an audio file
+            filename (str): Name sent with in-memory audio (defaults to audio.wav)
+            
+        Returns:
+            str: Transcribed text ("" on failure)
+        """
+        start_time = time.perf_counter()
+        
+        try:
+            if self._async_client is None:
+                from groq import AsyncGroq
+                self._async_client = AsyncGroq(api_key=self._api_key)
+            
+            if isinstance(audio, (str, os.PathLike)):
+                filename = os.path.basename(audio)
+                with open(audio, "rb") as audio_file:
+                    audio = audio_file.read()
+            
+            if self.preprocessor is not None:
+                audio, filename = await asyncio.to_thread(self.preprocessor.process, audio, filename)
+            
+            print(f"🎧 Transcribing with Groq Whisper (async): {filename or 'audio.wav'}")
+            transcription = await self._async_client.audio.transcriptions.create(
+                file=(filename or "audio.wav", audio),
+                model="whisper-large-v3",
+                response_format="text",
+                language="en"
+            )
+            
+            elapsed = time.perf_counter() - start_time
+            TRANSCRIPTION_SECONDS.observe(elapsed)
+            print(f"✅ Groq transcription completed in {elapsed:.3f}s")
+            
+            return transcription.strip()
+        
+        except Exception as e:
+            print(f"❌ Groq transcription error: {str(e)}")
+            UPSTREAM_ERRORS.labels('whisper').inc()
+            return ""
+    
+    def _transcribe(self, file):
+        """Send audio to Groq (file is an open file or a (filename, bytes/stream) tuple)"""
+        return self.client.audio.transcriptions.create(
+            file=file,
+            model="whisper-large-v3",  # Best accuracy
+            response_format="text",
+            language="en"  # Specify if you know the language
+        )
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """database.database against a fresh file, with no cache or write-behind unless a test enables them"""
+    from database import database
+
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(database, '_pool', database.ConnectionPool())
+    monkeypatch.setattr(database, '_turn_writer', None)
+    monkeypatch.setattr(database, '_session_cache', None)
+    monkeypatch.setattr(database, '_fts_enabled', False)
+    database.init_database()
+
+    yield database
+
+    if database._turn_writer is not None:
+        database._turn_writer.close()
+    database._pool.close()
@@ -0,0 +1,55 @@
+from services.context_builder import ContextBuilder, SessionSummarizer
+
+
+def contents(turns):
+    return [turn['content'] for turn in turns]
+
+
+def save_turns(db, session_id, count):
+    for index in range(count):
+        db.save_turn(session_id, 'user' if index % 2 == 0 else 'assistant', f't{index}')
+
+
+def test_context_turns_reach_back_to_the_summary(db):
+    session_id = db.create_session()
+    save_turns(db, session_id, 25)
+    ids = [turn['id'] for turn in db.get_turns_after(session_id)]
+
+    # No summary yet: nothing older than the 20-turn window may be dropped
+    assert len(db.get_context_turns(session_id, None, limit=20)) == 25
+    # Summary covers the first 3 turns
+    assert contents(db.get_context_turns(session_id, ids[2], limit=20))[0] == 't3'
+    # Summary reaches into the window: just the window
+    assert len(db.get_context_turns(session_id, ids[10], limit=20)) == 20
+
+
+class FakeAI:
+    def __init__(self):
+        self.folded = []
+
+    def summarize_conversation(self, summary, turns):
+        self.folded.append(contents(turns))
+        return 'summary'
+
+
+def test_summarizer_folds_when_turns_outgrow_the_window(db):
+    session_id = db.create_session()
+    save_turns(db, session_id, 21)  # short turns, far below the token budget
+    ai = FakeAI()
+    summarizer = SessionSummarizer(
+        ai, ContextBuilder(token_budget=1200),
+        load_state=db.get_session_summary,
+        load_turns_after=db.get_turns_after,
+        store_summary=db.update_session_summary,
+        max_turns=20
+    )
+
+    assert summarizer.summarize_if_needed(session_id)
+    assert ai.folded == [[f't{index}' for index in range(11)]]
+    summary, summarized_through = db.get_session_summary(session_id)
+    assert summary == 'summary'
+
+    # The window reaches into the summary again, and the builder skips what it covers
+    turns = db.get_context_turns(session_id, summarized_through, limit=20)
+    assert len(turns) == 20
+    assert contents(ContextBuilder().unsummarized(turns, summarized_through)) == [f't{index}' for index in range(11, 21)]
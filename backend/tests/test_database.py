@@ -0,0 +1,161 @@
+import pytest
+
+
+def contents(turns):
+    return [turn['content'] for turn in turns]
+
+
+def all_pages(db, session_id, limit):
+    turns, cursor, pages = [], None, 0
+    while True:
+        page, cursor = db.get_session_turns_page(session_id, cursor=cursor, limit=limit)
+        turns += page
+        pages += 1
+        if cursor is None:
+            return turns, pages
+
+
+def insert_at(db, session_id, timestamp, count, prefix):
+    turns = [
+        {'session_id': session_id, 'role': 'user', 'content': f'{prefix}{n}', 'timestamp': timestamp}
+        for n in range(count)
+    ]
+    db._insert_turns(turns)
+    return turns
+
+
+def test_pages_cross_equal_timestamps(db):
+    session_id = db.create_session()
+    # Page boundaries (limit 4) fall inside each run of equal timestamps
+    insert_at(db, session_id, '2024-01-01 10:00:00', 7, 'a')
+    insert_at(db, session_id, '2024-01-01 10:00:01', 6, 'b')
+    insert_at(db, session_id, '2024-01-01 10:00:02', 1, 'c')
+
+    turns, pages = all_pages(db, session_id, limit=4)
+    assert pages == 4
+    assert contents(turns) == [f'a{n}' for n in range(7)] + [f'b{n}' for n in range(6)] + ['c0']
+    ids = [turn['id'] for turn in turns]
+    assert ids == sorted(set(ids))
+
+
+def test_pages_follow_timestamp_before_id(db):
+    session_id = db.create_session()
+    # Inserted out of time order: ids no longer agree with timestamps
+    insert_at(db, session_id, '2024-01-01 10:00:05', 3, 'late')
+    insert_at(db, session_id, '2024-01-01 10:00:00', 3, 'early')
+
+    turns, _ = all_pages(db, session_id, limit=2)
+    assert contents(turns) == ['early0', 'early1', 'early2', 'late0', 'late1', 'late2']
+
+
+def test_exact_page_multiple_has_no_empty_last_page(db):
+    session_id = db.create_session()
+    insert_at(db, session_id, '2024-01-01 10:00:00', 6, 't')
+
+    first, cursor = db.get_session_turns_page(session_id, limit=3)
+    second, cursor = db.get_session_turns_page(session_id, cursor=cursor, limit=3)
+    assert contents(first + second) == [f't{n}' for n in range(6)]
+    # One row beyond the limit is fetched to tell whether another page exists
+    assert cursor is None
+
+
+def test_pages_include_pending_turns_once(db):
+    db.enable_write_behind(batch_size=10)
+    session_id = db.create_session()
+    for n in range(5):
+        db.save_turn(session_id, 'user', f't{n}')
+
+    # Pages read before and after the queue is committed see the same history
+    pending_view, _ = all_pages(db, session_id, limit=2)
+    db.flush_turns()
+    committed_view, _ = all_pages(db, session_id, limit=2)
+    assert contents(pending_view) == contents(committed_view) == [f't{n}' for n in range(5)]
+    assert all(turn['id'] is not None for turn in committed_view)
+
+
+def test_cache_and_write_behind_agree_with_the_database(db):
+    db.enable_session_cache(window=4)
+    db.enable_write_behind(batch_size=3)
+    session_id = db.create_session()
+    expected = []
+    for n in range(10):
+        db.save_turn(session_id, 'user' if n % 2 == 0 else 'assistant', f't{n}')
+        expected.append(f't{n}')
+        if n == 5:
+            db.evict_session_cache(session_id)
+        # Cache (window of 4), queue and database together never lose or repeat a turn
+        assert contents(db.get_recent_turns(session_id, 4)) == expected[-4:]
+        assert contents(db.get_session_turns(session_id)) == expected
+
+    # Once committed, the cached turns carry the same ids as a fresh load
+    db.flush_turns()
+    fields = ('id', 'role', 'content', 'timestamp')
+    cached = [tuple(turn[k] for k in fields) for turn in db.get_recent_turns(session_id, 4)]
+    db.evict_session_cache(session_id)
+    assert cached == [tuple(turn[k] for k in fields) for turn in db.get_recent_turns(session_id, 4)]
+
+
+@pytest.fixture
+def fts_db(db):
+    if not db.fts_available():
+        pytest.skip('SQLite was built without FTS5')
+    return db
+
+
+def test_turn_fts_follows_insert_and_delete(fts_db):
+    db = fts_db
+    session_id = db.create_session()
+    db.save_turn(session_id, 'user', 'I keep worrying about my exams')
+    db.save_turn(session_id, 'assistant', 'Exams can feel overwhelming')
+
+    results, has_more = db.search_turns('exams', session_id)
+    assert len(results) == 2 and not has_more
+    assert '<mark>' in results[0]['snippet']
+
+    deleted = next(result['id'] for result in results if result['role'] == 'user')
+    with db._pool.connection() as conn:
+        with conn:
+            conn.execute('DELETE FROM turns WHERE id = ?', (deleted,))
+
+    results, _ = db.search_turns('exams', session_id)
+    assert [result['role'] for result in results] == ['assistant']
+    assert db.search_turns('worrying', session_id)[0] == []
+
+
+def test_turn_fts_indexes_write_behind_turns_on_commit(fts_db):
+    db = fts_db
+    db.enable_write_behind(batch_size=10)
+    session_id = db.create_session()
+    db.save_turn(session_id, 'user', 'sleepless again tonight')
+    db.flush_turns()
+
+    results, _ = db.search_turns('sleepless', session_id)
+    assert len(results) == 1
+
+
+def test_turn_search_stays_in_its_session(fts_db):
+    db = fts_db
+    mine, theirs = db.create_session(), db.create_session()
+    db.save_turn(mine, 'user', 'my exams are next week')
+    db.save_turn(theirs, 'user', 'their exams went badly')
+
+    results, _ = db.search_turns('exams', mine)
+    assert [result['session_id'] for result in results] == [mine]
+    with pytest.raises(ValueError):
+        db.search_turns('exams', None)
+
+
+def test_knowledge_fts_follows_insert_and_delete(fts_db):
+    db = fts_db
+    breathing = db.add_knowledge_entry('Box breathing', 'Inhale for four counts, hold, exhale', 'coping')
+    db.add_knowledge_entry('Grounding', 'Name five things you can see', 'coping')
+
+    results, _ = db.search_knowledge('breath')
+    assert [result['id'] for result in results] == [breathing]
+
+    with db._pool.connection() as conn:
+        with conn:
+            conn.execute('DELETE FROM knowledge_base WHERE id = ?', (breathing,))
+
+    assert db.search_knowledge('breath')[0] == []
+    assert [result['title'] for result in db.search_knowledge('things')[0]] == ['Grounding']
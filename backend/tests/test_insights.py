@@ -0,0 +1,65 @@
+import math
+import random
+
+import pytest
+
+from database import insights
+
+POSITIVE = ('joy', 'surprise')
+
+
+def expected_milestones(session_labels):
+    """calculateSessionMilestones (insightsDataUtils.js) over sessions in creation order"""
+    streak = longest = 0
+    for labels in session_labels:
+        streak = streak + 1 if any(label in POSITIVE for label in labels) else 0
+        longest = max(longest, streak)
+
+    improvement = None
+    if len(session_labels) > 6:
+        half = math.ceil(len(session_labels) / 2)
+        first = sum('joy' in labels for labels in session_labels[:half])
+        second = sum('joy' in labels for labels in session_labels[half:])
+        improvement = math.floor((second - first) / half * 100 + 0.5)
+    return {'positive_streak': longest, 'joy_improvement': improvement}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_milestones_follow_labels_in_any_order(db, seed):
+    rng = random.Random(seed)
+    emotions = ['joy', 'surprise', 'sadness', 'neutral', 'fear']
+    session_labels = []
+    labelled = []
+
+    for _ in range(15):
+        session_id = db.create_session('u1')
+        labels = []
+        for _ in range(rng.randint(1, 3)):
+            db.save_turn(session_id, 'user', 'feeling things today')
+            label = rng.choice(emotions)
+            labels.append(label)
+        turn_ids = [turn['id'] for turn in db.get_turns_after(session_id)]
+        labelled += [(turn_id, [{'label': label, 'score': 0.9}]) for turn_id, label in zip(turn_ids, labels)]
+        session_labels.append(labels)
+
+        # Label whatever has piled up, in random order and batches, as sessions keep coming
+        rng.shuffle(labelled)
+        cut = rng.randint(0, len(labelled))
+        db.apply_emotion_labels(labelled[:cut])
+        labelled = labelled[cut:]
+
+    db.apply_emotion_labels(labelled)
+
+    assert db.get_insights('u1')['milestones'] == expected_milestones(session_labels)
+
+    # A full rebuild arrives at the same state
+    with db._pool.connection() as conn:
+        with conn:
+            insights.rebuild(conn)
+    assert db.get_insights('u1')['milestones'] == expected_milestones(session_labels)
+
+
+def test_milestones_without_labels(db):
+    db.create_session('u2')
+    assert db.get_insights('u2')['milestones'] == {'positive_streak': 0, 'joy_improvement': None}
+    assert db.get_insights('nobody')['milestones'] == {'positive_streak': 0, 'joy_improvement': None}
@@ -0,0 +1,55 @@
+import numpy as np
+
+from services.knowledge_index import HashingEmbedder, KnowledgeIndex
+
+ENTRIES = [
+    {'id': 'breathing', 'title': 'Box breathing', 'content': 'Inhale for four counts, hold, exhale slowly'},
+    {'id': 'grounding', 'title': 'Grounding', 'content': 'Name five things you can see around you'},
+    {'id': 'sleep', 'title': 'Sleep hygiene', 'content': 'Keep a regular bedtime and avoid screens late'},
+]
+
+
+class NoDimEmbedder:
+    """Hashing embedder whose dim must never be read (like a model that loads on first access)"""
+
+    name = 'no-dim'
+
+    def __init__(self):
+        self._hashing = HashingEmbedder()
+
+    @property
+    def dim(self):
+        raise AssertionError('dim read before anything was embedded')
+
+    def embed(self, texts):
+        return self._hashing.embed(texts)
+
+
+def best(index, query):
+    return index.search(query, k=1)[0][0]
+
+
+def test_rows_orphaned_by_a_crash_are_cut_off(tmp_path):
+    index = KnowledgeIndex(str(tmp_path), HashingEmbedder())
+    index.add(ENTRIES[:2])
+
+    # A crash after the matrix append but before meta.json was rewritten
+    orphan = HashingEmbedder().embed(['something else entirely'])
+    with open(index.matrix_path, 'ab') as f:
+        f.write(orphan.tobytes())
+
+    reopened = KnowledgeIndex(str(tmp_path), HashingEmbedder())
+    assert len(reopened) == 2
+    reopened.add(ENTRIES[2:])
+    assert best(reopened, 'regular bedtime screens') == 'sleep'
+    assert best(reopened, 'five things you can see') == 'grounding'
+    assert len(np.fromfile(reopened.matrix_path, dtype=np.float32)) == 3 * 384
+
+
+def test_opening_an_index_does_not_need_the_embedding_dimension(tmp_path):
+    index = KnowledgeIndex(str(tmp_path), NoDimEmbedder())
+    assert len(index) == 0 and index.search('breathing') == []
+    index.add(ENTRIES)
+
+    reopened = KnowledgeIndex(str(tmp_path), NoDimEmbedder())
+    assert best(reopened, 'box breathing') == 'breathing'
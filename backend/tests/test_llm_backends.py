@@ -0,0 +1,33 @@
+from services.llm_backends import CHAT_FORMATS, render_prompt
+
+LLAMA_2 = CHAT_FORMATS['llama-2']
+
+
+def test_llama2_system_first():
+    prompt = render_prompt(LLAMA_2, [
+        {'role': 'system', 'content': 'Be kind.'},
+        {'role': 'user', 'content': 'Hi'},
+        {'role': 'assistant', 'content': 'Hello!'},
+        {'role': 'user', 'content': 'How are you?'}
+    ])
+    assert prompt == "[INST] <<SYS>>\nBe kind.\n<</SYS>>\n\nHi [/INST] Hello! [INST] How are you? [/INST]"
+
+
+def test_llama2_user_first():
+    prompt = render_prompt(LLAMA_2, [{'role': 'user', 'content': 'Summarize this.'}])
+    assert prompt == "[INST] Summarize this. [/INST]"
+
+
+def test_llama2_extra_system_messages_join_the_next_user_turn():
+    prompt = render_prompt(LLAMA_2, [
+        {'role': 'system', 'content': 'Be kind.'},
+        {'role': 'system', 'content': 'Summary: work stress.'},
+        {'role': 'user', 'content': 'Hi'}
+    ])
+    assert prompt.endswith("<</SYS>>\n\nSummary: work stress.\n\nHi [/INST]")
+    assert prompt.count("[INST]") == 1
+
+
+def test_chatml_user_first():
+    prompt = render_prompt(CHAT_FORMATS['chatml'], [{'role': 'user', 'content': 'Hi'}])
+    assert prompt == "<|im_start|>user\nHi<|im_end|>\n<|im_start|>assistant\n"
@@ -0,0 +1,37 @@
+import pytest
+
+from services.realtime_session import RealtimeVoiceSession, stream_options
+
+
+def test_stream_options_accept_the_supported_rates():
+    assert stream_options({}) == (16000, 'pcm16')
+    assert stream_options({'sample_rate': 48000, 'encoding': 'opus'}) == (48000, 'opus')
+    assert stream_options({'sample_rate': '24000'}) == (24000, 'pcm16')
+
+
+@pytest.mark.parametrize('data', [
+    {'sample_rate': 10 ** 9},
+    {'sample_rate': 0},
+    {'sample_rate': -16000},
+    {'sample_rate': 'fast'},
+    {'sample_rate': None},
+    {'sample_rate': 44100},
+    {'encoding': '../../etc'},
+])
+def test_stream_options_reject_anything_else(data):
+    with pytest.raises(ValueError):
+        stream_options(data)
+
+
+def test_session_refuses_unvalidated_settings():
+    with pytest.raises(ValueError):
+        RealtimeVoiceSession(sample_rate=10 ** 9)
+
+
+def test_pending_utterances_are_capped():
+    session = RealtimeVoiceSession(max_pending=2)
+    assert session.claim_utterance() and session.claim_utterance()
+    assert not session.claim_utterance()
+
+    session.release_utterance()
+    assert session.claim_utterance()
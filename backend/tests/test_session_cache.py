@@ -0,0 +1,54 @@
+import threading
+
+from database.session_cache import SessionWindowCache
+
+
+def contents(turns):
+    return [turn['content'] for turn in turns]
+
+
+def test_append_skips_turn_already_loaded():
+    cache = SessionWindowCache(window=5)
+    a = {'id': 1, 'role': 'user', 'content': 'a'}
+    b = {'id': 2, 'role': 'assistant', 'content': 'b'}
+
+    # A cache miss read the committed row before save_turn got to append()
+    cache.load('s', [a, dict(b)])
+    cache.append('s', b)
+
+    assert contents(cache.get('s', 5)) == ['a', 'b']
+
+
+def test_append_keeps_new_turns():
+    cache = SessionWindowCache(window=2)
+    cache.start('s')
+    for index, content in enumerate('abc', 1):
+        cache.append('s', {'id': index, 'role': 'user', 'content': content})
+
+    assert contents(cache.get('s', 2)) == ['b', 'c']
+
+
+def test_concurrent_save_and_cache_miss(db):
+    db.enable_session_cache(window=20)
+    for trial in range(200):
+        session_id = db.create_session()
+        db.save_turn(session_id, 'user', 'a')
+        db.evict_session_cache(session_id)
+
+        start = threading.Barrier(2)
+
+        def save():
+            start.wait()
+            db.save_turn(session_id, 'assistant', 'b')
+
+        def read():
+            start.wait()
+            db.get_recent_turns(session_id, 20)
+
+        threads = [threading.Thread(target=save), threading.Thread(target=read)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert contents(db.get_recent_turns(session_id, 20)) == ['a', 'b'], f"trial {trial}"
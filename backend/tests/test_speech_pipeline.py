@@ -0,0 +1,42 @@
+from concurrent.futures import Future
+
+from services.speech_pipeline import SpeechPipeline
+
+
+class FakeTTS:
+    timeout = 5
+
+    def __init__(self):
+        self.spoken = []
+
+    def submit_speech_id(self, text, voice_name='emma'):
+        self.spoken.append(text)
+        future = Future()
+        future.set_result(f'clip{len(self.spoken)}')
+        return future
+
+
+def test_segments_follow_sentences_in_order():
+    tts = FakeTTS()
+    items = list(SpeechPipeline(tts).stream(iter(['That sounds really hard. ', 'I am here ', 'with you.'])))
+
+    audio = [item for kind, item in items if kind == 'audio']
+    assert [segment['text'] for segment in audio] == ['That sounds really hard.', 'I am here with you.']
+    assert [segment['audio_url'] for segment in audio] == ['/audio/clip1', '/audio/clip2']
+
+
+def test_closing_the_pipeline_closes_the_token_stream():
+    closed = []
+
+    def tokens():
+        try:
+            yield 'That sounds really hard. '
+            yield 'More to say.'
+        finally:
+            closed.append(True)
+
+    source = tokens()  # still referenced, so only an explicit close() ends it
+    stream = SpeechPipeline(FakeTTS()).stream(source)
+    assert next(stream) == ('token', 'That sounds really hard. ')
+    stream.close()
+    assert closed == [True]
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.stage_scheduler import Stage, StageOverloaded
+
+
+def test_slot_sheds_beyond_workers_plus_queue():
+    stage = Stage('test-slot', workers=1, max_queue=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        running = []
+
+        async def job(n):
+            async with stage.slot():
+                running.append(n)
+                await release.wait()
+
+        first = asyncio.ensure_future(job(1))
+        second = asyncio.ensure_future(job(2))
+        await asyncio.sleep(0)
+        # One running, one waiting for the worker: the third is shed at once
+        assert running == [1]
+        assert stage.stats()['queued'] == 1
+        with pytest.raises(StageOverloaded) as excinfo:
+            async with stage.slot():
+                pass
+        assert excinfo.value.stage == 'test-slot'
+        assert excinfo.value.retry_after >= 1
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert running == [1, 2]
+
+    asyncio.run(scenario())
+    stats = stage.stats()
+    assert (stats['queued'], stats['running'], stats['completed'], stats['rejected']) == (0, 0, 2, 1)
+
+
+def test_slot_shares_places_with_threaded_submit():
+    stage = Stage('test-shared', workers=1, max_queue=0)
+
+    async def scenario():
+        async with stage.slot():
+            with pytest.raises(StageOverloaded):
+                stage.submit(lambda: None)
+        assert stage.submit(lambda: 'ran').result(timeout=5) == 'ran'
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_its_place_back():
+    stage = Stage('test-cancel', workers=1, max_queue=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def job():
+            async with stage.slot():
+                await release.wait()
+
+        holder = asyncio.ensure_future(job())
+        waiter = asyncio.ensure_future(job())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert stage.stats()['queued'] == 0
+
+        # The cancelled waiter's place is free again
+        async with asyncio.timeout(5):
+            release.set()
+            await holder
+            async with stage.slot():
+                pass
+
+    asyncio.run(scenario())
+    assert stage.stats()['completed'] == 2
+
+
+def test_stream_closed_before_its_first_item_stops_the_producer():
+    stage = Stage('test-close', workers=1, max_queue=1)
+    release = threading.Event()
+    produced = []
+
+    def items():
+        release.wait(5)
+        for n in range(100):
+            produced.append(n)
+            yield n
+
+    stream = stage.stream(items())
+    stream.close()
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while stage.stats()['completed'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stage.stats()['completed'] == 1
+    assert len(produced) <= 1
+    assert list(stream) == []
+
+
+def test_stream_hands_items_and_errors_back_in_order():
+    stage = Stage('test-items', workers=1, max_queue=1)
+
+    def items():
+        yield 'a'
+        yield 'b'
+        raise RuntimeError('model went away')
+
+    stream = stage.stream(items())
+    assert next(stream) == 'a' and next(stream) == 'b'
+    with pytest.raises(RuntimeError):
+        next(stream)
+    assert list(stream) == []
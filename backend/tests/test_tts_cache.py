@@ -0,0 +1,50 @@
+import os
+import time
+
+from services.tts_cache import TTSCache
+
+
+def on_disk(cache):
+    return sorted(name[:-4] for name in os.listdir(cache.cache_dir) if name.endswith('.mp3'))
+
+
+def test_only_repeated_text_reaches_disk(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    cache.put('reply', b'audio')
+
+    assert cache.get('reply') == b'audio'  # asked for again...
+    assert on_disk(cache) == ['reply']     # ...so now it is a repeating phrase
+    cache.put('other', b'audio')
+    assert on_disk(cache) == ['reply']
+
+
+def test_text_synthesized_twice_is_kept_on_disk(tmp_path):
+    cache = TTSCache(str(tmp_path), memory_max_bytes=5)
+    cache.put('phrase', b'first')
+    cache.put('filler', b'12345')  # pushes 'phrase' out of memory
+    assert on_disk(cache) == []
+
+    cache.put('phrase', b'first')
+    assert on_disk(cache) == ['phrase']
+
+
+def test_pinned_phrases_go_to_disk_at_once(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    cache.pin('fallback')
+    cache.put('fallback', b'audio')
+    assert on_disk(cache) == ['fallback']
+
+
+def test_disk_entries_expire_after_the_ttl(tmp_path):
+    cache = TTSCache(str(tmp_path), disk_ttl=60)
+    for key in ('old', 'fresh'):
+        cache.pin(key)
+        cache.put(key, b'audio')
+    stale = time.time() - 120
+    os.utime(cache._path('old'), (stale, stale))
+
+    # Expired files are dropped when the index is rebuilt (and on later lookups)
+    reopened = TTSCache(str(tmp_path), disk_ttl=60)
+    assert on_disk(reopened) == ['fresh']
+    assert reopened.get('old') is None
+    assert reopened.get('fresh') == b'audio'
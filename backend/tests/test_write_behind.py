@@ -0,0 +1,118 @@
+import threading
+
+from services.context_builder import ContextBuilder
+
+
+def contents(turns):
+    return [turn['content'] for turn in turns]
+
+
+def test_pending_turns_read_back_in_order(db):
+    db.enable_write_behind(batch_size=10)
+    session_id = db.create_session()
+    for content in 'abc':
+        db.save_turn(session_id, 'user', content)
+
+    assert contents(db.get_recent_turns(session_id, 10)) == ['a', 'b', 'c']
+    db.flush_turns()
+    assert contents(db.get_recent_turns(session_id, 10)) == ['a', 'b', 'c']
+    assert contents(db.get_session_turns(session_id)) == ['a', 'b', 'c']
+
+
+def test_cached_pending_turns_get_ids_on_commit(db):
+    db.enable_session_cache(window=20)
+    db.enable_write_behind(batch_size=10)
+    session_id = db.create_session()
+    db.save_turn(session_id, 'user', 'a')
+    db.flush_turns()
+
+    # Hold the next commit back so 'b' is still queued when the cache is loaded
+    writer = db._turn_writer
+    release = threading.Event()
+    insert_batch = writer._insert_batch
+
+    def delayed_insert(batch):
+        release.wait(5)
+        insert_batch(batch)
+
+    writer._insert_batch = delayed_insert
+    db.evict_session_cache(session_id)
+    db.save_turn(session_id, 'assistant', 'b')
+    assert contents(db.get_recent_turns(session_id, 20)) == ['a', 'b']
+    release.set()
+    db.flush_turns()
+
+    cached = db._session_cache.get(session_id, 20)
+    assert contents(cached) == ['a', 'b']
+    assert all(turn['id'] is not None for turn in cached)
+
+    # Once the summary covers them they are no longer sent
+    assert ContextBuilder().unsummarized(cached, cached[-1]['id']) == []
+
+
+def test_append_after_load_of_pending_turn_is_not_duplicated(db):
+    db.enable_session_cache(window=20)
+    db.enable_write_behind(batch_size=10)
+    session_id = db.create_session()
+    db.evict_session_cache(session_id)
+
+    turn = {'id': None, 'session_id': session_id, 'role': 'user', 'content': 'a', 'timestamp': '2024-01-01 00:00:00'}
+    db._turn_writer.visibility.acquire_write()
+    try:
+        db._turn_writer.enqueue(turn)
+        version = db._session_cache.version()
+        db._session_cache.load(session_id, db._turn_writer.pending(session_id), version)
+        db._session_cache.append(session_id, turn)
+    finally:
+        db._turn_writer.visibility.release_write()
+    db.flush_turns()
+
+    assert contents(db.get_recent_turns(session_id, 20)) == ['a']
+
+
+def failing_inserts(db, failures, poison=None):
+    """Make the writer's next `failures` inserts fail, and every insert of `poison` content"""
+    insert_batch = db._turn_writer._insert_batch
+    calls = {'failed': 0}
+
+    def flaky_insert(batch):
+        if calls['failed'] < failures or any(turn['content'] == poison for turn in batch):
+            calls['failed'] += 1
+            raise RuntimeError('database is locked')
+        insert_batch(batch)
+
+    db._turn_writer._insert_batch = flaky_insert
+    db._turn_writer.retry_interval = 0.05
+    return calls
+
+
+def test_failed_batches_stay_pending_and_are_retried(db):
+    db.enable_write_behind(batch_size=10)
+    session_id = db.create_session()
+    failing_inserts(db, failures=4)  # beyond one batch's retries
+    for content in 'abc':
+        db.save_turn(session_id, 'user', content)
+    db.flush_turns()
+
+    # Still readable while it waits for the retry, then committed
+    assert contents(db.get_session_turns(session_id)) == ['a', 'b', 'c']
+    db._turn_writer.close()
+    with db._pool.connection() as conn:
+        stored = conn.execute('SELECT content FROM turns WHERE session_id = ? ORDER BY id', (session_id,)).fetchall()
+    assert [row['content'] for row in stored] == ['a', 'b', 'c']
+
+
+def test_turns_after_a_failing_turn_wait_for_it(db):
+    db.enable_write_behind(batch_size=10)
+    session_id = db.create_session()
+    failing_inserts(db, failures=0, poison='bad')
+    db._turn_writer.linger = 0.2  # one batch
+    for content in ('a', 'bad', 'c'):
+        db.save_turn(session_id, 'user', content)
+    db._turn_writer.close()
+
+    # 'a' is committed; 'c' is not stored ahead of the turn that precedes it
+    with db._pool.connection() as conn:
+        stored = conn.execute('SELECT content FROM turns WHERE session_id = ? ORDER BY id', (session_id,)).fetchall()
+    assert [row['content'] for row in stored] == ['a']
+    assert contents(db._turn_writer.pending(session_id)) == ['bad', 'c']